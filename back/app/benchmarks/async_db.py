@@ -0,0 +1,135 @@
+"""
+Requests/sec of the catalog endpoints with DB_MODE=sync vs DB_MODE=async.
+
+Seeds a throwaway SQLite database, starts uvicorn once per mode and keeps
+`--concurrency` connections busy against GET /shop/ and GET /genres/.
+
+    cd back/app
+    python -m benchmarks.async_db --concurrency 500 --duration 15
+
+The async mode needs aiosqlite installed.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import httpx
+
+APP_DIR = Path(__file__).resolve().parent.parent
+PATHS = ["/shop/?limit=20", "/shop/?sort_by=popularity&limit=20", "/genres/", "/authors/"]
+
+
+def seed(database_url: str, books: int):
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, str(APP_DIR))
+    from core.database import SessionLocal, migrate
+    from models import Author, Book, Genre
+
+    migrate()
+    db = SessionLocal()
+    try:
+        genres = [Genre(name=f"Genre {i}") for i in range(20)]
+        authors = [Author(name=f"Author {i}") for i in range(max(books // 10, 1))]
+        db.add_all(genres + authors)
+        db.flush()
+        start = date(2000, 1, 1)
+        db.add_all(
+            Book(
+                id=f"bench-{i}",
+                title=f"Benchmark book {i}",
+                description="Lorem ipsum " * 20,
+                genre_id=genres[i % len(genres)].id,
+                author_id=authors[i % len(authors)].id,
+                release_date=start + timedelta(days=i % 9000),
+                favorites_count=(i * 7919) % 500,
+                price=10,
+            )
+            for i in range(books)
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+async def drive(base_url: str, concurrency: int, duration: float) -> dict:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    done = 0
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def worker(n: int):
+            nonlocal done, errors
+            i = n
+            while time.perf_counter() < deadline:
+                try:
+                    response = await client.get(PATHS[i % len(PATHS)])
+                    if response.status_code == 200:
+                        done += 1
+                    else:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                i += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(n) for n in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {"requests": done, "errors": errors, "rps": round(done / elapsed, 1)}
+
+
+def wait_until_up(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(base_url + "/").status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+def run_mode(mode: str, database_url: str, port: int, args) -> dict:
+    env = dict(os.environ, DATABASE_URL=database_url, DB_MODE=mode)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        wait_until_up(base_url)
+        return asyncio.run(drive(base_url, args.concurrency, args.duration))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--modes", default="sync,async")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        seed(database_url, args.books)
+        for mode in args.modes.split(","):
+            result = run_mode(mode, database_url, args.port, args)
+            print(f"{mode:>5}: {result['rps']} req/s ({result['requests']} ok, {result['errors']} errors)")
+
+
+if __name__ == "__main__":
+    main()
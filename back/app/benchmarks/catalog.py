@@ -0,0 +1,114 @@
+"""
+Deterministic synthetic catalog for the benchmarks: genres, authors, books,
+users, favorites and baskets, written with batched INSERTs.
+"""
+import os
+import random
+import sys
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import List
+
+from benchmarks.async_db import APP_DIR
+
+BATCH = 5000
+PASSWORD = "benchmark"
+
+
+@dataclass
+class CatalogSize:
+    books: int = 5000
+    authors: int = 500
+    genres: int = 20
+    users: int = 200
+    favorites: int = 5000
+    baskets: int = 1000
+    seed: int = 42
+
+
+@dataclass
+class Catalog:
+    book_ids: List[str] = field(default_factory=list)
+    genre_names: List[str] = field(default_factory=list)
+    author_names: List[str] = field(default_factory=list)
+    user_emails: List[str] = field(default_factory=list)
+
+
+def _insert(connection, table, rows):
+    for start in range(0, len(rows), BATCH):
+        connection.execute(table.insert(), rows[start:start + BATCH])
+
+
+def _pairs(rng: random.Random, count: int, users: int, books: int) -> set:
+    count = min(count, users * books)
+    pairs = set()
+    while len(pairs) < count:
+        pairs.add((rng.randrange(users) + 1, rng.randrange(books)))
+    return pairs
+
+
+def seed_catalog(database_url: str, size: CatalogSize) -> Catalog:
+    """Create the schema at `database_url` and fill it; same seed, same data."""
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, str(APP_DIR))
+    from core.database import engine, migrate
+    from core.security import hash_password
+    from models import Author, Basket, BasketStatus, Book, Favorite, Genre, Role, User
+
+    migrate()
+    rng = random.Random(size.seed)
+    catalog = Catalog(
+        book_ids=[f"b{i:07d}" for i in range(size.books)],
+        genre_names=[f"Genre {i}" for i in range(size.genres)],
+        author_names=[f"Author {i}" for i in range(size.authors)],
+        user_emails=[f"user{i}@bench.local" for i in range(size.users)],
+    )
+    favorites = sorted(_pairs(rng, size.favorites, size.users, size.books))
+    baskets = sorted(_pairs(rng, size.baskets, size.users, size.books))
+    favorites_count = [0] * size.books
+    for _, book in favorites:
+        favorites_count[book] += 1
+
+    now = datetime.utcnow()
+    start = date(1990, 1, 1)
+    hashed = hash_password(PASSWORD)
+    with engine.begin() as connection:
+        _insert(connection, Role.__table__, [{"id": 1, "name": "admin"}, {"id": 2, "name": "user"}])
+        _insert(connection, Genre.__table__, [{"id": i + 1, "name": name} for i, name in enumerate(catalog.genre_names)])
+        _insert(connection, Author.__table__, [
+            {"id": i + 1, "name": name, "info": f"Biography of {name}"} for i, name in enumerate(catalog.author_names)
+        ])
+        _insert(connection, Book.__table__, [
+            {
+                "id": book_id,
+                "title": f"{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_WORDS)} {i}",
+                "description": "Lorem ipsum dolor sit amet. " * 10,
+                "genre_id": rng.randrange(size.genres) + 1 if rng.random() > 0.05 else None,
+                "author_id": rng.randrange(size.authors) + 1,
+                "release_date": start + timedelta(days=rng.randrange(12000)),
+                "favorites_count": favorites_count[i],
+                "img": None,
+                "price": round(rng.uniform(3, 60), 2),
+                "updated_at": now,
+            }
+            for i, book_id in enumerate(catalog.book_ids)
+        ])
+        _insert(connection, User.__table__, [
+            {"id": i + 1, "nickname": f"user{i}", "email": email, "hashed_password": hashed, "role_id": 2}
+            for i, email in enumerate(catalog.user_emails)
+        ])
+        _insert(connection, Favorite.__table__, [
+            {"user_id": user, "book_id": catalog.book_ids[book], "created_at": now - timedelta(minutes=rng.randrange(20000))}
+            for user, book in favorites
+        ])
+        _insert(connection, Basket.__table__, [
+            {"user_id": user, "book_id": catalog.book_ids[book], "quantity": rng.randint(1, 3), "status": BasketStatus.active.name}
+            for user, book in baskets
+        ])
+    return catalog
+
+
+TITLE_WORDS = [
+    "Silent", "River", "Shadow", "Garden", "Winter", "Empire", "Letters", "Night", "Glass", "Ocean",
+    "Forgotten", "Iron", "Summer", "Kingdom", "Stranger", "Light", "Storm", "Memory", "Crown", "Journey",
+]
@@ -0,0 +1,123 @@
+"""
+Concurrent favorite/unfavorite churn on a handful of hot books, then checks
+that books.favorites_count equals the number of rows in favorites.
+
+    cd back/app
+    python -m benchmarks.favorites_stress --users 200 --mode atomic
+    python -m benchmarks.favorites_stress --users 200 --mode write_behind
+
+tests/test_favorites.py runs a smaller version of this check in-process
+with the test suite; this script drives a real uvicorn worker.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+import httpx
+
+from benchmarks.async_db import APP_DIR, seed, wait_until_up
+
+
+def create_users(count: int) -> list:
+    from sqlalchemy import update
+    from core.database import SessionLocal
+    from core.security import hash_password
+    from models import Book, User
+    from utils.jwt import create_access_token
+
+    db = SessionLocal()
+    try:
+        # The seed gives books synthetic popularity; start from an empty favorites table.
+        db.execute(update(Book).values(favorites_count=0))
+        hashed = hash_password("stress")
+        db.add_all(User(nickname=f"stress{i}", email=f"stress{i}@example.com", hashed_password=hashed) for i in range(count))
+        db.commit()
+    finally:
+        db.close()
+    return [create_access_token({"sub": f"stress{i}@example.com"}) for i in range(count)]
+
+
+async def churn(base_url: str, tokens: list, books: list, rounds: int) -> dict:
+    outcomes = {"ok": 0, "rejected": 0, "errors": 0}
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def user_loop(token: str):
+            headers = {"Authorization": f"Bearer {token}"}
+            rng = random.Random(token)
+            for _ in range(rounds):
+                book_id = rng.choice(books)
+                method = client.post if rng.random() < 0.6 else client.delete
+                response = await method(f"/shop/favorites/{book_id}", headers=headers)
+                if response.status_code == 200:
+                    outcomes["ok"] += 1
+                elif response.status_code in (400, 404):
+                    outcomes["rejected"] += 1
+                else:
+                    outcomes["errors"] += 1
+
+        await asyncio.gather(*(user_loop(token) for token in tokens))
+    return outcomes
+
+
+def check_counts(books: list) -> list:
+    from sqlalchemy import func, select
+    from core.database import SessionLocal
+    from models import Book, Favorite
+
+    db = SessionLocal()
+    try:
+        mismatches = []
+        for book_id in books:
+            stored = db.scalar(select(Book.favorites_count).where(Book.id == book_id))
+            actual = db.scalar(select(func.count(Favorite.id)).where(Favorite.book_id == book_id))
+            if stored != actual:
+                mismatches.append((book_id, stored, actual))
+        return mismatches
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--hot-books", type=int, default=3)
+    parser.add_argument("--mode", default="atomic", choices=["atomic", "write_behind"])
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/stress.db"
+        seed(database_url, max(args.hot_books, 10))
+        tokens = create_users(args.users)
+        books = [f"bench-{i}" for i in range(args.hot_books)]
+
+        env = dict(os.environ, DATABASE_URL=database_url, FAVORITES_COUNTER_MODE=args.mode, FAVORITES_FLUSH_SECONDS="0.5")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            wait_until_up(base_url)
+            outcomes = asyncio.run(churn(base_url, tokens, books, args.rounds))
+        finally:
+            # SIGTERM runs the shutdown hook, which flushes buffered deltas.
+            server.terminate()
+            server.wait()
+
+        mismatches = check_counts(books)
+        print(f"{args.mode}: {outcomes}")
+        if mismatches:
+            for book_id, stored, actual in mismatches:
+                print(f"LOST UPDATES on {book_id}: favorites_count={stored}, favorites rows={actual}")
+            sys.exit(1)
+        print("favorites_count matches the favorites table for every hot book")
+
+
+if __name__ == "__main__":
+    main()
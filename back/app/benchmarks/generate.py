@@ -0,0 +1,238 @@
+"""
+Bulk-load a large, skewed synthetic catalog for capacity testing.
+
+    cd back/app
+    python -m benchmarks.generate --database sqlite:////tmp/big.db \\
+        --books 1000000 --authors 100000 --users 500000 --favorites 10000000
+
+The data is deterministic for a given --seed and shaped like a real shop:
+author productivity follows a power law (a few authors write most books),
+favorites follow a Zipf distribution over books and users, genres are
+Zipf-skewed too, and recent favorites are more common than old ones.
+
+Names follow benchmarks/catalog.py (b0000000, "Genre 0", "Author 0",
+user0@bench.local, password "benchmark"), so the result can be driven with
+`python -m benchmarks.shop_load --database ... --books ... --users ...`.
+
+Rows are written in chunks through the DBAPI's executemany (with SQLite
+journaling relaxed and pyodbc's fast_executemany on MSSQL) and the
+secondary indexes are built once after the load. Roles, genres, authors and
+users get explicit ids: on MSSQL they are written under IDENTITY_INSERT, and
+on PostgreSQL their sequences are moved past the loaded ids afterwards, so
+the app can insert rows of its own (POST /auth/register) into the result.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from benchmarks.async_db import APP_DIR
+from benchmarks.catalog import PASSWORD, TITLE_WORDS
+
+CHUNK = 50_000
+EPOCH = date(1950, 1, 1)
+LATEST = date(2025, 12, 31)
+
+
+def zipf_weights(n: int, exponent: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, n + 1, dtype=np.float64) ** exponent
+    return weights / weights.sum()
+
+
+class Skewed:
+    """Zipf draws over [0, n); which index is popular is shuffled so it is unrelated to the index."""
+
+    def __init__(self, rng: np.random.Generator, n: int, exponent: float):
+        self.rng = rng
+        self.order = rng.permutation(n)
+        self.p = zipf_weights(n, exponent)
+
+    def draw(self, size: int) -> np.ndarray:
+        return self.order[self.rng.choice(len(self.order), size=size, p=self.p)]
+
+
+def unique_pairs(rng: np.random.Generator, count: int, users: int, books: int,
+                 user_exponent: float, book_exponent: float):
+    """`count` distinct (user, book) pairs; hot books saturate, so draw in rounds until enough are unique."""
+    count = min(count, users * books)
+    user_draws = Skewed(rng, users, user_exponent)
+    book_draws = Skewed(rng, books, book_exponent)
+    keys = np.empty(0, dtype=np.int64)
+    for _ in range(20):
+        missing = count - len(keys)
+        if missing <= 0:
+            break
+        draw = int(missing * 1.3) + 1000
+        drawn_users = user_draws.draw(draw).astype(np.int64)
+        drawn_books = book_draws.draw(draw).astype(np.int64)
+        keys = np.unique(np.concatenate([keys, drawn_users * books + drawn_books]))
+    keys = rng.permutation(keys)[:count]
+    keys.sort()
+    return keys // books, keys % books
+
+
+class Loader:
+    """executemany in chunks on one raw DBAPI connection."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.dialect = engine.dialect.name
+        self.connection = engine.raw_connection()
+        self.cursor = self.connection.cursor()
+        if self.dialect == "sqlite":
+            self.cursor.execute("PRAGMA journal_mode = OFF")
+            self.cursor.execute("PRAGMA synchronous = OFF")
+        elif self.dialect == "mssql":
+            self.cursor.fast_executemany = True
+        self.placeholder = "?" if engine.dialect.paramstyle == "qmark" else "%s"
+
+    def insert(self, table, columns, rows, identity=False):
+        """`identity`: the rows carry explicit values for the table's autoincrementing id."""
+        sql = (
+            f"INSERT INTO {table} ({', '.join(columns)}) "
+            f"VALUES ({', '.join([self.placeholder] * len(columns))})"
+        )
+        # Explicit values for an IDENTITY column are rejected unless enabled,
+        # for one table of the session at a time.
+        identity_insert = identity and self.dialect == "mssql"
+        if identity_insert:
+            self.cursor.execute(f"SET IDENTITY_INSERT {table} ON")
+        try:
+            for start in range(0, len(rows), CHUNK):
+                self.cursor.executemany(sql, rows[start:start + CHUNK])
+        finally:
+            if identity_insert:
+                self.cursor.execute(f"SET IDENTITY_INSERT {table} OFF")
+        if identity and self.dialect == "postgresql":
+            # The sequence does not see explicit ids; move it past them.
+            self.cursor.execute(
+                f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), MAX(id)) FROM {table} HAVING MAX(id) IS NOT NULL"
+            )
+        self.connection.commit()
+
+    def close(self):
+        self.cursor.close()
+        self.connection.close()
+
+
+def _progress(label: str, count: int, started: float):
+    print(f"{label:<10} {count:>12,} rows  {time.perf_counter() - started:7.1f}s", flush=True)
+
+
+def generate(database_url: str, args):
+    os.environ["DATABASE_URL"] = database_url
+    sys.path.insert(0, str(APP_DIR))
+    from core.database import Base, engine, migrate
+    from core.security import hash_password
+    import models  # noqa: F401
+
+    migrate()
+    # Build secondary indexes once at the end instead of maintaining them per row.
+    indexes = [index for table in Base.metadata.sorted_tables for index in table.indexes]
+    with engine.begin() as connection:
+        for index in indexes:
+            index.drop(connection)
+
+    rng = np.random.default_rng(args.seed)
+    loader = Loader(engine)
+    started = time.perf_counter()
+    now = datetime.utcnow().replace(microsecond=0)
+
+    loader.insert("roles", ["id", "name"], [(1, "admin"), (2, "user")], identity=True)
+    loader.insert("genres", ["id", "name"], [(i + 1, f"Genre {i}") for i in range(args.genres)], identity=True)
+    _progress("genres", args.genres, started)
+    loader.insert("authors", ["id", "name", "info"], [(i + 1, f"Author {i}", f"Biography of Author {i}") for i in range(args.authors)],
+                  identity=True)
+    _progress("authors", args.authors, started)
+
+    favorite_users, favorite_books = unique_pairs(rng, args.favorites, args.users, args.books, 1.0, args.book_skew)
+    favorites_count = np.bincount(favorite_books, minlength=args.books)
+
+    author_draws = Skewed(rng, args.authors, args.author_skew)
+    genre_draws = Skewed(rng, args.genres, 0.8)
+    for start in range(0, args.books, CHUNK * 4):
+        n = min(CHUNK * 4, args.books - start)
+        authors = author_draws.draw(n) + 1
+        genres = genre_draws.draw(n) + 1
+        no_genre = rng.random(n) < 0.03
+        # Newer books are more common.
+        days = ((LATEST - EPOCH).days * rng.power(2, n)).astype(int)
+        prices = np.round(rng.lognormal(2.8, 0.5, n), 2)
+        words = rng.integers(0, len(TITLE_WORDS), size=(n, 2))
+        rows = [
+            (
+                f"b{start + i:07d}",
+                f"{TITLE_WORDS[words[i, 0]]} {TITLE_WORDS[words[i, 1]]} {start + i}",
+                "Lorem ipsum dolor sit amet, consectetur adipiscing elit.",
+                None if no_genre[i] else int(genres[i]),
+                int(authors[i]),
+                (EPOCH + timedelta(days=int(days[i]))).isoformat(),
+                int(favorites_count[start + i]),
+                None,
+                float(prices[i]),
+                now.isoformat(sep=" "),
+            )
+            for i in range(n)
+        ]
+        loader.insert("books", ["id", "title", "description", "genre_id", "author_id", "release_date",
+                                "favorites_count", "img", "price", "updated_at"], rows)
+    _progress("books", args.books, started)
+
+    hashed = hash_password(PASSWORD)
+    for start in range(0, args.users, CHUNK * 4):
+        stop = min(start + CHUNK * 4, args.users)
+        loader.insert("users", ["id", "nickname", "email", "hashed_password", "role_id"],
+                      [(i + 1, f"user{i}", f"user{i}@bench.local", hashed, 2) for i in range(start, stop)],
+                      identity=True)
+    _progress("users", args.users, started)
+
+    for start in range(0, len(favorite_users), CHUNK * 4):
+        users = favorite_users[start:start + CHUNK * 4]
+        books = favorite_books[start:start + CHUNK * 4]
+        # Exponential age: most favorites are recent.
+        ages = rng.exponential(args.favorite_age_days * 86400, len(users)).astype(np.int64)
+        rows = [
+            (int(users[i]) + 1, f"b{int(books[i]):07d}", (now - timedelta(seconds=int(ages[i]))).isoformat(sep=" "))
+            for i in range(len(users))
+        ]
+        loader.insert("favorites", ["user_id", "book_id", "created_at"], rows)
+    _progress("favorites", len(favorite_users), started)
+
+    basket_users, basket_books = unique_pairs(rng, args.baskets, args.users, args.books, 1.0, args.book_skew)
+    quantities = rng.integers(1, 4, len(basket_users))
+    statuses = rng.choice(["active", "removed", "purchased"], size=len(basket_users), p=[0.6, 0.1, 0.3])
+    loader.insert("baskets", ["user_id", "book_id", "quantity", "status"], [
+        (int(basket_users[i]) + 1, f"b{int(basket_books[i]):07d}", int(quantities[i]), str(statuses[i]))
+        for i in range(len(basket_users))
+    ])
+    _progress("baskets", len(basket_users), started)
+    loader.close()
+
+    with engine.begin() as connection:
+        for index in indexes:
+            index.create(connection)
+    _progress("indexes", len(indexes), started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database", required=True, help="SQLAlchemy URL of an empty database")
+    parser.add_argument("--books", type=int, default=1_000_000)
+    parser.add_argument("--authors", type=int, default=100_000)
+    parser.add_argument("--genres", type=int, default=50)
+    parser.add_argument("--users", type=int, default=500_000)
+    parser.add_argument("--favorites", type=int, default=10_000_000)
+    parser.add_argument("--baskets", type=int, default=1_000_000)
+    parser.add_argument("--book-skew", type=float, default=0.9, help="Zipf exponent of book popularity")
+    parser.add_argument("--author-skew", type=float, default=1.1, help="power-law exponent of author productivity")
+    parser.add_argument("--favorite-age-days", type=float, default=30, help="mean age of a favorite")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate(args.database, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Compares the list endpoints' old ORM-entity loading with the column
+projections in core/read_models.py on a synthetic catalog: bytes fetched
+from the database, statements run, peak Python allocation and time.
+
+    cd back/app
+    python -m benchmarks.projection --books 20000 --rows 100
+
+"Bytes" is the size of every value the statements return (text length,
+8 per number or date), measured by replaying the captured SQL on a plain
+sqlite3 connection, so it counts what the driver hands to SQLAlchemy.
+The old favorites query inner-joined genres and so skipped books without
+one; the projection lists them, hence more items.
+"""
+import argparse
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+
+def _value_size(value) -> int:
+    if value is None:
+        return 0
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return 8
+
+
+class StatementLog:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append((statement, parameters))
+
+    def bytes_fetched(self, path: str) -> int:
+        connection = sqlite3.connect(path)
+        try:
+            return sum(
+                _value_size(value)
+                for statement, parameters in self.statements
+                for row in connection.execute(statement, parameters)
+                for value in row
+            )
+        finally:
+            connection.close()
+
+
+def scenarios(rows: int, user_id: int, author_id: int):
+    from sqlalchemy import desc, select
+    from sqlalchemy.orm import contains_eager, selectinload, undefer
+
+    from core.read_models import (
+        author_book_summaries, author_books_statement, card_response, card_statement,
+        detail_response, detail_statement,
+    )
+    from models import Author, Book, Favorite, Genre
+    from schemas import Author as AuthorSchema, BookResponse, BookShopMainResponse
+
+    def listing_entities(db):
+        books = db.scalars(
+            select(Book).options(undefer(Book.description), selectinload(Book.author))
+            .order_by(desc(Book.release_date), desc(Book.id)).limit(rows)
+        ).all()
+        return [
+            BookShopMainResponse(id=book.id, title=book.title, img=book.img,
+                                 author_name=book.author.name if book.author else "Unknown Author", is_favorite=False)
+            for book in books
+        ]
+
+    def listing_projection(db):
+        books = db.execute(card_statement().order_by(desc(Book.release_date), desc(Book.id)).limit(rows)).all()
+        return [card_response(book) for book in books]
+
+    def favorites_entities(db):
+        books = db.scalars(
+            select(Book).options(undefer(Book.description))
+            .join(Favorite, Favorite.book_id == Book.id)
+            .join(Genre, Book.genre_id == Genre.id)
+            .join(Author, Book.author_id == Author.id)
+            .options(contains_eager(Book.genre), contains_eager(Book.author))
+            .where(Favorite.user_id == user_id)
+        ).all()
+        return [
+            BookResponse(id=book.id, title=book.title, description=book.description, genre_name=book.genre.name,
+                         author_name=book.author.name, release_date=str(book.release_date),
+                         favorites_count=book.favorites_count, is_favorite=True, img=book.img, price=float(book.price))
+            for book in books
+        ]
+
+    def favorites_projection(db):
+        books = db.execute(
+            detail_statement().join(Favorite, Favorite.book_id == Book.id).where(Favorite.user_id == user_id)
+        ).all()
+        return [detail_response(book, is_favorite=True) for book in books]
+
+    def author_entities(db):
+        author = db.scalar(
+            select(Author).options(selectinload(Author.books).undefer(Book.description)).where(Author.id == author_id)
+        )
+        return AuthorSchema.model_validate(author).books
+
+    def author_projection(db):
+        author = db.execute(select(Author.id, Author.name, Author.info).where(Author.id == author_id)).first()
+        books = db.execute(author_books_statement(author_id)).all()
+        return AuthorSchema(id=author.id, name=author.name, info=author.info, books=author_book_summaries(books)).books
+
+    return [
+        ("GET /shop/", listing_entities, listing_projection),
+        ("GET /shop/favorites/", favorites_entities, favorites_projection),
+        ("GET /authors/{id}", author_entities, author_projection),
+    ]
+
+
+def measure(session_factory, log: StatementLog, path: str, build, repeat: int) -> dict:
+    with session_factory() as db:
+        log.statements.clear()
+        count = len(build(db))
+        statements = len(log.statements)
+        fetched = log.bytes_fetched(path)
+
+    tracemalloc.start()
+    with session_factory() as db:
+        build(db)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        with session_factory() as db:
+            build(db)
+    elapsed = (time.perf_counter() - started) / repeat
+    return {"items": count, "statements": statements, "bytes": fetched, "peak_kb": peak / 1024, "ms": elapsed * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--books", type=int, default=20000)
+    parser.add_argument("--rows", type=int, default=100, help="page size of the listing")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    from benchmarks.catalog import CatalogSize, seed_catalog
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = f"{tmp}/projection.db"
+        seed_catalog(f"sqlite:///{path}", CatalogSize(
+            books=args.books, authors=max(args.books // 100, 1), users=50, favorites=args.books // 2,
+        ))
+        from sqlalchemy import func, select
+
+        from core.database import SessionLocal, engine
+        from models import Book, Favorite
+
+        with SessionLocal() as db:
+            user_id = db.scalar(select(Favorite.user_id).group_by(Favorite.user_id).order_by(func.count().desc()).limit(1))
+            author_id = db.scalar(select(Book.author_id).group_by(Book.author_id).order_by(func.count().desc()).limit(1))
+        log = StatementLog(engine)
+
+        print(f"{'endpoint':<22}{'loading':<12}{'items':>6}{'stmts':>6}{'bytes':>10}{'peak KiB':>10}{'ms':>8}")
+        for name, entities, projection in scenarios(args.rows, user_id, author_id):
+            for label, build in (("entities", entities), ("projection", projection)):
+                result = measure(SessionLocal, log, path, build, args.repeat)
+                print(f"{name:<22}{label:<12}{result['items']:>6}{result['statements']:>6}{result['bytes']:>10,}"
+                      f"{result['peak_kb']:>10.0f}{result['ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
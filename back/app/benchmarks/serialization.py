@@ -0,0 +1,135 @@
+"""
+Compares how the shop read endpoints turn built responses into bytes:
+
+- validated: models built with validation, then FastAPI's response_model
+  handling (validate again, convert to plain Python) and json.dumps. This is
+  what every route did before core/responses.py.
+- response_model: the read_models builders (model_construct), still handed
+  to FastAPI; what FAST_JSON=0 does.
+- fast: the same builders rendered by core.responses.FastJSON.
+
+    cd back/app
+    python -m benchmarks.serialization --rows 100
+
+No database is queried: the rows are synthetic result tuples shaped like
+the read_models statements. Importing the app's models still configures an
+engine, so DATABASE_URL is pointed at an in-memory SQLite database that is
+never opened. The validated builders are emulated by validating the fields
+of a constructed model, so they also pay for one model_construct. All three
+paths must produce the same bytes.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import namedtuple
+from datetime import date
+from decimal import Decimal
+from typing import List
+
+from benchmarks.async_db import APP_DIR
+
+CardRow = namedtuple("CardRow", "id title img author_name release_date favorites_count")
+DetailRow = namedtuple(
+    "DetailRow", "id title description genre_name author_name release_date favorites_count img price"
+)
+
+
+def _validated(builder):
+    def build(*args, **kwargs):
+        model = builder(*args, **kwargs)
+        return type(model)(**model.__dict__)
+    return build
+
+
+def scenarios(rows: int):
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, str(APP_DIR))
+    from core.read_models import card_response, detail_response
+    from schemas import BookResponse, BookShopMainResponse, BookShopPage
+
+    cards = [
+        CardRow(f"book-{i:06d}", f"Title number {i}", f"{i}.jpg" if i % 3 else None, f"Author {i % 97}",
+                date(2020, 1, 1 + i % 28), i * 7 % 1000)
+        for i in range(rows)
+    ]
+    details = [
+        DetailRow(row.id, row.title, "A long description of the book. " * 20, f"Genre {i % 12}", row.author_name,
+                  row.release_date, row.favorites_count, row.img, Decimal("9.50") + i)
+        for i, row in enumerate(cards)
+    ]
+    favorites = {row.id for row in cards[::4]}
+
+    def card_list(card):
+        return [card(row, favorites) for row in cards]
+
+    def card_page(card):
+        return BookShopPage(items=card_list(card), next_cursor="WyIyMDIwLTAxLTAxIiwgImJvb2stMDAwMDk5Il0")
+
+    def detail_list(detail):
+        return [detail(row, is_favorite=row.id in favorites) for row in details]
+
+    return [
+        ("GET /shop/", List[BookShopMainResponse], lambda build: card_list(build), card_response),
+        ("GET /shop/page", BookShopPage, lambda build: card_page(build), card_response),
+        ("GET /shop/favorites/", List[BookResponse], lambda build: detail_list(build), detail_response),
+    ]
+
+
+def renderers(response_type):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_model_field
+
+    from core.responses import FastJSON, ModelJSONResponse
+
+    field = create_model_field(name="Response", type_=response_type, mode="serialization")
+    fast = FastJSON(response_type)
+
+    async def through_response_model(content) -> bytes:
+        return JSONResponse(await serialize_response(field=field, response_content=content)).body
+
+    async def through_fast_json(content) -> bytes:
+        return ModelJSONResponse(content, fast.adapter).body
+
+    return through_response_model, through_fast_json
+
+
+async def measure(make, render, repeat: int) -> tuple:
+    body = await render(make())
+    started = time.perf_counter()
+    for _ in range(repeat):
+        await render(make())
+    return body, (time.perf_counter() - started) / repeat * 1000
+
+
+async def run(rows: int, repeat: int):
+    print(f"{'endpoint':<22}{'path':<16}{'bytes':>9}{'ms':>8}{'speedup':>9}")
+    for name, response_type, make, builder in scenarios(rows):
+        through_response_model, through_fast_json = renderers(response_type)
+        paths = [
+            ("validated", lambda: make(_validated(builder)), through_response_model),
+            ("response_model", lambda: make(builder), through_response_model),
+            ("fast", lambda: make(builder), through_fast_json),
+        ]
+        bodies, baseline = set(), None
+        for label, build, render in paths:
+            body, ms = await measure(build, render, repeat)
+            bodies.add(body)
+            baseline = baseline or ms
+            print(f"{name:<22}{label:<16}{len(body):>9,}{ms:>8.3f}{baseline / ms:>8.1f}x")
+        if len(bodies) != 1:
+            raise SystemExit(f"{name}: the paths rendered different bodies")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100, help="items per response")
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""
+Mixed-workload load test of the shop API.
+
+Seeds a synthetic catalog into a throwaway SQLite database, starts uvicorn
+with SQL instrumentation on every request and keeps `--concurrency` virtual
+users busy for `--duration` seconds. Each virtual user repeatedly picks a
+scenario (weights in --mix):
+
+  browse    anonymous catalog pages, book pages, genres and authors
+  search    filtered, sorted and keyset-paginated listings
+  churn     logged-in favorite/unfavorite, basket add/remove, batch moves, basket and favorites views
+  purchase  fill the basket, buy it and look at the order history
+
+Reports p50/p95/p99 latency, throughput and queries per request per
+operation; --output writes the report as JSON and --compare diffs it with
+an earlier report.
+
+    cd back/app
+    python -m benchmarks.shop_load --duration 30 --output before.json
+    python -m benchmarks.shop_load --duration 30 --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.async_db import APP_DIR, wait_until_up
+from benchmarks.catalog import Catalog, CatalogSize, seed_catalog
+
+_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.queries: Dict[str, List[int]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, client: httpx.AsyncClient, name: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.statuses[name]["transport_error"] += 1
+            return None
+        self.latencies[name].append(time.perf_counter() - started)
+        self.statuses[name][str(response.status_code)] += 1
+        match = _QUERIES.search(response.headers.get("server-timing", ""))
+        if match:
+            self.queries[name].append(int(match.group(1)))
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        operations = {}
+        for name in sorted(self.statuses):
+            operations[name] = _summary(self.latencies[name], self.queries[name], self.statuses[name], elapsed)
+        everything = [value for values in self.latencies.values() for value in values]
+        queries = [value for values in self.queries.values() for value in values]
+        statuses = defaultdict(int)
+        for counts in self.statuses.values():
+            for status, count in counts.items():
+                statuses[status] += count
+        return {"overall": _summary(everything, queries, statuses, elapsed), "operations": operations}
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _summary(latencies: List[float], queries: List[int], statuses: Dict[str, int], elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if not status.isdigit() or status.startswith("5"))
+    return {
+        "requests": len(ordered),
+        "errors": errors,
+        "statuses": dict(sorted(statuses.items())),
+        "rps": round(len(ordered) / elapsed, 1),
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 2),
+        "p95_ms": round(_percentile(ordered, 0.95) * 1000, 2),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 2),
+        "queries_per_request": round(sum(queries) / len(queries), 2) if queries else None,
+    }
+
+
+async def browse(client, recorder: Recorder, rng: random.Random, catalog: Catalog, headers):
+    await recorder.call(client, "GET /shop/", "GET", "/shop/", params={"limit": 20, "offset": rng.randrange(0, 200, 20)})
+    await recorder.call(client, "GET /shop/book/{id}", "GET", f"/shop/book/{rng.choice(catalog.book_ids)}")
+    if rng.random() < 0.3:
+        await recorder.call(client, "GET /genres/", "GET", "/genres/")
+    if rng.random() < 0.2:
+        await recorder.call(client, "GET /authors/", "GET", "/authors/")
+
+
+async def search(client, recorder: Recorder, rng: random.Random, catalog: Catalog, headers):
+    choice = rng.random()
+    if choice < 0.25:
+        params = {"title": rng.choice(["river", "night", "glass", "iron sum", "kingdom 1"])}
+        name = "GET /shop/?title"
+    elif choice < 0.45:
+        params = {"genre_name": rng.choice(catalog.genre_names), "sort_by": "popularity"}
+        name = "GET /shop/?genre&popularity"
+    elif choice < 0.6:
+        params = {"sort_by": "trending"}
+        name = "GET /shop/?trending"
+    elif choice < 0.8:
+        year = rng.randrange(1990, 2022)
+        params = {"year_from": year, "year_to": year + 2, "price_max": 30}
+        name = "GET /shop/?years&price"
+    else:
+        params = {"author_name": rng.choice(catalog.author_names)}
+        name = "GET /shop/?author"
+    await recorder.call(client, name, "GET", "/shop/", params=params, headers=headers)
+
+    cursor = None
+    for _ in range(rng.randint(1, 3)):
+        params = {"sort_by": "popularity", "limit": 20, **({"cursor": cursor} if cursor else {})}
+        response = await recorder.call(client, "GET /shop/page", "GET", "/shop/page", params=params)
+        cursor = response.json().get("next_cursor") if response is not None and response.status_code == 200 else None
+        if not cursor:
+            break
+
+
+async def churn(client, recorder: Recorder, rng: random.Random, catalog: Catalog, headers):
+    book_id = rng.choice(catalog.book_ids)
+    if rng.random() < 0.6:
+        await recorder.call(client, "POST /shop/favorites/{id}", "POST", f"/shop/favorites/{book_id}", headers=headers)
+    else:
+        await recorder.call(client, "DELETE /shop/favorites/{id}", "DELETE", f"/shop/favorites/{book_id}", headers=headers)
+    book_id = rng.choice(catalog.book_ids)
+    await recorder.call(client, "POST /shop/basket/{id}", "POST", f"/shop/basket/{book_id}", headers=headers)
+    if rng.random() < 0.3:
+        await recorder.call(client, "DELETE /shop/basket/{id}", "DELETE", f"/shop/basket/{book_id}", headers=headers)
+    if rng.random() < 0.2:
+        # "Move favorites to basket" for a few books in one request.
+        operations = [
+            {"op": op, "book_id": book_id}
+            for book_id in rng.sample(catalog.book_ids, 5)
+            for op in ("basket_add", "unfavorite")
+        ]
+        await recorder.call(client, "POST /shop/batch", "POST", "/shop/batch", json={"operations": operations}, headers=headers)
+    await recorder.call(client, "GET /shop/basket/", "GET", "/shop/basket/", headers=headers)
+    if rng.random() < 0.3:
+        await recorder.call(client, "GET /shop/favorites/", "GET", "/shop/favorites/", headers=headers)
+
+
+async def purchase(client, recorder: Recorder, rng: random.Random, catalog: Catalog, headers):
+    for book_id in rng.sample(catalog.book_ids, 2):
+        await recorder.call(client, "POST /shop/basket/{id}", "POST", f"/shop/basket/{book_id}", headers=headers)
+    await recorder.call(client, "POST /shop/basket/purchase", "POST", "/shop/basket/purchase", headers=headers)
+    if rng.random() < 0.5:
+        await recorder.call(client, "GET /shop/orders/", "GET", "/shop/orders/", headers=headers)
+
+
+SCENARIOS = {"browse": browse, "search": search, "churn": churn, "purchase": purchase}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def drive(base_url: str, catalog: Catalog, tokens: List[str], args) -> dict:
+    mix = parse_mix(args.mix)
+    names, weights = list(mix), list(mix.values())
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    deadline = time.perf_counter() + args.duration
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        async def virtual_user(n: int):
+            rng = random.Random(args.seed * 1000003 + n)
+            headers = {"Authorization": f"Bearer {tokens[n % len(tokens)]}"}
+            while time.perf_counter() < deadline:
+                scenario = SCENARIOS[rng.choices(names, weights)[0]]
+                anonymous = scenario is browse and rng.random() < 0.7
+                await scenario(client, recorder, rng, catalog, {} if anonymous else headers)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(n) for n in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+    return recorder.report(elapsed)
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> bool:
+    """Print per-operation deltas; False when some p95 got worse than `tolerance`."""
+    ok = True
+    print(f"{'operation':<34} {'p95 before':>11} {'p95 now':>9} {'change':>8} {'rps change':>11}")
+    rows = [("overall", report["overall"], baseline.get("overall"))]
+    rows += [(name, stats, baseline.get("operations", {}).get(name)) for name, stats in report["operations"].items()]
+    for name, now, before in rows:
+        if not before or not before["p95_ms"]:
+            print(f"{name:<34} {'-':>11} {now['p95_ms']:>9}")
+            continue
+        change = now["p95_ms"] / before["p95_ms"] - 1
+        rps_change = now["rps"] / before["rps"] - 1 if before["rps"] else 0.0
+        flag = ""
+        if change > tolerance:
+            ok = False
+            flag = "  REGRESSION"
+        print(f"{name:<34} {before['p95_ms']:>11} {now['p95_ms']:>9} {change:>+8.0%} {rps_change:>+11.0%}{flag}")
+    return ok
+
+
+def print_report(report: dict):
+    print(f"{'operation':<34} {'requests':>8} {'errors':>6} {'rps':>7} {'p50':>7} {'p95':>7} {'p99':>7} {'q/req':>6}")
+    rows = [("overall", report["overall"])] + list(report["operations"].items())
+    for name, stats in rows:
+        queries = stats["queries_per_request"]
+        print(
+            f"{name:<34} {stats['requests']:>8} {stats['errors']:>6} {stats['rps']:>7} {stats['p50_ms']:>7} "
+            f"{stats['p95_ms']:>7} {stats['p99_ms']:>7} {queries if queries is not None else '-':>6}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    defaults = CatalogSize()
+    for name in ("books", "authors", "genres", "users", "favorites", "baskets", "seed"):
+        parser.add_argument(f"--{name}", type=int, default=getattr(defaults, name))
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--mix", default="browse=5,search=3,churn=2,purchase=1")
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--database", help="SQLAlchemy URL of an already seeded database (skips seeding)")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="JSON report of an earlier run to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 slowdown before --compare fails")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database or f"sqlite:///{tmp}/load.db"
+        size = CatalogSize(**{name: getattr(args, name) for name in CatalogSize.__dataclass_fields__})
+        if args.database:
+            os.environ["DATABASE_URL"] = database_url
+            sys.path.insert(0, str(APP_DIR))
+            catalog = Catalog(
+                book_ids=[f"b{i:07d}" for i in range(size.books)],
+                genre_names=[f"Genre {i}" for i in range(size.genres)],
+                author_names=[f"Author {i}" for i in range(size.authors)],
+                user_emails=[f"user{i}@bench.local" for i in range(size.users)],
+            )
+        else:
+            catalog = seed_catalog(database_url, size)
+
+        from utils.jwt import create_access_token
+        tokens = [create_access_token({"sub": email}) for email in catalog.user_emails]
+
+        env = dict(os.environ, DATABASE_URL=database_url, SQL_INSTRUMENT_SAMPLE_RATE="1", SQL_SLOW_REQUEST_MS="1e9",
+                   SQL_MAX_STATEMENTS="1000000", SQL_REPEAT_THRESHOLD="1000000")
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=APP_DIR, env=env, stdout=subprocess.DEVNULL,
+        )
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            wait_until_up(base_url, timeout=120)
+            report = asyncio.run(drive(base_url, catalog, tokens, args))
+        finally:
+            server.terminate()
+            server.wait()
+
+    report["config"] = {**vars(args), "python": sys.version.split()[0]}
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as out:
+            json.dump(report, out, indent=2)
+    if args.compare:
+        with open(args.compare) as baseline:
+            if not compare(report, json.load(baseline), args.tolerance):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
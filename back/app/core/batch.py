@@ -0,0 +1,123 @@
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import delete, select
+
+from core.counters import favorites_counter
+from core.ranking import ranking
+from models import Basket, BasketStatus, Book, Favorite
+from schemas import BatchOperation, BatchResult
+
+
+class _Batch:
+    """
+    State of one batch: the rows of every book it mentions, loaded with one
+    query per table, and the favorites it adds or removes. Operations apply
+    in order, so later ones see the effect of earlier ones.
+    """
+
+    def __init__(self, db, user_id: int, books: set, baskets: Dict[str, Basket], favorites: Dict[str, Favorite]):
+        self.db = db
+        self.user_id = user_id
+        self.books = books
+        self.baskets = baskets
+        self.favorites = favorites
+        self.added_favorites: Dict[str, Favorite] = {}
+        self.removed_favorites: List[Favorite] = []
+        self.deltas: Dict[str, int] = defaultdict(int)
+
+    def basket_add(self, book_id: str, quantity) -> Tuple[int, str]:
+        if book_id not in self.books:
+            return 404, "Book not found"
+        item = self.baskets.get(book_id)
+        if item is None:
+            item = self.baskets[book_id] = Basket(
+                user_id=self.user_id, book_id=book_id, status=BasketStatus.active, quantity=quantity or 1
+            )
+            self.db.add(item)
+            return 200, f"Book {book_id} added to basket"
+        if item.status == BasketStatus.active:
+            return 400, "Book already in basket"
+        item.status = BasketStatus.active
+        item.quantity = quantity or 1
+        return 200, f"Book {book_id} restored to basket"
+
+    def basket_set(self, book_id: str, quantity) -> Tuple[int, str]:
+        if quantity is None:
+            return 400, "quantity is required"
+        item = self.baskets.get(book_id)
+        if item is None or item.status != BasketStatus.active:
+            return 404, "Book not found in basket"
+        item.quantity = quantity
+        return 200, f"Quantity of book {book_id} set to {quantity}"
+
+    def basket_remove(self, book_id: str, quantity) -> Tuple[int, str]:
+        item = self.baskets.get(book_id)
+        if item is None or item.status != BasketStatus.active:
+            return 404, "Book not found in basket"
+        item.status = BasketStatus.removed
+        return 200, f"Book {book_id} removed from basket"
+
+    def favorite(self, book_id: str, quantity) -> Tuple[int, str]:
+        if book_id not in self.books:
+            return 404, "Book not found"
+        if book_id in self.favorites or book_id in self.added_favorites:
+            return 400, "Book already in favorites"
+        self.added_favorites[book_id] = Favorite(user_id=self.user_id, book_id=book_id)
+        self.deltas[book_id] += 1
+        return 200, f"Book {book_id} added to favorites"
+
+    def unfavorite(self, book_id: str, quantity) -> Tuple[int, str]:
+        if self.added_favorites.pop(book_id, None) is None:
+            favorite = self.favorites.pop(book_id, None)
+            if favorite is None:
+                return 404, "Book not in favorites"
+            self.removed_favorites.append(favorite)
+        self.deltas[book_id] -= 1
+        return 200, f"Book {book_id} removed from favorites"
+
+
+async def apply_batch(db, user_id: int, operations: List[BatchOperation]) -> List[BatchResult]:
+    """
+    Applies basket and favorites operations in one transaction, with one
+    existence query per table however many books are involved. Operations
+    that fail (unknown book, already in favorites, ...) are reported per item
+    and do not stop the others; only a failed commit fails the whole batch.
+    """
+    book_ids = {operation.book_id for operation in operations}
+    books = set((await db.scalars(select(Book.id).where(Book.id.in_(book_ids)))).all())
+    baskets = (await db.scalars(select(Basket).where(Basket.user_id == user_id, Basket.book_id.in_(book_ids)))).all()
+    favorites = (await db.scalars(select(Favorite).where(Favorite.user_id == user_id, Favorite.book_id.in_(book_ids)))).all()
+    batch = _Batch(
+        db, user_id, books,
+        {item.book_id: item for item in baskets},
+        {favorite.book_id: favorite for favorite in favorites},
+    )
+
+    results = []
+    for operation in operations:
+        status, detail = getattr(batch, operation.op)(operation.book_id, operation.quantity)
+        results.append(BatchResult(op=operation.op, book_id=operation.book_id, status=status, detail=detail))
+
+    try:
+        if batch.removed_favorites:
+            # Deleted before the new rows are flushed, so unfavorite + favorite of one book does not collide.
+            await db.execute(
+                delete(Favorite).where(Favorite.id.in_([favorite.id for favorite in batch.removed_favorites]))
+                .execution_options(synchronize_session=False)
+            )
+            for favorite in batch.removed_favorites:
+                db.expunge(favorite)
+        db.add_all(list(batch.added_favorites.values()))
+        await favorites_counter.apply_many(db, batch.deltas)
+        await db.commit()
+    except Exception:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to apply batch")
+    favorites_counter.committed_many(batch.deltas)
+    for favorite in batch.added_favorites.values():
+        ranking.record(favorite.book_id, 1, favorite.created_at)
+    for favorite in batch.removed_favorites:
+        ranking.record(favorite.book_id, -1, favorite.created_at)
+    return results
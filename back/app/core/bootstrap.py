@@ -0,0 +1,138 @@
+"""
+Schema and seed-data work that is needed once per deploy, not once per worker,
+plus a breakdown of how long a worker takes to start.
+
+    cd back/app
+    python -m core.bootstrap          # migrate to head and seed the roles
+
+STARTUP_BOOTSTRAP picks what each worker does on startup:
+
+    "run"     check the schema (migrating with DB_AUTO_MIGRATE=1) and seed, in every worker
+    "leader"  the first worker on the host to lock STARTUP_LOCK_FILE does it; workers
+              starting within STARTUP_BOOTSTRAP_FRESH_SECONDS of that skip it
+    "skip"    nothing; the deploy runs `python -m core.bootstrap` before the workers
+"""
+import json
+import logging
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+STARTUP_BOOTSTRAP = os.getenv("STARTUP_BOOTSTRAP", "run")
+STARTUP_LOCK_FILE = os.getenv("STARTUP_LOCK_FILE", str(Path(tempfile.gettempdir()) / "rebook-bootstrap.lock"))
+STARTUP_BOOTSTRAP_FRESH_SECONDS = float(os.getenv("STARTUP_BOOTSTRAP_FRESH_SECONDS", "300"))
+# A worker that takes longer than this to start logs a warning with the breakdown.
+STARTUP_TARGET_MS = float(os.getenv("STARTUP_TARGET_MS", "3000"))
+
+
+class StartupReport:
+    """Seconds spent per startup phase of this worker, in order."""
+
+    def __init__(self):
+        self.phases: Dict[str, float] = {}
+        self.bootstrap = None
+
+    def record(self, name: str, seconds: float):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - started)
+
+    @property
+    def total(self) -> float:
+        return sum(self.phases.values())
+
+    def log(self):
+        breakdown = ", ".join(f"{name} {seconds * 1000:.0f}" for name, seconds in self.phases.items())
+        message = f"Worker started in {self.total * 1000:.0f} ms ({breakdown}; bootstrap: {self.bootstrap})"
+        if self.total * 1000 > STARTUP_TARGET_MS:
+            logger.warning(f"{message}, over the {STARTUP_TARGET_MS:.0f} ms target")
+        else:
+            logger.info(message)
+
+
+startup_report = StartupReport()
+
+
+def bootstrap(migrate_schema: bool = False):
+    """Bring the schema to head (or just check it) and seed the lookup rows. Idempotent."""
+    from core.database import SessionLocal, migrate, verify_schema
+    import core.crud as crud
+
+    if migrate_schema:
+        migrate()
+    else:
+        verify_schema()
+    with SessionLocal() as db:
+        crud.init_statuses(db)
+
+
+def _database_id() -> str:
+    from core.database import engine
+
+    return engine.url.render_as_string(hide_password=True)
+
+
+@contextmanager
+def _host_lock(path: str):
+    try:
+        import fcntl
+    except ImportError:
+        # No flock (Windows): every worker bootstraps, as with "run".
+        with open(path, "a+") as handle:
+            yield handle
+        return
+    with open(path, "a+") as handle:
+        fcntl.flock(handle, fcntl.LOCK_EX)
+        try:
+            yield handle
+        finally:
+            fcntl.flock(handle, fcntl.LOCK_UN)
+
+
+def _bootstrap_as_leader() -> str:
+    """Bootstrap under the host lock unless another worker finished recently against the same database."""
+    database = _database_id()
+    with _host_lock(STARTUP_LOCK_FILE) as handle:
+        handle.seek(0)
+        try:
+            stamp = json.loads(handle.read() or "{}")
+        except ValueError:
+            stamp = {}
+        if stamp.get("database") == database and time.time() - stamp.get("finished_at", 0) < STARTUP_BOOTSTRAP_FRESH_SECONDS:
+            return f"skipped, done by pid {stamp.get('pid')}"
+        bootstrap()
+        handle.seek(0)
+        handle.truncate()
+        handle.write(json.dumps({"database": database, "finished_at": time.time(), "pid": os.getpid()}))
+        handle.flush()
+        return "leader"
+
+
+def startup_bootstrap():
+    """The STARTUP_BOOTSTRAP part of a worker's startup."""
+    with startup_report.phase("bootstrap"):
+        if STARTUP_BOOTSTRAP == "skip":
+            startup_report.bootstrap = "skipped"
+        elif STARTUP_BOOTSTRAP == "leader":
+            startup_report.bootstrap = _bootstrap_as_leader()
+        else:
+            bootstrap()
+            startup_report.bootstrap = "run"
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    bootstrap(migrate_schema=True)
+    logger.info(f"Bootstrap finished in {(time.perf_counter() - started) * 1000:.0f} ms")
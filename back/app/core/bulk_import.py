@@ -0,0 +1,198 @@
+import io
+import logging
+import threading
+import time
+import uuid
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from models import Author, Book, Genre
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["id", "title", "description", "author_name", "genre_name", "release_date", "price"]
+REQUIRED = ["id", "title", "description", "author_name", "price"]
+CHUNK_SIZE = 1000
+# Keeps IN (...) lists under the MSSQL 2100 parameter limit.
+LOOKUP_CHUNK = 1000
+
+
+class ImportJob:
+    def __init__(self, total: int = 0):
+        self.id = uuid.uuid4().hex
+        self.status = "pending"
+        self.total = total
+        self.processed = 0
+        self.inserted = 0
+        self.authors_created = 0
+        self.genres_created = 0
+        self.errors: List[dict] = []
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def report(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "inserted": self.inserted,
+            "authors_created": self.authors_created,
+            "genres_created": self.genres_created,
+            "errors": self.errors,
+            "elapsed": round((self.finished_at or time.time()) - self.started_at, 3),
+        }
+
+
+# Jobs live in the worker that accepted the upload; poll with sticky routing.
+_jobs: Dict[str, ImportJob] = {}
+_jobs_lock = threading.Lock()
+
+
+def register_job(job: ImportJob) -> ImportJob:
+    with _jobs_lock:
+        _jobs[job.id] = job
+    return job
+
+
+def get_job(job_id: str) -> Optional[ImportJob]:
+    return _jobs.get(job_id)
+
+
+def read_feed(content: bytes, fmt: str) -> "pd.DataFrame":
+    # pandas takes about half a second to import; only admin imports need it.
+    import pandas as pd
+
+    if fmt == "csv":
+        frame = pd.read_csv(io.BytesIO(content), dtype=str, keep_default_na=False)
+    elif fmt == "jsonl":
+        frame = pd.read_json(io.BytesIO(content), lines=True, dtype=False)
+    else:
+        raise ValueError("Unsupported format, use csv or jsonl")
+
+    missing = [column for column in REQUIRED if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    for column in COLUMNS:
+        if column not in frame.columns:
+            frame[column] = ""
+    frame = frame[COLUMNS].fillna("").astype(str)
+    for column in COLUMNS:
+        frame[column] = frame[column].str.strip()
+
+    frame["release_date_parsed"] = pd.to_datetime(frame["release_date"], format="%Y-%m-%d", errors="coerce")
+    frame["price_parsed"] = pd.to_numeric(frame["price"], errors="coerce")
+    return frame
+
+
+def _validate(frame: "pd.DataFrame", job: ImportJob) -> List[dict]:
+    import pandas as pd
+
+    rows = []
+    seen = set()
+    for index, row in enumerate(frame.itertuples(index=False), start=1):
+        error = None
+        if not all(getattr(row, column) for column in REQUIRED):
+            error = "Missing required field"
+        elif len(row.id) > 20:
+            error = "id is longer than 20 characters"
+        elif row.id in seen:
+            error = "Duplicate id in feed"
+        elif row.release_date and pd.isna(row.release_date_parsed):
+            error = "Invalid release_date format. Use YYYY-MM-DD"
+        elif pd.isna(row.price_parsed) or row.price_parsed < 0:
+            error = "Invalid price"
+
+        if error:
+            job.errors.append({"row": index, "id": row.id, "error": error})
+            continue
+        seen.add(row.id)
+        rows.append({
+            "row": index,
+            "id": row.id,
+            "title": row.title,
+            "description": row.description,
+            "author_name": row.author_name,
+            "genre_name": row.genre_name or None,
+            "release_date": None if pd.isna(row.release_date_parsed) else row.release_date_parsed.date(),
+            "price": float(row.price_parsed),
+        })
+    return rows
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _resolve_names(db: Session, model, names: set) -> Tuple[Dict[str, int], int]:
+    """Map names to ids, inserting the missing ones with one executemany."""
+    ids = {}
+    for chunk in _chunks(sorted(names), LOOKUP_CHUNK):
+        ids.update(db.execute(select(model.name, model.id).where(model.name.in_(chunk))).all())
+
+    missing = [name for name in names if name not in ids]
+    if missing:
+        db.execute(insert(model), [{"name": name} for name in missing])
+        for chunk in _chunks(missing, LOOKUP_CHUNK):
+            ids.update(db.execute(select(model.name, model.id).where(model.name.in_(chunk))).all())
+    return ids, len(missing)
+
+
+def run_import(db: Session, frame: "pd.DataFrame", job: ImportJob) -> ImportJob:
+    job.status = "running"
+    job.total = len(frame)
+    try:
+        rows = _validate(frame, job)
+        job.processed = job.total - len(rows)
+
+        existing = set()
+        for chunk in _chunks([row["id"] for row in rows], LOOKUP_CHUNK):
+            existing.update(db.scalars(select(Book.id).where(Book.id.in_(chunk))).all())
+        # Rejected before resolving names, so they leave no author or genre behind.
+        for row in rows:
+            if row["id"] in existing:
+                job.errors.append({"row": row["row"], "id": row["id"], "error": "Book with this ID already exists"})
+        job.processed += len(existing)
+        rows = [row for row in rows if row["id"] not in existing]
+
+        author_ids, job.authors_created = _resolve_names(db, Author, {row["author_name"] for row in rows})
+        genre_ids, job.genres_created = _resolve_names(db, Genre, {row["genre_name"] for row in rows if row["genre_name"]})
+        db.commit()
+
+        for chunk in _chunks(rows, CHUNK_SIZE):
+            books = [{
+                "id": row["id"],
+                "title": row["title"],
+                "description": row["description"],
+                "author_id": author_ids[row["author_name"]],
+                "genre_id": genre_ids.get(row["genre_name"]),
+                "release_date": row["release_date"],
+                "favorites_count": 0,
+                "img": None,
+                "price": row["price"],
+            } for row in chunk]
+            try:
+                db.execute(insert(Book), books)
+                db.commit()
+                job.inserted += len(books)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Import chunk failed: {str(e)}")
+                job.errors.extend({"row": row["row"], "id": row["id"], "error": "Database error"} for row in chunk)
+            job.processed += len(chunk)
+
+        job.status = "completed"
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Import failed: {str(e)}")
+        job.status = "failed"
+        job.errors.append({"row": None, "id": None, "error": str(e)})
+    finally:
+        job.finished_at = time.time()
+    return job
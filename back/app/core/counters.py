@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import os
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import bindparam, func, select, update
+from starlette.concurrency import run_in_threadpool
+
+from core.database import engine
+from models import Book, Favorite
+
+logger = logging.getLogger(__name__)
+
+# "atomic": favorites_count = favorites_count + 1 inside the request's transaction.
+# "write_behind": deltas are buffered per book and flushed in one batch every
+# FAVORITES_FLUSH_SECONDS, so a hot title is locked once per interval instead
+# of once per click. Counts lag by up to one interval.
+FAVORITES_COUNTER_MODE = os.getenv("FAVORITES_COUNTER_MODE", "atomic")
+FAVORITES_FLUSH_SECONDS = float(os.getenv("FAVORITES_FLUSH_SECONDS", "2"))
+
+
+def _increment_statement(book_id: str, delta: int):
+    return (
+        update(Book)
+        .where(Book.id == book_id)
+        .values(favorites_count=Book.favorites_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _batch_increment_statement():
+    """Executed with one parameter set per book (executemany)."""
+    return (
+        update(Book.__table__)
+        .where(Book.__table__.c.id == bindparam("b_id"))
+        .values(favorites_count=Book.__table__.c.favorites_count + bindparam("delta"))
+    )
+
+
+def _batch_parameters(deltas: Dict[str, int]) -> list:
+    return [{"b_id": book_id, "delta": delta} for book_id, delta in deltas.items()]
+
+
+class FavoritesCounter:
+    def __init__(self, mode: str, interval: float):
+        self.mode = mode
+        self.interval = interval
+        self.flushes = 0
+        self._pending: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self._task = None
+
+    @property
+    def write_behind(self) -> bool:
+        return self.mode == "write_behind"
+
+    async def apply(self, db, book_id: str, delta: int):
+        """Call before committing the favorite row."""
+        if not self.write_behind:
+            await db.execute(_increment_statement(book_id, delta))
+
+    def committed(self, book_id: str, delta: int):
+        """Call once the favorite row is committed."""
+        if self.write_behind:
+            with self._lock:
+                self._pending[book_id] += delta
+
+    async def apply_many(self, db, deltas: Dict[str, int]):
+        """apply() for several books, as one executemany."""
+        deltas = {book_id: delta for book_id, delta in deltas.items() if delta}
+        if deltas and not self.write_behind:
+            await db.execute(_batch_increment_statement(), _batch_parameters(deltas))
+
+    def committed_many(self, deltas: Dict[str, int]):
+        if self.write_behind:
+            with self._lock:
+                for book_id, delta in deltas.items():
+                    self._pending[book_id] += delta
+
+    def pending(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._pending)
+
+    def flush(self) -> int:
+        with self._lock:
+            batch = {book_id: delta for book_id, delta in self._pending.items() if delta}
+            self._pending = defaultdict(int)
+        if not batch:
+            return 0
+
+        try:
+            with engine.begin() as connection:
+                connection.execute(_batch_increment_statement(), _batch_parameters(batch))
+        except Exception as e:
+            logger.error(f"Favorites flush failed, retrying next interval: {str(e)}")
+            with self._lock:
+                for book_id, delta in batch.items():
+                    self._pending[book_id] += delta
+            return 0
+        self.flushes += 1
+        return len(batch)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await run_in_threadpool(self.flush)
+
+    def start(self):
+        if self.write_behind and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await run_in_threadpool(self.flush)
+
+    def stats(self) -> dict:
+        with self._lock:
+            buffered = sum(abs(delta) for delta in self._pending.values())
+        return {"mode": self.mode, "buffered_deltas": buffered, "flushes": self.flushes}
+
+
+favorites_counter = FavoritesCounter(FAVORITES_COUNTER_MODE, FAVORITES_FLUSH_SECONDS)
+
+
+# Books recomputed (and locked) per transaction by reconcile_favorites_count.
+RECONCILE_BATCH_SIZE = int(os.getenv("FAVORITES_RECONCILE_BATCH_SIZE", "1000"))
+
+
+def _reconcile_batch(last_id: Optional[str]):
+    """The next RECONCILE_BATCH_SIZE book ids after `last_id`, locked until the transaction ends."""
+    batch = (
+        select(Book.id)
+        .order_by(Book.id)
+        .limit(RECONCILE_BATCH_SIZE)
+        .with_for_update()
+        .with_hint(Book, "WITH (UPDLOCK, ROWLOCK)", "mssql")
+    )
+    if last_id is not None:
+        batch = batch.where(Book.id > last_id)
+    return batch
+
+
+def reconcile_favorites_count(db) -> int:
+    """
+    Recompute books.favorites_count from the favorites table; returns rows fixed.
+
+    Each batch of books is locked before it is counted (SELECT ... FOR
+    UPDATE; on MSSQL, which ignores FOR UPDATE, an UPDLOCK table hint), so a concurrent favorite either committed first and is counted,
+    or increments the recomputed value once this batch commits.
+
+    Only possible in atomic mode: with write-behind every worker holds deltas
+    for favorites already in the table, and would add them again on top of
+    the recomputed count at its next flush.
+    """
+    if favorites_counter.write_behind:
+        raise HTTPException(
+            status_code=409,
+            detail="favorites_count cannot be reconciled while workers buffer deltas (FAVORITES_COUNTER_MODE=write_behind)",
+        )
+    actual = (
+        select(func.count(Favorite.id))
+        .where(Favorite.book_id == Book.id)
+        .correlate(Book)
+        .scalar_subquery()
+    )
+    fixed, last_id = 0, None
+    while True:
+        book_ids = db.scalars(_reconcile_batch(last_id)).all()
+        if not book_ids:
+            return fixed
+        result = db.execute(
+            update(Book)
+            .where(Book.id.in_(book_ids), Book.favorites_count != actual)
+            .values(favorites_count=actual)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        fixed += result.rowcount
+        last_id = book_ids[-1]
@@ -2,14 +2,13 @@ from sqlalchemy.orm import Session
 from models import Role, Genre
 import schemas
 
-def init_statuses(db: Session):        
+def init_statuses(db: Session):
     roles = ["admin", "user"]
-    for role in roles:
-        if not db.query(Role).filter_by(name=role).first():
-            new_role = Role(name=role)
-            db.add(new_role)
-            
-    db.commit()
+    existing = {name for (name,) in db.query(Role.name).filter(Role.name.in_(roles))}
+    missing = [role for role in roles if role not in existing]
+    if missing:
+        db.add_all([Role(name=role) for role in missing])
+        db.commit()
     
 
 def get_all_genres(db: Session):
@@ -1,21 +1,277 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import FrozenResult, make_url
+from sqlalchemy.exc import DBAPIError, TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+import anyio
+import logging
 import os
+import time
+from collections import Counter
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from pathlib import Path
+from typing import Optional
 from dotenv import load_dotenv
+from core.cache import TTLCache
+from core.instrumentation import instrument, current_request
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 DATABASE_URL = os.getenv("DATABASE_URL")
+APP_DIR = Path(__file__).resolve().parent.parent
+# Startup checks the schema revision; "1" applies pending migrations instead of failing.
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "0") == "1"
+
+# "sync" serves the async routers through the threadpool on the sync engine;
+# "async" gives them a native AsyncEngine (needs an async driver installed).
+DB_MODE = os.getenv("DB_MODE", "sync")
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Reconnect after this many seconds so connections do not outlive failovers and
+# server-side idle timeouts; -1 keeps connections forever.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Test each connection with a cheap round trip on checkout and replace dead ones.
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "1") == "1"
+
+# ThreadedSession only hands a thread to a session while it runs a statement, so
+# sessions are capped at the pool capacity; otherwise sessions holding
+# connections wait for threads that are busy waiting for connections.
+SYNC_SESSION_LIMIT = int(os.getenv("DB_SYNC_SESSION_LIMIT", str(DB_POOL_SIZE + DB_MAX_OVERFLOW)))
+
+# Read-only endpoints use this database when set; unset, everything goes to DATABASE_URL.
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+# After the replica fails, reads go to the primary for this long before it is tried again.
+REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+# A client that just wrote reads from the primary for this long, so replica lag
+# cannot hide its own basket and favorites changes from it.
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+_ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "mssql+pyodbc": "mssql+aioodbc",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def _async_url(url: str) -> str:
+    scheme, sep, rest = url.partition("://")
+    return f"{_ASYNC_DRIVERS.get(scheme, scheme)}{sep}{rest}"
+
+
+def _pool_options(url: str) -> dict:
+    options = {"pool_pre_ping": DB_POOL_PRE_PING, "pool_recycle": DB_POOL_RECYCLE}
+    parsed = make_url(url)
+    # Size settings only apply to queue pools; in-memory SQLite (single
+    # connection) and aiosqlite files (NullPool) use other pools.
+    if issubclass(parsed.get_dialect().get_pool_class(parsed), QueuePool):
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    return options
+
+
+class PoolWatch:
+    """Counts checkouts that leave a pool with no idle connection and logs who took the last one."""
+
+    LOG_INTERVAL = 10
+
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self.exhausted = 0
+        self._logged_at = 0.0
+        self._unlogged = 0
+        event.listen(engine, "checkout", self._on_checkout)
 
-engine = create_engine(DATABASE_URL)
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        pool = self.engine.pool
+        capacity = getattr(pool, "_max_overflow", None)
+        if capacity is None or capacity < 0 or pool.checkedout() < pool.size() + capacity:
+            return
+        self.exhausted += 1
+        self._unlogged += 1
+        now = time.monotonic()
+        if now - self._logged_at >= self.LOG_INTERVAL:
+            logger.warning(
+                f"DB pool '{self.name}' exhausted ({pool.checkedout()} connections checked out, "
+                f"{self._unlogged} times since last report); last taken by {current_request()}"
+            )
+            self._logged_at = now
+            self._unlogged = 0
+
+    def stats(self) -> dict:
+        pool = self.engine.pool
+        stats = {"pool": type(pool).__name__, "exhausted": self.exhausted,
+                 "pre_ping": DB_POOL_PRE_PING, "recycle": DB_POOL_RECYCLE}
+        for name, attribute in (("size", "size"), ("checked_out", "checkedout"), ("checked_in", "checkedin"), ("overflow", "overflow")):
+            method = getattr(pool, attribute, None)
+            if method is not None:
+                stats[name] = method()
+        max_overflow = getattr(pool, "_max_overflow", None)
+        if max_overflow is not None and "size" in stats:
+            stats["capacity"] = stats["size"] + max_overflow
+            stats["timeout"] = getattr(pool, "_timeout", None)
+        return stats
+
+
+engine = create_engine(DATABASE_URL, **_pool_options(DATABASE_URL))
+instrument(engine)
+pool_watches = {"sync": PoolWatch("sync", engine)}
 
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = None
+AsyncSessionLocal = None
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or _async_url(DATABASE_URL)
+    async_engine = create_async_engine(ASYNC_DATABASE_URL, **_pool_options(ASYNC_DATABASE_URL))
+    instrument(async_engine.sync_engine)
+    pool_watches["async"] = PoolWatch("async", async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+replica_engine = None
+ReplicaSessionLocal = None
+async_replica_engine = None
+AsyncReplicaSessionLocal = None
+if REPLICA_DATABASE_URL:
+    replica_engine = create_engine(REPLICA_DATABASE_URL, **_pool_options(REPLICA_DATABASE_URL))
+    instrument(replica_engine)
+    pool_watches["replica"] = PoolWatch("replica", replica_engine)
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    if DB_MODE == "async":
+        ASYNC_REPLICA_DATABASE_URL = os.getenv("ASYNC_REPLICA_DATABASE_URL") or _async_url(REPLICA_DATABASE_URL)
+        async_replica_engine = create_async_engine(ASYNC_REPLICA_DATABASE_URL, **_pool_options(ASYNC_REPLICA_DATABASE_URL))
+        instrument(async_replica_engine.sync_engine)
+        pool_watches["async_replica"] = PoolWatch("async_replica", async_replica_engine.sync_engine)
+        AsyncReplicaSessionLocal = async_sessionmaker(async_replica_engine, autoflush=False, expire_on_commit=False)
+
+
+class ReadRouting:
+    """
+    Picks the database of a read-only session: the replica, unless none is
+    configured, it failed in the last REPLICA_RETRY_SECONDS, or the client
+    wrote in the last REPLICA_STICKY_SECONDS. Clients are told apart by their
+    bearer token. State is per worker process, like the caches: a client whose
+    write and next read land on different workers can still see replica lag.
+    """
+
+    def __init__(self):
+        self.down_until = 0.0
+        self.failures = 0
+        self.sessions = Counter()
+        self._recent_writers = TTLCache(
+            "replica_sticky", maxsize=int(os.getenv("REPLICA_STICKY_CLIENTS", "10000")), ttl=REPLICA_STICKY_SECONDS,
+        )
+
+    @property
+    def configured(self) -> bool:
+        return ReplicaSessionLocal is not None
+
+    def available(self) -> bool:
+        return self.configured and time.monotonic() >= self.down_until
+
+    def mark_down(self, exc: Exception):
+        self.failures += 1
+        self.down_until = time.monotonic() + REPLICA_RETRY_SECONDS
+        logger.warning(f"Read replica unavailable, reading from the primary for {REPLICA_RETRY_SECONDS}s: {str(exc)}")
+
+    def wrote(self, request: Request):
+        client = request.headers.get("authorization")
+        if client and self.configured and REPLICA_STICKY_SECONDS > 0:
+            self._recent_writers.set(client, True)
+
+    def use_replica(self, request: Request) -> bool:
+        if not self.available():
+            return False
+        client = request.headers.get("authorization")
+        return not (client and self._recent_writers.get(client))
+
+    def stats(self) -> dict:
+        return {
+            "configured": self.configured,
+            "available": self.available(),
+            "retry_in": max(0.0, round(self.down_until - time.monotonic(), 1)),
+            "failures": self.failures,
+            "sessions": dict(self.sessions),
+            "sticky_clients": self._recent_writers.stats()["size"],
+        }
+
+
+read_routing = ReadRouting()
+
+
+def _replica_connection_error(context):
+    # A replica that drops connections mid-request fails that request; later
+    # reads go to the primary until the retry interval has passed.
+    if context.is_disconnect:
+        read_routing.mark_down(context.original_exception)
+
+
+if replica_engine is not None:
+    event.listen(replica_engine, "handle_error", _replica_connection_error)
+if async_replica_engine is not None:
+    event.listen(async_replica_engine.sync_engine, "handle_error", _replica_connection_error)
+
 Base = declarative_base()
 
 
+pool_timeouts = 0
+
+
+def pool_stats() -> dict:
+    return {
+        "engines": {name: watch.stats() for name, watch in pool_watches.items()},
+        "timeouts": pool_timeouts,
+        "replica": read_routing.stats(),
+    }
+
+
+async def pool_timeout_handler(request, exc: PoolTimeoutError):
+    """Waiting longer than DB_POOL_TIMEOUT for a connection means overload: answer 503, not 500."""
+    from fastapi.responses import JSONResponse
+
+    global pool_timeouts
+    pool_timeouts += 1
+    logger.error(f"DB pool timeout after {DB_POOL_TIMEOUT}s serving {request.method} {request.url.path}: {str(exc)}")
+    return JSONResponse(status_code=503, content={"detail": "Database is busy, retry shortly"}, headers={"Retry-After": "1"})
+
+
+@contextmanager
+def bulk_read_session():
+    """
+    Sync session for a background bulk read (rebuilding the search index or
+    the ranking): on the replica while it is available, so the full catalog
+    scans stay off the primary, otherwise on the primary.
+    """
+    if read_routing.available():
+        db = ReplicaSessionLocal()
+        try:
+            db.connection()
+        except DBAPIError as exc:
+            read_routing.mark_down(exc)
+            db.close()
+        else:
+            read_routing.sessions["replica"] += 1
+            try:
+                yield db
+            finally:
+                db.close()
+            return
+    read_routing.sessions["primary"] += 1
+    with SessionLocal() as db:
+        yield db
+
+
 def get_db():
     db = SessionLocal()
     try:
@@ -24,6 +280,266 @@ def get_db():
         db.close()
 
 
-def init_db():
-    import models 
-    Base.metadata.create_all(bind=engine)
+class ThreadedSession:
+    """
+    The subset of the AsyncSession API the routers use, backed by a sync
+    Session whose calls run in the threadpool. Results are buffered in the
+    worker thread so no cursor I/O happens on the event loop.
+    """
+
+    def __init__(self, session):
+        self.sync_session = session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    def expunge(self, instance):
+        self.sync_session.expunge(instance)
+
+    async def execute(self, statement, *args, **kwargs):
+        def run():
+            result = self.sync_session.execute(statement, *args, **kwargs)
+            # DML without RETURNING has nothing to buffer (only rowcount).
+            return result.freeze() if getattr(result, "returns_rows", True) else result
+        result = await run_in_threadpool(run)
+        return result() if isinstance(result, FrozenResult) else result
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return (await self.execute(statement, *args, **kwargs)).scalars()
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    async def delete(self, instance):
+        self.sync_session.delete(instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance, *args, **kwargs):
+        await run_in_threadpool(self.sync_session.refresh, instance, *args, **kwargs)
+
+    async def connection(self):
+        return await run_in_threadpool(self.sync_session.connection)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+_sync_session_semaphores = {}
+
+
+def _sync_session_slots(name: str = "sync"):
+    """One limit per sync engine; the replica pool has the same capacity settings."""
+    semaphore = _sync_session_semaphores.get(name)
+    if semaphore is None:
+        semaphore = _sync_session_semaphores[name] = anyio.Semaphore(SYNC_SESSION_LIMIT)
+    return semaphore
+
+
+@asynccontextmanager
+async def _session(name: str, async_factory, sync_factory):
+    """An AsyncSession, or a ThreadedSession holding one of `name`'s slots."""
+    if async_factory is not None:
+        async with async_factory() as db:
+            yield db
+    else:
+        async with _sync_session_slots(name):
+            db = ThreadedSession(sync_factory(expire_on_commit=False))
+            try:
+                yield db
+            finally:
+                await db.close()
+
+
+def primary_session():
+    """
+    A session on the primary of its own, outside the request's shared one:
+    for endpoints that do slow work between statements (password hashing)
+    and must not hold a session while they wait.
+    """
+    return _session("sync", AsyncSessionLocal, SessionLocal)
+
+
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReadSession:
+    """
+    Read-only session that takes a slot and a connection only when it runs
+    its first statement, so endpoints answered from a cache never touch a
+    database. The replica is chosen at that point; if it cannot be reached
+    the slot is given back before a primary session is opened.
+    """
+
+    def __init__(self, request: Request):
+        self.request = request
+        self.target: Optional[str] = None
+        self._db = None
+        self._stack = AsyncExitStack()
+
+    async def _open(self, target: str):
+        if target == "replica":
+            db = await self._stack.enter_async_context(_session("replica", AsyncReplicaSessionLocal, ReplicaSessionLocal))
+        else:
+            db = await self._stack.enter_async_context(_session("sync", AsyncSessionLocal, SessionLocal))
+        self._db, self.target = db, target
+        read_routing.sessions[target] += 1
+        return db
+
+    async def session(self):
+        if self._db is not None:
+            return self._db
+        if read_routing.use_replica(self.request):
+            db = await self._open("replica")
+            try:
+                await db.connection()
+                return db
+            except DBAPIError as exc:
+                read_routing.mark_down(exc)
+                await self.close()
+        return await self._open("primary")
+
+    async def primary(self):
+        """The session as a primary one, for a dependency that needs to write."""
+        if self._db is None:
+            return await self._open("primary")
+        if self.target != "primary":
+            raise RuntimeError(f"{self.request.method} {self.request.url.path} already reads from the replica")
+        return self._db
+
+    async def execute(self, statement, *args, **kwargs):
+        return await (await self.session()).execute(statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await (await self.session()).scalar(statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await (await self.session()).scalars(statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await (await self.session()).get(entity, ident, **kwargs)
+
+    async def close(self):
+        await self._stack.aclose()
+        self._db, self.target = None, None
+        self._stack = AsyncExitStack()
+
+
+# A request uses one session however many dependencies ask for one (the
+# endpoint's and the auth lookup's): holding a slot while waiting for a
+# second would let a burst of requests take every slot and wait forever.
+
+
+@asynccontextmanager
+async def _request_primary(request: Request):
+    shared = getattr(request.state, "db_session", None)
+    if shared is not None:
+        yield await shared.primary() if isinstance(shared, ReadSession) else shared
+        return
+    async with primary_session() as db:
+        request.state.db_session = db
+        yield db
+
+
+async def get_async_db(request: Request):
+    """Session on the primary. Unsafe methods also pin the client's reads to the primary for a while."""
+    if request.method not in _SAFE_METHODS:
+        read_routing.wrote(request)
+    async with _request_primary(request) as db:
+        yield db
+
+
+async def get_read_db(request: Request):
+    """
+    Session for read-only endpoints: on the replica when one is configured,
+    healthy and the client has not just written, otherwise on the primary.
+    Unsafe methods always read from the primary, on the session they write with.
+    """
+    shared = getattr(request.state, "db_session", None)
+    if shared is not None:
+        yield shared
+        return
+    if request.method not in _SAFE_METHODS:
+        async with _request_primary(request) as db:
+            yield db
+        return
+    db = request.state.db_session = ReadSession(request)
+    try:
+        yield db
+    finally:
+        await db.close()
+
+
+def _alembic_config():
+    from alembic.config import Config
+
+    config = Config(str(APP_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(APP_DIR / "migrations"))
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def _unversioned_tables(connection) -> list:
+    """Tables of a database no migration has run on: one built by the old create_all startup."""
+    from alembic.runtime.migration import MigrationContext
+    from sqlalchemy import inspect
+    import models  # noqa: F401  (fills Base.metadata)
+
+    if MigrationContext.configure(connection).get_current_revision() is not None:
+        return []
+    return [table for table in inspect(connection).get_table_names() if table in Base.metadata.tables]
+
+
+def _stamp_first(tables: list) -> RuntimeError:
+    return RuntimeError(
+        f"Database has the app's tables ({', '.join(sorted(tables))}) but no alembic_version: it was built by "
+        f"create_all before migrations existed, and 0001 would fail creating them again. Run `alembic stamp 0001`, "
+        f"then `alembic upgrade head`, in back/app."
+    )
+
+
+def migrate(revision: str = "head"):
+    from alembic import command
+
+    config = _alembic_config()
+    with engine.begin() as connection:
+        tables = _unversioned_tables(connection)
+        if tables:
+            raise _stamp_first(tables)
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+
+def verify_schema():
+    """Refuse to start against a database that is not at the latest migration."""
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    head = ScriptDirectory.from_config(_alembic_config()).get_current_head()
+    with engine.connect() as connection:
+        current = MigrationContext.configure(connection).get_current_revision()
+        tables = _unversioned_tables(connection)
+    if current == head:
+        return
+    if tables:
+        raise _stamp_first(tables)
+    if DB_AUTO_MIGRATE:
+        migrate()
+        return
+    raise RuntimeError(
+        f"Database schema is at revision {current}, expected {head}. "
+        f"Run `alembic upgrade head` in back/app (or set DB_AUTO_MIGRATE=1)."
+    )
@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import select
+
+from core.database import SessionLocal
+from models import Author, Book, Genre
+
+FIELDS = ["id", "title", "description", "author_name", "genre_name", "release_date", "price", "favorites_count", "img", "updated_at"]
+BATCH_SIZE = 1000
+
+
+def _catalog_statement(updated_since: Optional[datetime]):
+    statement = (
+        select(
+            Book.id, Book.title, Book.description,
+            Author.name.label("author_name"), Genre.name.label("genre_name"),
+            Book.release_date, Book.price, Book.favorites_count, Book.img, Book.updated_at,
+        )
+        .outerjoin(Author, Book.author_id == Author.id)
+        .outerjoin(Genre, Book.genre_id == Genre.id)
+        .order_by(Book.id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    if updated_since:
+        statement = statement.where(Book.updated_at >= updated_since)
+    return statement
+
+
+def _plain(value):
+    if value is None:
+        return None
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    if not isinstance(value, (str, int, float, bool)):
+        return float(value)
+    return value
+
+
+def iter_catalog(fmt: str, updated_since: Optional[datetime] = None) -> Iterator[bytes]:
+    """
+    Yield the catalog in `fmt` ("ndjson" or "csv"), one chunk per batch of
+    rows read from a server-side cursor, so memory stays flat. Uses its own
+    session because the response body is produced after the request's
+    dependencies have been torn down.
+    """
+    db = SessionLocal()
+    try:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(FIELDS)
+            yield buffer.getvalue().encode()
+
+        result = db.execute(_catalog_statement(updated_since))
+        for rows in result.partitions():
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows([_plain(value) for value in row] for row in rows)
+                yield buffer.getvalue().encode()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(FIELDS, map(_plain, row))), ensure_ascii=False) + "\n" for row in rows
+                ).encode()
+    finally:
+        db.close()
@@ -0,0 +1,149 @@
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, Query
+from sqlalchemy import select
+
+from core.cache import TTLCache, catalog_cache
+from core.read_models import card_statement
+from core.search import ranked_book_ids
+from models import Author, Book, Genre
+
+# name -> id, keyed by the catalog version so admin writes invalidate it.
+_name_ids = TTLCache("catalog_ids", maxsize=4096, ttl=catalog_cache.ttl)
+
+
+@dataclass
+class CatalogFilters:
+    """
+    Shop listing filters. genre_name/author_name/title are case-insensitive
+    substring searches; genres/authors are exact names resolved to ids, so
+    they filter on the indexed foreign keys without joining the name tables.
+    """
+
+    genre_name: Optional[str] = None
+    author_name: Optional[str] = None
+    title: Optional[str] = None
+    genres: List[str] = field(default_factory=list)
+    authors: List[str] = field(default_factory=list)
+    year: Optional[int] = None
+    year_from: Optional[int] = None
+    year_to: Optional[int] = None
+    price_min: Optional[float] = None
+    price_max: Optional[float] = None
+
+    @property
+    def only_genres(self) -> bool:
+        """True when the precomputed per-genre ranking can answer on its own."""
+        return not (
+            self.author_name or self.title or self.authors or self.year or self.year_from
+            or self.year_to or self.price_min is not None or self.price_max is not None
+        )
+
+    def date_range(self) -> Tuple[Optional[date], Optional[date]]:
+        """[start, end) of the requested release years."""
+        first = max(filter(None, (self.year, self.year_from)), default=None)
+        last = min(filter(None, (self.year, self.year_to)), default=None)
+        return (date(first, 1, 1) if first else None, date(last + 1, 1, 1) if last else None)
+
+
+def catalog_filters(
+    genre_name: Optional[str] = Query(None, description="Filter by genre name"),
+    author_name: Optional[str] = Query(None, description="Filter by author name"),
+    year: Optional[int] = Query(None, ge=1, le=9998, description="Filter by release year"),
+    title: Optional[str] = Query(None, description="Search by book title"),
+    genre: List[str] = Query([], description="Exact genre name; repeat for several"),
+    author: List[str] = Query([], description="Exact author name; repeat for several"),
+    year_from: Optional[int] = Query(None, ge=1, le=9998, description="Released in or after this year"),
+    year_to: Optional[int] = Query(None, ge=1, le=9998, description="Released in or before this year"),
+    price_min: Optional[float] = Query(None, ge=0, description="Minimum price"),
+    price_max: Optional[float] = Query(None, ge=0, description="Maximum price"),
+) -> CatalogFilters:
+    if year_from and year_to and year_from > year_to:
+        raise HTTPException(status_code=400, detail="year_from must not be after year_to")
+    if price_min is not None and price_max is not None and price_min > price_max:
+        raise HTTPException(status_code=400, detail="price_min must not be above price_max")
+    return CatalogFilters(
+        genre_name=genre_name, author_name=author_name, title=title, genres=genre, authors=author,
+        year=year, year_from=year_from, year_to=year_to, price_min=price_min, price_max=price_max,
+    )
+
+
+async def resolve_ids(db, model, names: Iterable[str]) -> List[int]:
+    """Ids of the `model` rows named exactly `names`; unknown names are dropped."""
+    names = set(names)
+    version = catalog_cache.version
+    found: Dict[str, Optional[int]] = {}
+    missing = []
+    for name in names:
+        key = (version, model.__tablename__, name)
+        cached = _name_ids.get(key)
+        if cached is None:
+            missing.append(name)
+        else:
+            found[name] = cached
+    if missing:
+        rows = dict((await db.execute(select(model.name, model.id).where(model.name.in_(missing)))).all())
+        for name in missing:
+            # 0 caches "no such name" so unknown names are not looked up again.
+            found[name] = rows.get(name, 0)
+            _name_ids.set((version, model.__tablename__, name), found[name])
+    return [found[name] for name in names if found[name]]
+
+
+async def genre_ids(db, filters: CatalogFilters) -> Optional[List[int]]:
+    """Genre ids the filters allow, or None when they do not restrict genres."""
+    ids = None
+    if filters.genres:
+        ids = set(await resolve_ids(db, Genre, filters.genres))
+    if filters.genre_name:
+        matching = set((await db.scalars(select(Genre.id).where(Genre.name.ilike(f"%{filters.genre_name}%")))).all())
+        ids = matching if ids is None else ids & matching
+    return None if ids is None else sorted(ids)
+
+
+async def compile_filters(db, filters: CatalogFilters, ids_only: bool = False):
+    """
+    Build the listing statement: catalog card columns (core.read_models),
+    or just book ids with `ids_only`. Every predicate is on a books column
+    (foreign keys, release_date range, price) so the sort indexes stay
+    usable; authors and genres are only joined for the substring filters
+    the search index could not answer.
+
+    Returns the statement and, when the search index resolved the text
+    filters, the matching book ids ordered by relevance.
+    """
+    query = select(Book.id) if ids_only else card_statement()
+
+    ranked_ids = None
+    if filters.genre_name or filters.author_name or filters.title:
+        ranked_ids = ranked_book_ids(title=filters.title, author_name=filters.author_name, genre_name=filters.genre_name)
+
+    if ranked_ids is not None:
+        query = query.where(Book.id.in_(ranked_ids))
+    else:
+        if filters.genre_name:
+            query = query.join(Genre, Book.genre_id == Genre.id).where(Genre.name.ilike(f"%{filters.genre_name}%"))
+        if filters.author_name:
+            if ids_only:
+                query = query.join(Author, Book.author_id == Author.id)
+            query = query.where(Author.name.ilike(f"%{filters.author_name}%"))
+        if filters.title:
+            query = query.where(Book.title.ilike(f"%{filters.title}%"))
+
+    if filters.genres:
+        query = query.where(Book.genre_id.in_(await resolve_ids(db, Genre, filters.genres)))
+    if filters.authors:
+        query = query.where(Book.author_id.in_(await resolve_ids(db, Author, filters.authors)))
+
+    start, end = filters.date_range()
+    if start:
+        query = query.where(Book.release_date >= start)
+    if end:
+        query = query.where(Book.release_date < end)
+    if filters.price_min is not None:
+        query = query.where(Book.price >= filters.price_min)
+    if filters.price_max is not None:
+        query = query.where(Book.price <= filters.price_max)
+    return query, ranked_ids
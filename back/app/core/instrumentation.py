@@ -0,0 +1,126 @@
+import logging
+import os
+import random
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Share of requests whose statements are counted and timed (0 disables the hooks).
+SQL_SAMPLE_RATE = float(os.getenv("SQL_INSTRUMENT_SAMPLE_RATE", "0.1"))
+# The same statement this many times in one request is reported as N+1.
+SQL_REPEAT_THRESHOLD = int(os.getenv("SQL_REPEAT_THRESHOLD", "5"))
+SQL_SLOW_REQUEST_MS = float(os.getenv("SQL_SLOW_REQUEST_MS", "200"))
+SQL_MAX_STATEMENTS = int(os.getenv("SQL_MAX_STATEMENTS", "25"))
+
+
+class RequestStats:
+    __slots__ = ("statements", "seconds", "shapes")
+
+    def __init__(self):
+        self.statements = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+
+    def repeated(self):
+        return [(shape, count) for shape, count in self.shapes.most_common(3) if count >= SQL_REPEAT_THRESHOLD]
+
+    def server_timing(self) -> str:
+        return f'db;dur={self.seconds * 1000:.1f};desc="{self.statements} queries"'
+
+
+# Threadpool workers and SQLAlchemy's async greenlets both inherit the request's
+# context, so statements run on behalf of a request land in its RequestStats.
+_current: ContextVar[Optional[RequestStats]] = ContextVar("sql_request_stats", default=None)
+# "METHOD /path" of the request being served, for logs raised deep in the DB layer.
+_request: ContextVar[Optional[str]] = ContextVar("sql_request", default=None)
+
+
+def current_request() -> str:
+    return _request.get() or "no request (background task)"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = _current.get()
+    if stats is None:
+        return
+    started = conn.info.get("query_started")
+    if not started:
+        return
+    stats.seconds += time.perf_counter() - started.pop()
+    stats.statements += 1
+    # Statements are parameterized, so identical text means identical shape.
+    stats.shapes[statement] += 1
+
+
+def _handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        started.pop()
+
+
+def instrument(engine):
+    """Attach statement counting to a sync Engine (or an AsyncEngine's sync_engine)."""
+    if SQL_SAMPLE_RATE <= 0:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def _report(method: str, path: str, stats: RequestStats, elapsed: float):
+    repeated = stats.repeated()
+    slow = stats.seconds * 1000 >= SQL_SLOW_REQUEST_MS
+    if not (repeated or slow or stats.statements > SQL_MAX_STATEMENTS):
+        return
+    message = f"{method} {path}: {stats.statements} queries, {stats.seconds * 1000:.1f} ms in DB of {elapsed * 1000:.1f} ms"
+    for shape, count in repeated:
+        message += f"\n  possible N+1, {count}x: {' '.join(shape.split())[:300]}"
+    logger.warning(message)
+
+
+class SQLInstrumentationMiddleware:
+    """
+    Counts the SQL a sampled request runs, adds a Server-Timing header and
+    logs requests that repeat a statement, run too many or spend too long
+    in the database.
+    """
+
+    def __init__(self, app, sample_rate: float = SQL_SAMPLE_RATE):
+        self.app = app
+        self.sample_rate = sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        _request.set(f"{scope['method']} {scope['path']}")
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", stats.server_timing().encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current.reset(token)
+            _report(scope["method"], scope["path"], stats, time.perf_counter() - started)
@@ -0,0 +1,178 @@
+import os
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple
+
+import anyio.to_thread
+
+# Prometheus' default latency buckets, in seconds.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+
+def _labels(**labels) -> str:
+    inner = ",".join(f'{name}="{str(value)}"' for name, value in labels.items())
+    return "{" + inner + "}" if inner else ""
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+    def render(self, name: str, labels: dict) -> List[str]:
+        lines = []
+        cumulative = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+        cumulative += self.counts[-1]
+        lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {cumulative}")
+        lines.append(f"{name}_sum{_labels(**labels)} {self.sum:.6f}")
+        lines.append(f"{name}_count{_labels(**labels)} {cumulative}")
+        return lines
+
+
+class RequestMetrics:
+    """
+    Request counters of this worker process. They are only touched from the
+    event loop, so no locking; scrape every worker (or run one) to see the
+    whole service.
+    """
+
+    def __init__(self):
+        self.latency: Dict[Tuple[str, str, str], Histogram] = {}
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status: int, seconds: float):
+        key = (method, route, str(status))
+        histogram = self.latency.get(key)
+        if histogram is None:
+            histogram = self.latency[key] = Histogram()
+        histogram.observe(seconds)
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """Times every HTTP request by route template (not raw path, to bound label cardinality)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        request_metrics.in_flight += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            request_metrics.in_flight -= 1
+            # The router stores the matched route in the (shared) scope.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            request_metrics.observe(scope["method"], route, status, time.perf_counter() - started)
+
+
+POOL_METRICS = (
+    ("size", "size", "Connections the pool keeps open."),
+    ("checked_out", "checkedout", "Connections currently lent to sessions."),
+    ("checked_in", "checkedin", "Idle connections in the pool."),
+    ("overflow", "overflow", "Connections opened beyond the pool size."),
+)
+
+
+CACHE_METRICS = (
+    ("cache_hits_total", "hits", "counter", "Cache lookups answered from memory."),
+    ("cache_misses_total", "misses", "counter", "Cache lookups that had to be computed."),
+    ("cache_hit_ratio", "hit_ratio", "gauge", "hits / (hits + misses) since start."),
+)
+
+
+def _pool_lines(engines: Dict[str, object]) -> List[str]:
+    lines = []
+    for metric, attribute, description in POOL_METRICS:
+        lines += [f"# HELP db_pool_{metric} {description}", f"# TYPE db_pool_{metric} gauge"]
+        for name, engine in engines.items():
+            method = getattr(engine.pool, attribute, None)
+            if method is not None:
+                lines.append(f"db_pool_{metric}{_labels(engine=name)} {method()}")
+    return lines
+
+
+def render() -> str:
+    """Everything in the Prometheus text exposition format. Call from the event loop."""
+    from core.bootstrap import startup_report
+    from core.cache import cache_stats
+    from core import database
+    from core.database import pool_watches, read_routing, SYNC_SESSION_LIMIT, _sync_session_slots
+
+    lines = [
+        "# HELP http_request_duration_seconds Request latency by route template.",
+        "# TYPE http_request_duration_seconds histogram",
+    ]
+    for (method, route, status), histogram in sorted(request_metrics.latency.items()):
+        lines.extend(histogram.render("http_request_duration_seconds", {"method": method, "route": route, "status": status}))
+
+    lines += [
+        "# HELP http_requests_in_flight Requests currently being served.",
+        "# TYPE http_requests_in_flight gauge",
+        f"http_requests_in_flight {request_metrics.in_flight}",
+    ]
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    lines += [
+        "# HELP threadpool_threads_busy Worker threads running sync endpoints and DB calls.",
+        "# TYPE threadpool_threads_busy gauge",
+        f"threadpool_threads_busy {limiter.borrowed_tokens}",
+        "# HELP threadpool_threads_limit Size of the threadpool.",
+        "# TYPE threadpool_threads_limit gauge",
+        f"threadpool_threads_limit {limiter.total_tokens}",
+        "# HELP threadpool_tasks_waiting Calls waiting for a free worker thread.",
+        "# TYPE threadpool_tasks_waiting gauge",
+        f"threadpool_tasks_waiting {limiter.statistics().tasks_waiting}",
+        "# HELP db_sync_sessions_open Async-router sessions holding a sync-session slot.",
+        "# TYPE db_sync_sessions_open gauge",
+        f"db_sync_sessions_open {SYNC_SESSION_LIMIT - _sync_session_slots().value}",
+    ]
+
+    lines += _pool_lines({name: watch.engine for name, watch in pool_watches.items()})
+    lines += ["# HELP db_pool_exhausted_total Checkouts that took the pool's last connection.",
+              "# TYPE db_pool_exhausted_total counter"]
+    lines += [f"db_pool_exhausted_total{_labels(engine=name)} {watch.exhausted}" for name, watch in pool_watches.items()]
+    lines += ["# HELP db_pool_timeouts_total Requests that gave up waiting for a connection (503).",
+              "# TYPE db_pool_timeouts_total counter",
+              f"db_pool_timeouts_total {database.pool_timeouts}"]
+    if read_routing.configured:
+        lines += ["# HELP db_read_sessions_total Read-only sessions by the database they were routed to.",
+                  "# TYPE db_read_sessions_total counter"]
+        lines += [f"db_read_sessions_total{_labels(target=target)} {read_routing.sessions[target]}" for target in ("replica", "primary")]
+        lines += ["# HELP db_replica_failures_total Times the replica failed and reads fell back to the primary.",
+                  "# TYPE db_replica_failures_total counter",
+                  f"db_replica_failures_total {read_routing.failures}"]
+
+    lines += ["# HELP app_startup_seconds Time this worker spent in each startup phase.",
+              "# TYPE app_startup_seconds gauge"]
+    lines += [f"app_startup_seconds{_labels(phase=name)} {seconds:.6f}" for name, seconds in startup_report.phases.items()]
+
+    caches = sorted(cache_stats().items())
+    for metric, field, kind, description in CACHE_METRICS:
+        lines += [f"# HELP {metric} {description}", f"# TYPE {metric} {kind}"]
+        lines += [f"{metric}{_labels(cache=name)} {stats[field]}" for name, stats in caches]
+
+    return "\n".join(lines) + "\n"
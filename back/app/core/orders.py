@@ -0,0 +1,86 @@
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import Integer, and_, func, insert, literal, select, update
+from sqlalchemy.orm import selectinload
+
+from models import Basket, BasketStatus, Book, Order, OrderItem
+
+logger = logging.getLogger(__name__)
+
+
+def _order_with_items(order_id: int):
+    return (
+        select(Order)
+        .options(selectinload(Order.items))
+        .where(Order.id == order_id)
+        .execution_options(populate_existing=True)
+    )
+
+
+async def checkout(db, user_id: int) -> Order:
+    """
+    Turns the user's active basket into an order in one transaction: an
+    INSERT ... SELECT copies the basket rows with the books' current titles
+    and prices, one UPDATE marks them purchased, and the totals are summed
+    from the copied rows in SQL.
+
+    The UPDATE waits for row locks taken by a concurrent checkout of the
+    same basket and then matches no rows, so the two statements disagree on
+    the row count; that transaction is rolled back with 409 instead of
+    buying the basket twice. On SQLite the second checkout waits for the
+    first to commit and finds the basket empty.
+    """
+    active = and_(Basket.user_id == user_id, Basket.status == BasketStatus.active)
+    order = Order(user_id=user_id, created_at=datetime.utcnow(), total=0, items_count=0)
+    db.add(order)
+    try:
+        await db.flush()
+        copied = await db.execute(
+            insert(OrderItem).from_select(
+                ["order_id", "book_id", "title", "price", "quantity"],
+                select(literal(order.id, Integer), Book.id, Book.title, Book.price, Basket.quantity)
+                .join(Book, Basket.book_id == Book.id)
+                .where(active),
+            )
+        )
+        if not copied.rowcount:
+            raise HTTPException(status_code=400, detail="Basket is empty")
+
+        purchased = await db.execute(
+            update(Basket).where(active).values(status=BasketStatus.purchased)
+            .execution_options(synchronize_session=False)
+        )
+        if purchased.rowcount != copied.rowcount:
+            logger.warning(
+                f"Checkout of user {user_id} rolled back: {copied.rowcount} rows copied, "
+                f"{purchased.rowcount} marked purchased"
+            )
+            raise HTTPException(status_code=409, detail="Basket changed during checkout, please retry")
+
+        of_order = OrderItem.order_id == order.id
+        await db.execute(
+            update(Order).where(Order.id == order.id).values(
+                total=select(func.sum(OrderItem.price * OrderItem.quantity)).where(of_order).scalar_subquery(),
+                items_count=select(func.sum(OrderItem.quantity)).where(of_order).scalar_subquery(),
+            ).execution_options(synchronize_session=False)
+        )
+        await db.commit()
+    except HTTPException:
+        await db.rollback()
+        raise
+    except Exception:
+        await db.rollback()
+        raise HTTPException(status_code=500, detail="Failed to complete purchase")
+
+    return await db.scalar(_order_with_items(order.id))
+
+
+async def order_page(db, user_id: int, limit: int, before_id: Optional[int] = None) -> List[Order]:
+    """Up to `limit` of the user's orders, newest first, with ids below `before_id`."""
+    query = select(Order).options(selectinload(Order.items)).where(Order.user_id == user_id)
+    if before_id is not None:
+        query = query.where(Order.id < before_id)
+    return (await db.scalars(query.order_by(Order.id.desc()).limit(limit))).all()
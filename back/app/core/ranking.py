@@ -0,0 +1,242 @@
+import heapq
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.rebuild import BackgroundRebuild
+
+MODES = ("popularity", "trending")
+
+REFRESH_SECONDS = int(os.getenv("RANKING_REFRESH_SECONDS", "300"))
+# A favorite counts half as much for "trending" every TRENDING_HALF_LIFE_HOURS;
+# favorites older than TRENDING_WINDOW_DAYS are not loaded at all.
+TRENDING_HALF_LIFE_HOURS = float(os.getenv("TRENDING_HALF_LIFE_HOURS", "24"))
+TRENDING_WINDOW_DAYS = float(os.getenv("TRENDING_WINDOW_DAYS", "7"))
+
+
+class Ranking:
+    """
+    Books pre-sorted by popularity (favorites_count, release_date, id) and by
+    trending score (time-decayed favorites, id), globally and per genre, so a
+    page is a slice of a sorted list rather than a sort of the catalog.
+
+    Lists are kept ascending and read from the end. Trending scores are stored
+    as 2 ** (age_from_epoch / half_life) sums: every score decays at the same
+    rate, so the order only changes when a favorite is recorded and one entry
+    moves. Like the search index, each worker keeps its own copy, updated by
+    the favorites it serves and rebuilt every RANKING_REFRESH_SECONDS.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._books: Dict[str, dict] = {}
+        self._lists: Dict[str, Dict[Optional[int], list]] = {mode: defaultdict(list) for mode in MODES}
+        self._epoch = datetime.utcnow()
+        self.built_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def is_stale(self) -> bool:
+        return not self.ready or time.monotonic() - self.built_at > REFRESH_SECONDS
+
+    @staticmethod
+    def _statements(since: datetime):
+        from models import Book, Favorite
+
+        books = select(Book.id, Book.genre_id, Book.release_date, Book.favorites_count)
+        favorites = select(Favorite.book_id, Favorite.created_at).where(Favorite.created_at >= since)
+        return books, favorites
+
+    def rebuild(self, db: Session) -> int:
+        epoch = datetime.utcnow()
+        books, favorites = self._statements(epoch - timedelta(days=TRENDING_WINDOW_DAYS))
+        return self.load(db.execute(books).all(), db.execute(favorites).all(), epoch)
+
+    def load(self, book_rows, favorite_rows, epoch: datetime) -> int:
+        from core.counters import favorites_counter
+
+        scores = defaultdict(float)
+        for book_id, created_at in favorite_rows:
+            scores[book_id] += self._weight(created_at, epoch)
+        # Write-behind deltas are already counted here but not yet in the table.
+        pending = favorites_counter.pending()
+
+        entries = {}
+        lists = {mode: defaultdict(list) for mode in MODES}
+        for book_id, genre_id, release_date, favorites_count in book_rows:
+            entry = {
+                "genre_id": genre_id,
+                "release_date": release_date.isoformat() if release_date else "",
+                "favorites_count": (favorites_count or 0) + pending.get(book_id, 0),
+                "score": scores.get(book_id, 0.0),
+            }
+            entries[book_id] = entry
+            for mode in MODES:
+                key = self._key(mode, book_id, entry)
+                lists[mode][None].append(key)
+                if genre_id is not None:
+                    lists[mode][genre_id].append(key)
+        for per_genre in lists.values():
+            for keys in per_genre.values():
+                keys.sort()
+
+        with self._lock:
+            self._books = entries
+            self._lists = lists
+            self._epoch = epoch
+            self.built_at = time.monotonic()
+        return len(entries)
+
+    @staticmethod
+    def _weight(created_at: Optional[datetime], epoch: datetime) -> float:
+        if created_at is None:
+            return 0.0
+        half_lives = (created_at - epoch).total_seconds() / (TRENDING_HALF_LIFE_HOURS * 3600)
+        return 2.0 ** half_lives
+
+    @staticmethod
+    def _key(mode: str, book_id: str, entry: dict) -> tuple:
+        if mode == "popularity":
+            return (entry["favorites_count"], entry["release_date"], book_id)
+        return (entry["score"], book_id)
+
+    def _place(self, book_id: str, entry: Optional[dict]):
+        old = self._books.get(book_id)
+        for mode in MODES:
+            lists = self._lists[mode]
+            if old is not None:
+                for genre_id in {None, old["genre_id"]}:
+                    keys = lists[genre_id]
+                    key = self._key(mode, book_id, old)
+                    index = bisect_left(keys, key)
+                    if index < len(keys) and keys[index] == key:
+                        del keys[index]
+            if entry is not None:
+                key = self._key(mode, book_id, entry)
+                insort(lists[None], key)
+                if entry["genre_id"] is not None:
+                    insort(lists[entry["genre_id"]], key)
+        if entry is None:
+            self._books.pop(book_id, None)
+        else:
+            self._books[book_id] = entry
+
+    def upsert(self, book_id: str, genre_id: Optional[int], release_date, favorites_count: int):
+        """Add a book or apply an admin change to its genre or release date."""
+        with self._lock:
+            old = self._books.get(book_id)
+            self._place(book_id, {
+                "genre_id": genre_id,
+                "release_date": release_date.isoformat() if release_date else "",
+                "favorites_count": old["favorites_count"] if old else favorites_count,
+                "score": old["score"] if old else 0.0,
+            })
+
+    def remove(self, book_id: str):
+        with self._lock:
+            self._place(book_id, None)
+
+    def record(self, book_id: str, delta: int, created_at: Optional[datetime]):
+        """Apply a committed favorite (+1) or unfavorite (-1) of a favorite created at `created_at`."""
+        with self._lock:
+            old = self._books.get(book_id)
+            if old is None:
+                return
+            entry = dict(old)
+            entry["favorites_count"] += delta
+            entry["score"] = max(0.0, entry["score"] + delta * self._weight(created_at, self._epoch))
+            self._place(book_id, entry)
+
+    def page(self, mode: str, genre_ids: Optional[Iterable[int]] = None, offset: int = 0,
+             limit: int = 20, after: Optional[tuple] = None) -> List[tuple]:
+        """
+        Up to `limit` keys in descending order, skipping `offset` of them or
+        starting strictly below `after`. `genre_ids` restricts the page to those
+        genres; None means the whole catalog. The last element of a key is the
+        book id.
+        """
+        with self._lock:
+            lists = self._lists[mode]
+            sources = [lists[None]] if genre_ids is None else [lists[genre_id] for genre_id in genre_ids if genre_id in lists]
+            iterators = [_descending(keys, after) for keys in sources]
+            if not iterators:
+                return []
+            merged = iterators[0] if len(iterators) == 1 else heapq.merge(*iterators, reverse=True)
+            result = []
+            for key in merged:
+                if offset:
+                    offset -= 1
+                    continue
+                result.append(key)
+                if len(result) >= limit:
+                    break
+            return result
+
+    def order(self, mode: str, book_ids: Iterable[str]) -> List[tuple]:
+        """Keys of the given books in descending order; unknown ids are dropped."""
+        with self._lock:
+            keys = [self._key(mode, book_id, self._books[book_id]) for book_id in book_ids if book_id in self._books]
+        keys.sort(reverse=True)
+        return keys
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "books": len(self._books),
+                "genres": sum(1 for genre_id in self._lists["popularity"] if genre_id is not None),
+                "age_seconds": round(time.monotonic() - self.built_at, 1) if self.ready else None,
+            }
+
+
+def _descending(keys: list, after: Optional[tuple]):
+    end = len(keys) if after is None else bisect_left(keys, after)
+    for index in range(end - 1, -1, -1):
+        yield keys[index]
+
+
+ranking = Ranking()
+
+
+def cursor_key(mode: str, values: list) -> Tuple:
+    """Turn decoded cursor values back into a ranking key; raises ValueError on bad input."""
+    if mode == "popularity":
+        favorites_count, release_date, book_id = values
+        if type(favorites_count) is not int or not isinstance(book_id, str) or not isinstance(release_date, (str, type(None))):
+            raise ValueError("Invalid cursor")
+        return (favorites_count, release_date or "", book_id)
+    score, book_id = values
+    if type(score) not in (int, float) or not isinstance(book_id, str):
+        raise ValueError("Invalid cursor")
+    return (float(score), book_id)
+
+
+def key_cursor_values(mode: str, key: tuple) -> list:
+    if mode == "popularity":
+        favorites_count, release_date, book_id = key
+        return [favorites_count, release_date or None, book_id]
+    return list(key)
+
+
+ranking_refresh = BackgroundRebuild("ranking", ranking.rebuild)
+
+
+async def ensure_fresh(wait: bool = False) -> bool:
+    """
+    Starts a background rebuild when the ranking is stale and tells whether
+    it can answer meanwhile. A worker with no ranking yet cannot; with
+    `wait` it waits for the first build, off the event loop.
+    """
+    if ranking.is_stale():
+        ranking_refresh.start()
+        if wait and not ranking.ready:
+            await ranking_refresh.wait()
+    return ranking.ready
@@ -0,0 +1,78 @@
+"""
+Column projections for the list endpoints. Each statement selects exactly
+the columns its response shows, joined in one query, and responses are built
+from the result tuples: no ORM identity map, no lazy author or genre loads,
+and no books.description unless the response carries it.
+"""
+from typing import Iterable, List, Optional
+
+from sqlalchemy import and_, select
+
+from models import Author, Book, Favorite, Genre
+from schemas import BookResponse, BookShopMainResponse, BookSummaryForAuthor
+
+# A catalog card, plus the sort columns its keyset cursor needs.
+CARD_COLUMNS = (
+    Book.id, Book.title, Book.img, Author.name.label("author_name"),
+    Book.release_date, Book.favorites_count,
+)
+
+# Everything BookResponse shows.
+DETAIL_COLUMNS = (
+    Book.id, Book.title, Book.description, Genre.name.label("genre_name"), Author.name.label("author_name"),
+    Book.release_date, Book.favorites_count, Book.img, Book.price,
+)
+
+
+def card_statement():
+    return select(*CARD_COLUMNS).outerjoin(Author, Book.author_id == Author.id)
+
+
+def detail_statement(user_id: Optional[int] = None):
+    """BookResponse columns; with `user_id`, also that user's Favorite.id (None when not a favorite)."""
+    statement = (
+        select(*DETAIL_COLUMNS)
+        .outerjoin(Author, Book.author_id == Author.id)
+        .outerjoin(Genre, Book.genre_id == Genre.id)
+    )
+    if user_id is not None:
+        statement = statement.add_columns(Favorite.id.label("favorite_id")).outerjoin(
+            Favorite, and_(Favorite.book_id == Book.id, Favorite.user_id == user_id)
+        )
+    return statement
+
+
+def author_books_statement(author_id: int):
+    return select(Book.id, Book.title, Book.img).where(Book.author_id == author_id)
+
+
+def card_response(row, favorite_ids: Iterable[str] = ()) -> BookShopMainResponse:
+    # model_construct: every field is typed here already; routes rendered
+    # with core.responses.FastJSON are not validated again either.
+    return BookShopMainResponse.model_construct(
+        id=str(row.id),
+        title=row.title,
+        img=f"/static/images/books/{row.img}" if row.img else None,
+        author_name=row.author_name or "Unknown Author",
+        is_favorite=row.id in favorite_ids,
+    )
+
+
+def detail_response(row, is_favorite: bool, quantity: Optional[int] = None) -> BookResponse:
+    return BookResponse.model_construct(
+        id=str(row.id),
+        title=row.title,
+        description=row.description,
+        genre_name=row.genre_name or "No genre",
+        author_name=row.author_name or "Unknown author",
+        release_date=str(row.release_date) if row.release_date else None,
+        favorites_count=row.favorites_count,
+        is_favorite=is_favorite,
+        img=f"/static/images/books/{row.img}" if row.img else "/static/images/books/default.jpg",
+        price=float(row.price),
+        quantity=quantity,
+    )
+
+
+def author_book_summaries(rows) -> List[BookSummaryForAuthor]:
+    return [BookSummaryForAuthor(id=row.id, title=row.title, img=row.img) for row in rows]
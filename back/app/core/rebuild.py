@@ -0,0 +1,66 @@
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+import anyio
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundRebuild:
+    """
+    Rebuilds one of the worker's in-memory structures (search index, ranking)
+    in a thread on its own session, one rebuild at a time. Loading them is
+    seconds of CPU on a large catalog: done by a request on the event loop it
+    would stall every request on the worker, and several stale requests would
+    each start one. Requests keep reading the previous copy meanwhile. Each
+    worker rereads the whole catalog every refresh interval, so the read goes
+    to the replica when one is configured.
+    """
+
+    def __init__(self, name: str, rebuild: Callable):
+        self.name = name
+        self._rebuild = rebuild
+        self._lock = threading.Lock()
+        self._done = None
+        self.runs = 0
+
+    @property
+    def running(self) -> bool:
+        return self._done is not None
+
+    def start(self) -> threading.Event:
+        """Starts a rebuild unless one is running; returns an event set when it finishes."""
+        with self._lock:
+            if self._done is None:
+                self._done = threading.Event()
+                threading.Thread(target=self._run, args=(self._done,), name=f"rebuild-{self.name}", daemon=True).start()
+            return self._done
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Waits for the running rebuild, if any, without starting one."""
+        done = self._done
+        return done is None or done.wait(timeout)
+
+    async def wait(self):
+        """Starts a rebuild if none is running and waits for it off the event loop."""
+        done = self.start()
+        if not done.is_set():
+            await anyio.to_thread.run_sync(done.wait)
+
+    def _run(self, done: threading.Event):
+        from core.database import bulk_read_session
+
+        started = time.perf_counter()
+        try:
+            with bulk_read_session() as db:
+                count = self._rebuild(db)
+            logger.info(f"Rebuilt {self.name} ({count} books) in {time.perf_counter() - started:.2f}s")
+        except Exception:
+            logger.exception(f"Rebuilding {self.name} failed; serving the previous copy")
+        finally:
+            with self._lock:
+                self.runs += 1
+                self._done = None
+            done.set()
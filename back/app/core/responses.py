@@ -0,0 +1,51 @@
+"""
+Fast rendering for responses built from trusted internal data.
+
+A route that returns models lets FastAPI validate them again against its
+response_model, convert the result to plain Python and encode it with
+json.dumps. The read_models builders already produce correctly typed models
+(with model_construct, skipping validation), so a route that opts in with
+`FastJSON` returns them as a Response encoded by pydantic-core straight from
+the models. FastAPI passes Response objects through untouched; the route's
+response_model still documents the schema in OpenAPI.
+"""
+import os
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+# "0" hands the models back to FastAPI on every opted-in route (validation
+# against response_model, json.dumps): the old path, for comparison or if a
+# builder is suspected of producing a wrongly typed field.
+FAST_JSON = os.getenv("FAST_JSON", "1") == "1"
+
+
+class ModelJSONResponse(Response):
+    """JSON response whose content is encoded by a pydantic TypeAdapter, without validating it."""
+
+    media_type = "application/json"
+
+    def __init__(self, content: Any, adapter: TypeAdapter, **kwargs):
+        self.adapter = adapter
+        super().__init__(content, **kwargs)
+
+    def render(self, content: Any) -> bytes:
+        return self.adapter.dump_json(content)
+
+
+class FastJSON:
+    """
+    Per-route renderer for a response type: `render = FastJSON(List[Model])`
+    at module level, then `return render(items)` in the route. Only for
+    content the application built itself; nothing here checks it against
+    the schema.
+    """
+
+    def __init__(self, response_type: Any):
+        self.adapter = TypeAdapter(response_type)
+
+    def __call__(self, content: Any, **kwargs) -> Any:
+        if not FAST_JSON:
+            return content
+        return ModelJSONResponse(content, self.adapter, **kwargs)
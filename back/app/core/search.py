@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from core.rebuild import BackgroundRebuild
+
+FIELDS = ("title", "author_name", "genre_name")
+
+# Above this many candidates an IN (...) list stops paying off (and MSSQL caps
+# a statement at 2100 parameters), so callers fall back to the SQL filter.
+MAX_CANDIDATES = int(os.getenv("SEARCH_MAX_CANDIDATES", "1000"))
+REFRESH_SECONDS = int(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", "300"))
+
+
+def trigrams(text: str) -> set:
+    text = text.lower()
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def match_score(text: str, term: str) -> float:
+    """Exact > prefix > word prefix > substring; earlier matches rank higher."""
+    position = text.find(term)
+    if position < 0:
+        return 0.0
+    if text == term:
+        return 4.0
+    if position == 0:
+        return 3.0
+    if not text[position - 1].isalnum():
+        return 2.0
+    return 1.0 + 1.0 / (1 + position)
+
+
+class SearchIndex:
+    """
+    In-memory trigram index over book title, author name and genre name.
+
+    Every worker process keeps its own copy: admin writes update the index of
+    the worker that served them, and the others pick the change up on their
+    next periodic refresh (SEARCH_INDEX_REFRESH_SECONDS).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._docs: Dict[str, Dict[str, str]] = {}
+        self._postings = {field: defaultdict(set) for field in FIELDS}
+        self.built_at: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def is_stale(self) -> bool:
+        return not self.ready or time.monotonic() - self.built_at > REFRESH_SECONDS
+
+    @staticmethod
+    def _catalog_statement():
+        from models import Book, Author, Genre
+
+        return (
+            select(Book.id, Book.title, Author.name, Genre.name)
+            .outerjoin(Author, Book.author_id == Author.id)
+            .outerjoin(Genre, Book.genre_id == Genre.id)
+        )
+
+    def rebuild(self, db: Session) -> int:
+        return self.load(db.execute(self._catalog_statement()).all())
+
+    def load(self, rows) -> int:
+        docs = {}
+        postings = {field: defaultdict(set) for field in FIELDS}
+        for book_id, title, author_name, genre_name in rows:
+            doc = self._make_doc(title, author_name, genre_name)
+            docs[book_id] = doc
+            for field, text in doc.items():
+                for gram in trigrams(text):
+                    postings[field][gram].add(book_id)
+
+        with self._lock:
+            self._docs = docs
+            self._postings = postings
+            self.built_at = time.monotonic()
+        return len(docs)
+
+    def add(self, book_id: str, title: str, author_name: Optional[str], genre_name: Optional[str]):
+        with self._lock:
+            self._discard(book_id)
+            doc = self._make_doc(title, author_name, genre_name)
+            self._docs[book_id] = doc
+            for field, text in doc.items():
+                for gram in trigrams(text):
+                    self._postings[field][gram].add(book_id)
+
+    def remove(self, book_id: str):
+        with self._lock:
+            self._discard(book_id)
+
+    def rename(self, field: str, old: str, new: str):
+        """Re-key every book whose author or genre was renamed."""
+        old, new = old.lower(), new.lower()
+        with self._lock:
+            affected = [book_id for book_id, doc in self._docs.items() if doc[field] == old]
+            for book_id in affected:
+                doc = self._docs[book_id]
+                self.add(book_id, doc["title"], new if field == "author_name" else doc["author_name"],
+                         new if field == "genre_name" else doc["genre_name"])
+
+    def search(self, **terms: Optional[str]) -> Dict[str, float]:
+        """
+        Return {book_id: score} for books matching every given field as a
+        case-insensitive substring, the same semantics as ilike('%term%').
+        """
+        result: Optional[Dict[str, float]] = None
+        with self._lock:
+            for field, term in terms.items():
+                if not term:
+                    continue
+                scores = self._search_field(field, term.lower())
+                if result is None:
+                    result = scores
+                else:
+                    result = {book_id: result[book_id] + score for book_id, score in scores.items() if book_id in result}
+                if not result:
+                    return {}
+        return result or {}
+
+    def _search_field(self, field: str, term: str) -> Dict[str, float]:
+        grams = trigrams(term)
+        if grams:
+            postings = self._postings[field]
+            candidates = None
+            for gram in sorted(grams, key=lambda g: len(postings.get(g, ()))):
+                ids = postings.get(gram)
+                if not ids:
+                    return {}
+                candidates = set(ids) if candidates is None else candidates & ids
+                if not candidates:
+                    return {}
+        else:
+            candidates = self._docs.keys()
+
+        scores = {}
+        for book_id in candidates:
+            score = match_score(self._docs[book_id][field], term)
+            if score:
+                scores[book_id] = score
+        return scores
+
+    def _discard(self, book_id: str):
+        doc = self._docs.pop(book_id, None)
+        if not doc:
+            return
+        for field, text in doc.items():
+            postings = self._postings[field]
+            for gram in trigrams(text):
+                ids = postings.get(gram)
+                if ids:
+                    ids.discard(book_id)
+                    if not ids:
+                        del postings[gram]
+
+    @staticmethod
+    def _make_doc(title, author_name, genre_name) -> Dict[str, str]:
+        return {
+            "title": (title or "").lower(),
+            "author_name": (author_name or "").lower(),
+            "genre_name": (genre_name or "").lower(),
+        }
+
+
+search_index = SearchIndex()
+
+
+search_refresh = BackgroundRebuild("search index", search_index.rebuild)
+
+
+def ranked_book_ids(title=None, author_name=None, genre_name=None) -> Optional[List[str]]:
+    """
+    Book ids matching the text filters, best match first, or None when the
+    index cannot answer and the caller should filter in SQL instead. A stale
+    index answers while it is rebuilt in the background; a worker that has
+    none yet filters in SQL until the first build lands.
+    """
+    if search_index.is_stale():
+        search_refresh.start()
+    if not search_index.ready:
+        return None
+    scores = search_index.search(title=title, author_name=author_name, genre_name=genre_name)
+    if len(scores) > MAX_CANDIDATES:
+        return None
+    return sorted(scores, key=lambda book_id: (-scores[book_id], book_id))
@@ -0,0 +1,147 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+load_dotenv()
+
+# First scheme is used for new hashes; hashes in any other listed scheme (bcrypt
+# is always accepted), or with a different bcrypt cost, are upgraded
+# transparently on the next login.
+PASSWORD_SCHEMES = [s.strip() for s in os.getenv("PASSWORD_SCHEMES", "bcrypt").split(",") if s.strip()]
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# 0 hashes in the AnyIO threadpool instead of a process pool.
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", str(max(PASSWORD_WORKERS, 1) * 8)))
+# How the pool starts its processes. Not "fork": the worker already runs
+# threads (the AnyIO threadpool, the favorites flusher), and a child forked
+# while one of them holds a lock inherits it locked forever. The children
+# import the main module again, so a script that imports the app and hashes
+# needs an `if __name__ == "__main__":` guard (uvicorn and gunicorn have one).
+PASSWORD_START_METHOD = os.getenv(
+    "PASSWORD_START_METHOD", "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _build_context() -> "CryptContext":
+    from passlib.context import CryptContext
+
+    schemes = PASSWORD_SCHEMES if "bcrypt" in PASSWORD_SCHEMES else PASSWORD_SCHEMES + ["bcrypt"]
+    return CryptContext(
+        schemes=schemes,
+        deprecated="auto",
+        bcrypt__default_rounds=BCRYPT_ROUNDS,
+        bcrypt__min_rounds=BCRYPT_ROUNDS,
+        bcrypt__max_rounds=BCRYPT_ROUNDS,
+    )
+
+
+_context = None
+
+
+def _password_context() -> "CryptContext":
+    # Built on first use: passlib and its bcrypt backend are not needed to start a worker.
+    global _context
+    if _context is None:
+        _context = _build_context()
+    return _context
+
+
+def __getattr__(name: str):
+    if name == "pwd_context":
+        return _password_context()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def hash_password(password: str) -> str:
+    return _password_context().hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _password_context().verify(plain_password, hashed_password)
+
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return _password_context().verify_and_update(plain_password, hashed_password)
+
+
+class PasswordService:
+    """
+    Runs password hashing off the event loop and off the shared AnyIO
+    threadpool, in a bounded process pool so it scales past the GIL.
+    Once PASSWORD_MAX_PENDING calls are queued or running, new calls fail
+    fast with 503 instead of piling up behind a login storm.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _acquire(self):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Authentication service is busy, try again shortly",
+                    headers={"Retry-After": "1"},
+                )
+            self.pending += 1
+
+    def _release(self):
+        with self._lock:
+            self.pending -= 1
+
+    def start(self):
+        """Creates the process pool; called on worker startup, or by the first hash otherwise."""
+        with self._lock:
+            if self.workers > 0 and self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context(PASSWORD_START_METHOD),
+                )
+
+    async def _run(self, func, *args):
+        self._acquire()
+        try:
+            if self.workers <= 0:
+                return await run_in_threadpool(func, *args)
+            if self._executor is None:
+                self.start()
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        return await self._run(verify_and_update, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "rejected": self.rejected,
+        }
+
+
+password_service = PasswordService(PASSWORD_WORKERS, PASSWORD_MAX_PENDING)
@@ -1,13 +1,26 @@
+import time
+_imports_started = time.perf_counter()
+
 import os
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
-from core.database import init_db, SessionLocal
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
+from utils.images import ImageStaticFiles
+from core.database import PoolTimeoutError, pool_timeout_handler
 from routers import auth, author, book, user, genre, shop, admin
-import core.crud as crud
+from core.bootstrap import startup_bootstrap, startup_report
+from core.search import search_refresh
+from core.ranking import ranking_refresh
+from core.security import password_service
+from core.counters import favorites_counter
+from core.instrumentation import SQLInstrumentationMiddleware
+from core.metrics import MetricsMiddleware, METRICS_ENABLED, render as render_metrics
 from fastapi.middleware.cors import CORSMiddleware
 
+startup_report.record("imports", time.perf_counter() - _imports_started)
+
 app = FastAPI()
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.add_exception_handler(PoolTimeoutError, pool_timeout_handler)
+app.mount("/static", ImageStaticFiles(directory="static"), name="static")
 
 app.include_router(author.router)
 app.include_router(auth.router)
@@ -28,17 +41,36 @@ app.add_middleware(
     allow_methods=["*"],  
     allow_headers=["*"],  
 )
+app.add_middleware(SQLInstrumentationMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 @app.get("/")
 def read_root():
     return {"message": "CORS настроен!"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 @app.on_event("startup")
-def startup():
-    init_db()
-    db = SessionLocal()
-    crud.init_statuses(db)
-    db.close()
+async def startup():
+    startup_bootstrap()
+    # The search index and ranking are per worker, so every worker loads its
+    # own; in the background, to take requests meanwhile (text filters fall
+    # back to SQL, trending pages wait for the ranking).
+    search_refresh.start()
+    ranking_refresh.start()
+    favorites_counter.start()
+    password_service.start()
+    startup_report.log()
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    await favorites_counter.stop()
+    password_service.shutdown()
     
     
 
@@ -0,0 +1,29 @@
+"""books.updated_at and favorites.created_at
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+
+updated_at drives the incremental export, created_at the trending ranking.
+Both stay NULL for existing rows.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("books", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.add_column("favorites", sa.Column("created_at", sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("favorites") as batch_op:
+        batch_op.drop_column("created_at")
+    with op.batch_alter_table("books") as batch_op:
+        batch_op.drop_column("updated_at")
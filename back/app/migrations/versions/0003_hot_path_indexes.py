@@ -0,0 +1,59 @@
+"""indexes for the shop's filters, sorts and per-user lookups
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Duplicate (user_id, book_id) rows are removed before the unique indexes are
+built. The oldest favorite is kept and the newest basket row is kept.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def _dedupe(table: str, keep: str) -> int:
+    result = op.get_bind().execute(sa.text(
+        f"DELETE FROM {table} WHERE id NOT IN ("
+        f"SELECT keep_id FROM (SELECT {keep}(id) AS keep_id FROM {table} GROUP BY user_id, book_id) AS kept)"
+    ))
+    return result.rowcount or 0
+
+
+def upgrade():
+    op.create_index("ix_books_release_date", "books", ["release_date", "id"])
+    op.create_index("ix_books_popularity", "books", ["favorites_count", "release_date", "id"])
+    op.create_index("ix_books_author_id", "books", ["author_id"])
+    op.create_index("ix_books_genre_id", "books", ["genre_id"])
+    op.create_index("ix_books_updated_at", "books", ["updated_at"])
+
+    if _dedupe("favorites", "MIN"):
+        op.get_bind().execute(sa.text(
+            "UPDATE books SET favorites_count = "
+            "(SELECT COUNT(*) FROM favorites WHERE favorites.book_id = books.id)"
+        ))
+    op.create_index("ix_favorites_user_book", "favorites", ["user_id", "book_id"], unique=True)
+    op.create_index("ix_favorites_book_id", "favorites", ["book_id"])
+    op.create_index("ix_favorites_created_at", "favorites", ["created_at"])
+
+    _dedupe("baskets", "MAX")
+    op.create_index("ix_baskets_user_book", "baskets", ["user_id", "book_id"], unique=True)
+    op.create_index("ix_baskets_user_status", "baskets", ["user_id", "status"])
+
+
+def downgrade():
+    op.drop_index("ix_baskets_user_status", table_name="baskets")
+    op.drop_index("ix_baskets_user_book", table_name="baskets")
+    op.drop_index("ix_favorites_created_at", table_name="favorites")
+    op.drop_index("ix_favorites_book_id", table_name="favorites")
+    op.drop_index("ix_favorites_user_book", table_name="favorites")
+    op.drop_index("ix_books_updated_at", table_name="books")
+    op.drop_index("ix_books_genre_id", table_name="books")
+    op.drop_index("ix_books_author_id", table_name="books")
+    op.drop_index("ix_books_popularity", table_name="books")
+    op.drop_index("ix_books_release_date", table_name="books")
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Text, Date, Numeric, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, ForeignKey, Text, Date, DateTime, Numeric, Enum, Index
+from sqlalchemy.orm import deferred, relationship
 from core.database import Base
 import enum
+from datetime import datetime
 
 class BasketStatus(enum.Enum):
     active = "active"
@@ -14,19 +15,27 @@ class Book(Base):
     
     id = Column(String(20), primary_key=True)  
     title = Column(String(200), nullable=False)
-    description = Column(Text, nullable=False)
-    genre_id = Column(Integer, ForeignKey('genres.id'), nullable=True)  
-    author_id = Column(Integer, ForeignKey('authors.id'), nullable=False)
+    # Unbounded text only the book page needs; loaded on first access (or with undefer()).
+    description = deferred(Column(Text, nullable=False))
+    genre_id = Column(Integer, ForeignKey('genres.id'), nullable=True, index=True)  
+    author_id = Column(Integer, ForeignKey('authors.id'), nullable=False, index=True)
     release_date = Column(Date, nullable=True)
     favorites_count = Column(Integer, default = 0, nullable=False)
     img = Column(String(255), nullable=True)
     price = Column(Numeric(10, 2), nullable=False)
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     author = relationship("Author", back_populates="books")
     genre = relationship("Genre", back_populates="books")
     favorites = relationship("Favorite", back_populates="book", cascade="all, delete-orphan")
     baskets = relationship("Basket", back_populates="book", cascade="all, delete-orphan")
 
+    # Match the ORDER BY of the date and popularity listings (and their keysets).
+    __table_args__ = (
+        Index("ix_books_release_date", "release_date", "id"),
+        Index("ix_books_popularity", "favorites_count", "release_date", "id"),
+    )
+
 class Genre(Base):
     __tablename__ = 'genres'
     
@@ -71,11 +80,16 @@ class Favorite(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer,ForeignKey("users.id" , ondelete="CASCADE"), nullable=False)
-    book_id = Column(String(20), ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
+    book_id = Column(String(20), ForeignKey("books.id", ondelete="CASCADE"), nullable=False, index=True)
+    created_at = Column(DateTime, nullable=True, default=datetime.utcnow, index=True)
     
     book = relationship("Book", back_populates="favorites")
     user = relationship("User", back_populates="favorites")
 
+    __table_args__ = (
+        Index("ix_favorites_user_book", "user_id", "book_id", unique=True),
+    )
+
 
 class Basket(Base):
     __tablename__ = "baskets"
@@ -87,4 +101,41 @@ class Basket(Base):
     status = Column(Enum(BasketStatus), default=BasketStatus.active, nullable=False)
 
     book = relationship("Book", back_populates="baskets")
-    user = relationship("User", back_populates="baskets")
\ No newline at end of file
+    user = relationship("User", back_populates="baskets")
+
+    __table_args__ = (
+        Index("ix_baskets_user_book", "user_id", "book_id", unique=True),
+        Index("ix_baskets_user_status", "user_id", "status"),
+    )
+
+class Order(Base):
+    __tablename__ = "orders"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Filled in by checkout from the order's items, in SQL.
+    total = Column(Numeric(12, 2), nullable=False, default=0)
+    items_count = Column(Integer, nullable=False, default=0)
+
+    items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    user = relationship("User")
+
+    # Order history pages newest first, per user, by id.
+    __table_args__ = (
+        Index("ix_orders_user_id", "user_id", "id"),
+    )
+
+
+class OrderItem(Base):
+    __tablename__ = "order_items"
+
+    id = Column(Integer, primary_key=True)
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=False, index=True)
+    # Title and price are copied at purchase time; the book may change or go away later.
+    book_id = Column(String(20), ForeignKey("books.id", ondelete="SET NULL"), nullable=True)
+    title = Column(String(200), nullable=False)
+    price = Column(Numeric(10, 2), nullable=False)
+    quantity = Column(Integer, nullable=False)
+
+    order = relationship("Order", back_populates="items")
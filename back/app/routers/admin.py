@@ -1,13 +1,19 @@
-from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, Depends, UploadFile, File, Form, BackgroundTasks, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import Optional
 from models import Book, Author, Genre
 from schemas import BookResponse, Genre as GenreSchema, Author as AuthorSchema
-from core.database import get_db
+from core.database import get_db, SessionLocal, pool_stats
+from core.bulk_import import ImportJob, read_feed, run_import, register_job, get_job
+from core.export import iter_catalog
+from core.counters import reconcile_favorites_count
+from core.search import search_index
+from core.ranking import ranking
+from core.cache import cache_stats, catalog_cache
 from utils.deps import get_current_admin
+from utils.images import save_image, release_image
 from datetime import datetime
-import os
-from pathlib import Path
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -50,21 +56,7 @@ def create_book(
 
     img_path = None
     if img:
-        images_dir = Path(__file__).parent.parent / "static/images/books"
-        os.makedirs(images_dir, exist_ok=True)
-        img_filename = f"{id}_{img.filename}"
-        img_full_path = images_dir / img_filename
-        logger.info(f"Saving image to: {img_full_path}")
-        try:
-            with open(img_full_path, "wb") as f:
-                f.write(img.file.read())
-            if not img_full_path.exists():
-                raise IOError("File was not saved")
-            img_path = img_filename
-            logger.info(f"File saved successfully: {img_full_path}")
-        except Exception as e:
-            logger.error(f"Failed to save image: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+        img_path = save_image(img, "books")
 
     release_date_obj = None
     if release_date:
@@ -94,6 +86,10 @@ def create_book(
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create book")
 
+    catalog_cache.bump()
+    search_index.add(db_book.id, db_book.title, author_name, genre_name)
+    ranking.upsert(db_book.id, db_book.genre_id, db_book.release_date, db_book.favorites_count or 0)
+
     return BookResponse(
         id=db_book.id,
         title=db_book.title,
@@ -119,21 +115,7 @@ def create_genre(
 
     img_path = None
     if img:
-        images_dir = Path(__file__).parent.parent / "static/images/genres"
-        os.makedirs(images_dir, exist_ok=True)
-        img_filename = f"genre_{name}_{img.filename}"
-        img_full_path = images_dir / img_filename
-        logger.info(f"Saving image to: {img_full_path}")
-        try:
-            with open(img_full_path, "wb") as f:
-                f.write(img.file.read())
-            if not img_full_path.exists():
-                raise IOError("File was not saved")
-            img_path = img_filename
-            logger.info(f"File saved successfully: {img_full_path}")
-        except Exception as e:
-            logger.error(f"Failed to save image: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+        img_path = save_image(img, "genres")
 
     db_genre = Genre(name=name, img=img_path)
     try:
@@ -145,6 +127,7 @@ def create_genre(
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create genre")
 
+    catalog_cache.bump()
     return GenreSchema.from_orm(db_genre)
 
 @router.post("/authors/", response_model=AuthorSchema)
@@ -167,6 +150,7 @@ def create_author(
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to create author")
 
+    catalog_cache.bump()
     return AuthorSchema.from_orm(db_author)
 
 @router.put("/books/{book_id}", response_model=BookResponse)
@@ -218,28 +202,9 @@ def update_book(
     if price is not None:
         db_book.price = price
 
+    old_img = db_book.img
     if img:
-        images_dir = Path(__file__).parent.parent / "static/images/books"
-        os.makedirs(images_dir, exist_ok=True)
-        img_filename = f"{book_id}_{img.filename}"
-        img_full_path = images_dir / img_filename
-
-        if db_book.img:
-            old_img_path = images_dir / db_book.img
-            if old_img_path.exists():
-                os.remove(old_img_path)
-                logger.info(f"Deleted old image: {old_img_path}")
-
-        try:
-            with open(img_full_path, "wb") as f:
-                f.write(img.file.read())
-            if not img_full_path.exists():
-                raise IOError("File was not saved")
-            db_book.img = img_filename
-            logger.info(f"Updated image to: {img_full_path}")
-        except Exception as e:
-            logger.error(f"Failed to save image: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+        db_book.img = save_image(img, "books")
 
     try:
         db.commit()
@@ -249,8 +214,14 @@ def update_book(
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to update book")
 
+    if old_img != db_book.img:
+        release_image(db, Book, "books", old_img)
+
+    catalog_cache.bump()
     db_genre = db.query(Genre).filter(Genre.id == db_book.genre_id).first() if db_book.genre_id else None
     db_author = db.query(Author).filter(Author.id == db_book.author_id).first()
+    search_index.add(db_book.id, db_book.title, db_author.name, db_genre.name if db_genre else None)
+    ranking.upsert(db_book.id, db_book.genre_id, db_book.release_date, db_book.favorites_count)
     return BookResponse(
         id=db_book.id,
         title=db_book.title,
@@ -274,16 +245,7 @@ def delete_book(
     if not db_book:
         raise HTTPException(status_code=404, detail="Book not found")
 
-    if db_book.img:
-        images_dir = Path(__file__).parent.parent / "static/images/books"
-        img_path = images_dir / db_book.img
-        if img_path.exists():
-            try:
-                os.remove(img_path)
-                logger.info(f"Deleted image: {img_path}")
-            except Exception as e:
-                logger.error(f"Failed to delete image: {str(e)}")
-
+    old_img = db_book.img
     try:
         db.delete(db_book)
         db.commit()
@@ -292,6 +254,10 @@ def delete_book(
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to delete book")
 
+    release_image(db, Book, "books", old_img)
+
+    search_index.remove(book_id)
+    ranking.remove(book_id)
     return None
 
 @router.put("/genres/{genre_name}", response_model=GenreSchema)
@@ -311,28 +277,9 @@ def update_genre(
             raise HTTPException(status_code=400, detail="Genre with this new name already exists")
         db_genre.name = new_name
 
+    old_img = db_genre.img
     if img:
-        images_dir = Path(__file__).parent.parent / "static/images/genres"
-        os.makedirs(images_dir, exist_ok=True)
-        img_filename = f"genre_{db_genre.name}_{img.filename}"
-        img_full_path = images_dir / img_filename
-
-        if db_genre.img:
-            old_img_path = images_dir / db_genre.img
-            if old_img_path.exists():
-                os.remove(old_img_path)
-                logger.info(f"Deleted old image: {old_img_path}")
-
-        try:
-            with open(img_full_path, "wb") as f:
-                f.write(img.file.read())
-            if not img_full_path.exists():
-                raise IOError("File was not saved")
-            db_genre.img = img_filename
-            logger.info(f"Updated image to: {img_full_path}")
-        except Exception as e:
-            logger.error(f"Failed to save image: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+        db_genre.img = save_image(img, "genres")
 
     try:
         db.commit()
@@ -342,6 +289,12 @@ def update_genre(
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to update genre")
 
+    if old_img != db_genre.img:
+        release_image(db, Genre, "genres", old_img)
+
+    catalog_cache.bump()
+    if db_genre.name != genre_name:
+        search_index.rename("genre_name", genre_name, db_genre.name)
     return GenreSchema.from_orm(db_genre)
 
 @router.delete("/genres/{genre_name}", status_code=204)
@@ -357,16 +310,7 @@ def delete_genre(
     if db.query(Book).filter(Book.genre_id == db_genre.id).first():
         raise HTTPException(status_code=400, detail="Cannot delete genre with associated books")
 
-    if db_genre.img:
-        images_dir = Path(__file__).parent.parent / "static/images/genres"
-        img_path = images_dir / db_genre.img
-        if img_path.exists():
-            try:
-                os.remove(img_path)
-                logger.info(f"Deleted image: {img_path}")
-            except Exception as e:
-                logger.error(f"Failed to delete image: {str(e)}")
-
+    old_img = db_genre.img
     try:
         db.delete(db_genre)
         db.commit()
@@ -375,6 +319,9 @@ def delete_genre(
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to delete genre")
 
+    release_image(db, Genre, "genres", old_img)
+
+    catalog_cache.bump()
     return None
 
 @router.put("/authors/{author_name}", response_model=AuthorSchema)
@@ -405,6 +352,9 @@ def update_author(
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to update author")
 
+    catalog_cache.bump()
+    if db_author.name != author_name:
+        search_index.rename("author_name", author_name, db_author.name)
     return AuthorSchema.from_orm(db_author)
 
 @router.delete("/authors/{author_name}", status_code=204)
@@ -428,4 +378,115 @@ def delete_author(
         logger.error(f"Database error: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to delete author")
 
-    return None
\ No newline at end of file
+    catalog_cache.bump()
+    return None
+
+@router.post("/search/rebuild", response_model=dict)
+def rebuild_search_index(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_admin)
+):
+    indexed = search_index.rebuild(db)
+    logger.info(f"Search index rebuilt: {indexed} books")
+    return {"indexed": indexed}
+
+@router.post("/ranking/rebuild", response_model=dict)
+def rebuild_ranking(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_admin)
+):
+    ranked = ranking.rebuild(db)
+    logger.info(f"Ranking rebuilt: {ranked} books")
+    return {"ranked": ranked, **ranking.stats()}
+
+@router.get("/cache/stats", response_model=dict)
+def get_cache_stats(current_user=Depends(get_current_admin)):
+    return cache_stats()
+
+@router.get("/db/pool", response_model=dict)
+def get_pool_stats(current_user=Depends(get_current_admin)):
+    return pool_stats()
+
+
+def _import_feed(content: bytes, fmt: str, job: ImportJob, db: Session):
+    try:
+        frame = read_feed(content, fmt)
+    except Exception as e:
+        job.status = "failed"
+        job.errors.append({"row": None, "id": None, "error": str(e)})
+        return job
+    run_import(db, frame, job)
+    if job.inserted:
+        catalog_cache.bump()
+        search_index.rebuild(db)
+        ranking.rebuild(db)
+    logger.info(f"Import {job.id} {job.status}: {job.inserted}/{job.total} books in {job.report()['elapsed']}s")
+    return job
+
+
+def _import_feed_background(content: bytes, fmt: str, job: ImportJob):
+    db = SessionLocal()
+    try:
+        _import_feed(content, fmt, job, db)
+    finally:
+        db.close()
+
+
+@router.post("/import/books", response_model=dict)
+def import_books(
+    background_tasks: BackgroundTasks,
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None, description="'csv' or 'jsonl'; inferred from the file name if omitted"),
+    background: bool = Form(False, description="Return a job id immediately and import in the background"),
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_admin)
+):
+    fmt = (format or (file.filename or "").rsplit(".", 1)[-1]).lower()
+    if fmt == "ndjson":
+        fmt = "jsonl"
+    if fmt not in ("csv", "jsonl"):
+        raise HTTPException(status_code=400, detail="Unsupported format, use csv or jsonl")
+
+    content = file.file.read()
+    job = register_job(ImportJob())
+    if background:
+        background_tasks.add_task(_import_feed_background, content, fmt, job)
+        return {"job_id": job.id, "status": job.status}
+
+    return _import_feed(content, fmt, job, db).report()
+
+
+@router.get("/import/{job_id}", response_model=dict)
+def get_import_status(job_id: str, current_user=Depends(get_current_admin)):
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Import job not found")
+    return job.report()
+
+
+@router.get("/export/books")
+def export_books(
+    format: str = Query("ndjson", description="'ndjson' or 'csv'"),
+    updated_since: Optional[datetime] = Query(None, description="Only books changed at or after this time"),
+    current_user=Depends(get_current_admin)
+):
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Unsupported format, use ndjson or csv")
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    filename = f"books.{'csv' if format == 'csv' else 'ndjson'}"
+    return StreamingResponse(
+        iter_catalog(format, updated_since),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.post("/favorites/reconcile", response_model=dict)
+def reconcile_favorites(
+    db: Session = Depends(get_db),
+    current_user=Depends(get_current_admin)
+):
+    fixed = reconcile_favorites_count(db)
+    logger.info(f"Reconciled favorites_count on {fixed} books")
+    return {"fixed": fixed}
@@ -1,49 +1,71 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
 from fastapi.security import OAuth2PasswordRequestForm
 from datetime import timedelta
 
 from models import User, Role
 from schemas import UserCreate, UserOut, Token
-from utils.deps import hash_password, verify_password, get_current_user_required
+from utils.deps import get_current_user_required
 from utils.jwt import create_access_token
-from core.database import get_db
+from core.database import primary_session
+from core.security import password_service
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 
+# Hashing or verifying a password takes ~250 ms in the password pool. These
+# endpoints look the user up on one short session and write on another, so
+# no session (or sync session slot) is held while they wait for it.
+
+
+async def _find_user(email: str):
+    async with primary_session() as db:
+        return await db.scalar(select(User).where(User.email == email))
+
+
+async def _save(obj):
+    async with primary_session() as db:
+        db.add(obj)
+        await db.commit()
+        await db.refresh(obj)
+        return obj
+
+
+async def _store_hash(user_id: int, hashed_password: str):
+    async with primary_session() as db:
+        await db.execute(update(User).where(User.id == user_id).values(hashed_password=hashed_password))
+        await db.commit()
+
 
 @router.post("/register", response_model=UserOut)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.email == user_data.email).first():
+async def register(user_data: UserCreate):
+    if await _find_user(user_data.email):
         raise HTTPException(status_code=400, detail="Email already registered")
 
     user = User(
         nickname=user_data.nickname,
         email=user_data.email,
-        hashed_password=hash_password(user_data.password),
-        role_id=2 
+        hashed_password=await password_service.hash(user_data.password),
+        role_id=2
     )
-    
-    db.add(user)
-    db.commit()
-    db.refresh(user)
-    return user
 
+    return await _save(user)
 
-@router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    print(f"Received login request: username={form_data.username}, password={form_data.password}")
 
+@router.post("/login", response_model=Token)
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     if not form_data.username or not form_data.password:
         raise HTTPException(status_code=400, detail="Username and password required")
 
-    user = db.query(User).filter(User.email == form_data.username).first()
-    
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await _find_user(form_data.username)
+    if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
-    access_token = create_access_token({"sub": user.email}, timedelta(hours=1))
-    return {"access_token": access_token, "token_type": "bearer", "nickname": user.nickname}
-
+    verified, new_hash = await password_service.verify_and_update(form_data.password, user.hashed_password)
+    if not verified:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
 
+    if new_hash:
+        await _store_hash(user.id, new_hash)
 
+    access_token = create_access_token({"sub": user.email}, timedelta(hours=1))
+    return {"access_token": access_token, "token_type": "bearer", "nickname": user.nickname}
@@ -1,36 +1,38 @@
 # routers/author.py
 
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session, joinedload 
+from fastapi import APIRouter, HTTPException, Depends, Request
+from pydantic import TypeAdapter
+from sqlalchemy import select
 from typing import List
-from models import Author, Book 
+from models import Author
 
 from schemas import AuthorListItem, Author as AuthorSchema, BookSummaryForAuthor
-from core.database import get_db 
+from core.database import get_read_db
+from core.cache import catalog_cache, cached_json_response, CATALOG_MAX_AGE
+from core.read_models import author_books_statement, author_book_summaries
 
 router = APIRouter(
     prefix="/authors", 
     tags=["Author"]    
 )
 
+_authors_adapter = TypeAdapter(List[AuthorListItem])
+
 @router.get("/", response_model=List[AuthorListItem])
-def get_authors(db: Session = Depends(get_db)):
-    
-    authors = db.query(Author.id, Author.name).order_by(Author.name).all()
-    
-    return authors 
+async def get_authors(request: Request, db=Depends(get_read_db)):
+    entry = catalog_cache.get("authors")
+    if entry is None:
+        version = catalog_cache.version
+        authors = (await db.execute(select(Author.id, Author.name).order_by(Author.name))).all()
+        entry = catalog_cache.set("authors", _authors_adapter.dump_json(_authors_adapter.validate_python(authors, from_attributes=True)), version)
+    return cached_json_response(request, entry, CATALOG_MAX_AGE)
 
 @router.get("/{author_id}", response_model=AuthorSchema)
-def get_author_details(author_id: int, db: Session = Depends(get_db)):
-    
-    author = db.query(Author).options(
-       
-        joinedload(Author.books)
-    ).filter(Author.id == author_id).first()
-
-    
+async def get_author_details(author_id: int, db=Depends(get_read_db)):
+    # Two narrow statements rather than one join, which would repeat Author.info on every book row.
+    author = (await db.execute(select(Author.id, Author.name, Author.info).where(Author.id == author_id))).first()
     if not author:
         raise HTTPException(status_code=404, detail=f"Author with id {author_id} not found")
 
-   
-    return author
\ No newline at end of file
+    books = (await db.execute(author_books_statement(author_id))).all()
+    return AuthorSchema(id=author.id, name=author.name, info=author.info, books=author_book_summaries(books))
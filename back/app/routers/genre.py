@@ -1,14 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, Request
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from core.cache import catalog_cache, cached_json_response, CATALOG_MAX_AGE
+from core.database import get_read_db
 from models import Genre
-from core.crud import get_all_genres
 from schemas import GenreOut
 from typing import List
 
 router = APIRouter(prefix="/genres", tags=["Genre"])
 
+_genres_adapter = TypeAdapter(List[GenreOut])
+
 @router.get("/",response_model=List[GenreOut])
-def get_genres(db: Session = Depends(get_db)):
-    genres = db.query(Genre).all()
-    return genres
\ No newline at end of file
+async def get_genres(request: Request, db=Depends(get_read_db)):
+    entry = catalog_cache.get("genres")
+    if entry is None:
+        version = catalog_cache.version
+        genres = (await db.scalars(select(Genre))).all()
+        entry = catalog_cache.set("genres", _genres_adapter.dump_json(_genres_adapter.validate_python(genres, from_attributes=True)), version)
+    return cached_json_response(request, entry, CATALOG_MAX_AGE)
@@ -1,192 +1,310 @@
 from fastapi import APIRouter, Depends, Query, HTTPException
-from sqlalchemy import desc, extract
-from sqlalchemy.orm import Session
+from sqlalchemy import desc, select
 from typing import List, Optional
-from core.database import get_db
-from models import Book, Favorite, User, Genre, Author, Basket, BasketStatus
-from schemas import BookResponse, BookShopMainResponse, BasketCreate
+from core.database import get_async_db, get_read_db
+from core.counters import favorites_counter
+from core.batch import apply_batch
+from core.orders import checkout, order_page
+from core.read_models import card_response, card_statement, detail_response, detail_statement
+from core.responses import FastJSON
+from core.filters import CatalogFilters, catalog_filters, compile_filters, genre_ids
+from core.ranking import MODES as RANKING_MODES, ranking, ensure_fresh, cursor_key, key_cursor_values
+from models import Book, Favorite, User, Basket, BasketStatus
+from schemas import (
+    BookResponse, BookShopMainResponse, BookShopPage, BasketCreate, BatchRequest, BatchResponse,
+    CheckoutResponse, OrderPage, OrderResponse,
+)
 from utils.deps import get_current_user_optional, get_current_user_required
+from utils.pagination import encode_cursor, decode_cursor, parse_cursor_date, keyset_segments
 
 router = APIRouter(prefix="/shop", tags=["Shop"])
 
+# Read endpoints whose models come from core.read_models or the ORM, rendered
+# without FastAPI re-validating them against response_model.
+_render_cards = FastJSON(List[BookShopMainResponse])
+_render_card_page = FastJSON(BookShopPage)
+_render_book = FastJSON(BookResponse)
+_render_books = FastJSON(List[BookResponse])
+_render_orders = FastJSON(OrderPage)
 
 
-@router.get("/", response_model=List[BookShopMainResponse]) 
-def get_books(
-    db: Session = Depends(get_db),
+
+def _sort_columns(sort_by: Optional[str]):
+    if sort_by == "popularity":
+        return [Book.favorites_count, Book.release_date, Book.id]
+    return [Book.release_date, Book.id]
+
+
+def _cursor_values(book, sort_by: Optional[str]) -> list:
+    if sort_by == "popularity":
+        return [book.favorites_count, book.release_date, book.id]
+    return [book.release_date, book.id]
+
+
+def _cursor_after(cursor: str, sort_by: Optional[str]) -> list:
+    """Decoded _cursor_values of the last book of the previous page; 400 unless they have its types."""
+    values = decode_cursor(cursor, len(_sort_columns(sort_by)))
+    *counts, release_date, book_id = values
+    if not isinstance(book_id, str) or not isinstance(release_date, (str, type(None))) or any(type(count) is not int for count in counts):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    values[-2] = parse_cursor_date(release_date)
+    return values
+
+
+async def _ranked_page(db, sort_by: str, filters: CatalogFilters, offset=0, limit=20, after=None):
+    """
+    Ranking keys (book id last) of one popularity or trending page, read from
+    the precomputed ranking, or None when SQL should sort instead. Popularity
+    falls back to SQL on a worker whose first ranking is still being built;
+    trending has no column to sort by and waits for it.
+    """
+    if not await ensure_fresh(wait=sort_by == "trending"):
+        return None
+    if filters.only_genres:
+        return ranking.page(sort_by, await genre_ids(db, filters), offset=offset, limit=limit, after=after)
+    if sort_by == "popularity":
+        return None
+
+    # Trending has no column to ORDER BY: rank the filtered ids in memory.
+    query, _ = await compile_filters(db, filters, ids_only=True)
+    keys = ranking.order(sort_by, (await db.scalars(query)).all())
+    if after is not None:
+        keys = [key for key in keys if key < after]
+    return keys[offset:offset + limit]
+
+
+async def _cards_in_order(db, book_ids: List[str]) -> list:
+    if not book_ids:
+        return []
+    rows = (await db.execute(card_statement().where(Book.id.in_(book_ids)))).all()
+    by_id = {row.id: row for row in rows}
+    return [by_id[book_id] for book_id in book_ids if book_id in by_id]
+
+
+async def _shop_items(db, books: list, user: Optional[User]) -> List[BookShopMainResponse]:
+    favorite_book_ids = set()
+    if user and books:
+        favorites = await db.scalars(
+            select(Favorite.book_id).where(Favorite.user_id == user.id, Favorite.book_id.in_([book.id for book in books]))
+        )
+        favorite_book_ids = set(favorites.all())
+    return [card_response(book, favorite_book_ids) for book in books]
+
+
+@router.get("/", response_model=List[BookShopMainResponse])
+async def get_books(
+    db=Depends(get_read_db),
     user: Optional[User] = Depends(get_current_user_optional),
-    genre_name: Optional[str] = Query(None, description="Filter by genre name"),
-    author_name: Optional[str] = Query(None, description="Filter by author name"),
-    year: Optional[int] = Query(None, description="Filter by release year"),
-    title: Optional[str] = Query(None, description="Search by book title"),
-    sort_by: Optional[str] = Query("date", description="Sort by 'date' or 'popularity'"),
-    limit: int = Query(20, ge=1, le=100, description="Limit of records"), 
+    filters: CatalogFilters = Depends(catalog_filters),
+    sort_by: Optional[str] = Query("date", description="Sort by 'date', 'popularity', 'trending' or 'relevance'"),
+    limit: int = Query(20, ge=1, le=100, description="Limit of records"),
     offset: int = Query(0, ge=0, description="Offset for pagination")
 ):
-    
-    query = db.query(Book).outerjoin(Genre, Book.genre_id == Genre.id).outerjoin(Author, Book.author_id == Author.id) 
-
-    
-    if genre_name:
-        query = query.filter(Genre.name.ilike(f"%{genre_name}%"))
-    if author_name:
-        query = query.filter(Author.name.ilike(f"%{author_name}%"))
-    if year:
-        query = query.filter(extract('year', Book.release_date) == year)
-    if title:
-        query = query.filter(Book.title.ilike(f"%{title}%"))
-
-    
-    if sort_by == "popularity":
-        query = query.order_by(desc(Book.favorites_count), desc(Book.release_date))
+    if sort_by in RANKING_MODES:
+        keys = await _ranked_page(db, sort_by, filters, offset=offset, limit=limit)
+        if keys is not None:
+            return _render_cards(await _shop_items(db, await _cards_in_order(db, [key[-1] for key in keys]), user))
+
+    query, ranked_ids = await compile_filters(db, filters)
+
+    if sort_by == "relevance" and ranked_ids is not None:
+        rank = {book_id: position for position, book_id in enumerate(ranked_ids)}
+        books = sorted((await db.execute(query)).all(), key=lambda book: rank[book.id])[offset:offset + limit]
     else:
-        query = query.order_by(desc(Book.release_date))
-
-    
-    books = query.limit(limit).offset(offset).all()
-
-    
-    favorite_book_ids = set() 
-    if user:
-        
-        favorites = db.query(Favorite.book_id).filter(Favorite.user_id == user.id).all()
-        favorite_book_ids = {fav.book_id for fav in favorites}
-
- 
-    response_data = []
-    for book in books:
-        is_fav = book.id in favorite_book_ids 
-        response_data.append(
-            BookShopMainResponse(
-                id=str(book.id),  
-                title=book.title,
-                img=f"/static/images/books/{book.img}" if book.img else None,
-                author_name=book.author.name if book.author else "Unknown Author",
-                is_favorite=is_fav 
-            )
-        )
+        query = query.order_by(*[desc(column) for column in _sort_columns(sort_by)])
+        books = (await db.execute(query.limit(limit).offset(offset))).all()
+
+    return _render_cards(await _shop_items(db, books, user))
 
-    return response_data
+
+@router.get("/page", response_model=BookShopPage)
+async def get_books_page(
+    db=Depends(get_read_db),
+    user: Optional[User] = Depends(get_current_user_optional),
+    filters: CatalogFilters = Depends(catalog_filters),
+    sort_by: Optional[str] = Query("date", description="Sort by 'date', 'popularity' or 'trending'"),
+    limit: int = Query(20, ge=1, le=100, description="Limit of records"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    """
+    Keyset-paginated variant of the catalog listing: the cost of a page does not
+    depend on how deep it is, unlike limit/offset on GET /shop/.
+    """
+    if sort_by in RANKING_MODES:
+        after = None
+        if cursor:
+            try:
+                after = cursor_key(sort_by, decode_cursor(cursor, 3 if sort_by == "popularity" else 2))
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        keys = await _ranked_page(db, sort_by, filters, limit=limit + 1, after=after)
+        if keys is not None:
+            next_cursor = None
+            if len(keys) > limit:
+                keys = keys[:limit]
+                next_cursor = encode_cursor(key_cursor_values(sort_by, keys[-1]))
+            books = await _cards_in_order(db, [key[-1] for key in keys])
+            return _render_card_page(BookShopPage(items=await _shop_items(db, books, user), next_cursor=next_cursor))
+
+    columns = _sort_columns(sort_by)
+    query, _ = await compile_filters(db, filters)
+
+    segments = [None]
+    if cursor:
+        segments = keyset_segments(columns, _cursor_after(cursor, sort_by), nullable=(Book.release_date,))
+
+    query = query.order_by(*[desc(column) for column in columns])
+    books = []
+    for segment in segments:
+        page = query if segment is None else query.where(segment)
+        books += (await db.execute(page.limit(limit + 1 - len(books)))).all()
+        if len(books) > limit:
+            break
+
+    next_cursor = None
+    if len(books) > limit:
+        books = books[:limit]
+        next_cursor = encode_cursor(_cursor_values(books[-1], sort_by))
+
+    return _render_card_page(BookShopPage(items=await _shop_items(db, books, user), next_cursor=next_cursor))
 
 @router.get("/book/{book_id}", response_model=BookResponse)
-def get_book_info(
+async def get_book_info(
     book_id: str,
-    db: Session = Depends(get_db),
+    db=Depends(get_read_db),
     user: Optional[User] = Depends(get_current_user_optional)
 ):
-    book = db.query(Book).filter(Book.id == book_id).first()
+    book = (await db.execute(detail_statement(user.id if user else None).where(Book.id == book_id))).first()
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-
-    is_favorite = False
-    if user:
-        is_favorite = db.query(Favorite).filter(Favorite.user_id == user.id, Favorite.book_id == book_id).first() is not None
-
-    return BookResponse(
-        id=str(book.id),
-        title=book.title,
-        description=book.description,
-        genre_name=book.genre.name if book.genre else "No genre",
-        author_name=book.author.name if book.author else "Unknown author",
-        release_date=str(book.release_date) if book.release_date else None,
-        favorites_count=book.favorites_count,
-        is_favorite=is_favorite,
-        img=f"/static/images/books/{book.img}" if book.img else "/static/images/books/default.jpg",
-        price=float(book.price)
-    )
+    return _render_book(detail_response(book, is_favorite=user is not None and book.favorite_id is not None))
 
 @router.get("/favorites/", response_model=List[BookResponse])
-def get_favorites(
-    db: Session = Depends(get_db),
+async def get_favorites(
+    db=Depends(get_read_db),
     user: User = Depends(get_current_user_required)
 ):
-    favorite_books = db.query(Book).join(Favorite, Favorite.book_id == Book.id).join(Genre, Book.genre_id == Genre.id).join(Author, Book.author_id == Author.id).filter(Favorite.user_id == user.id).all()
-
-    return [
-        BookResponse(
-            id=str(book.id),
-            title=book.title,
-            description=book.description,
-            genre_name=book.genre.name if book.genre else "No genre",
-            author_name=book.author.name if book.author else "Unknown author",
-            release_date=str(book.release_date) if book.release_date else None,
-            favorites_count=book.favorites_count,
-            is_favorite=True,
-            img=f"/static/images/books/{book.img}" if book.img else "/static/images/books/default.jpg",
-            price=float(book.price)
-        )
-        for book in favorite_books
-    ]
+    favorite_books = (await db.execute(
+        detail_statement().join(Favorite, Favorite.book_id == Book.id).where(Favorite.user_id == user.id)
+    )).all()
+    return _render_books([detail_response(book, is_favorite=True) for book in favorite_books])
 
 @router.post("/favorites/{book_id}", response_model=dict)
-def add_to_favorites(
+async def add_to_favorites(
     book_id: str,
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
     user: User = Depends(get_current_user_required)
 ):
-    book = db.query(Book).filter(Book.id == book_id).first()
+    book = await db.get(Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
-    existing_favorite = db.query(Favorite).filter(Favorite.user_id == user.id, Favorite.book_id == book_id).first()
+    existing_favorite = await db.scalar(select(Favorite).where(Favorite.user_id == user.id, Favorite.book_id == book_id))
     if existing_favorite:
         raise HTTPException(status_code=400, detail="Book already in favorites")
 
     favorite = Favorite(user_id=user.id, book_id=book_id)
     db.add(favorite)
-    book.favorites_count += 1
+    await favorites_counter.apply(db, book_id, 1)
     try:
-        db.commit()
-        db.refresh(favorite)
+        await db.commit()
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to add book to favorites")
+    favorites_counter.committed(book_id, 1)
+    ranking.record(book_id, 1, favorite.created_at)
     return {"message": f"Book {book_id} added to favorites"}
 
 @router.delete("/favorites/{book_id}", response_model=dict)
-def remove_from_favorites(
+async def remove_from_favorites(
     book_id: str,
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
     user: User = Depends(get_current_user_required)
 ):
-    book = db.query(Book).filter(Book.id == book_id).first()
+    book = await db.get(Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
-    favorite = db.query(Favorite).filter(Favorite.user_id == user.id, Favorite.book_id == book_id).first()
+    favorite = await db.scalar(select(Favorite).where(Favorite.user_id == user.id, Favorite.book_id == book_id))
     if not favorite:
         raise HTTPException(status_code=404, detail="Book not in favorites")
 
-    db.delete(favorite)
-    book.favorites_count -= 1
+    await db.delete(favorite)
+    await favorites_counter.apply(db, book_id, -1)
     try:
-        db.commit()
+        await db.commit()
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to remove book from favorites")
+    favorites_counter.committed(book_id, -1)
+    ranking.record(book_id, -1, favorite.created_at)
     return {"message": f"Book {book_id} removed from favorites"}
 
+@router.post("/batch", response_model=BatchResponse)
+async def apply_basket_and_favorites_batch(
+    batch: BatchRequest,
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    """
+    Basket and favorites changes for several books in one request and one
+    transaction, e.g. moving favorites to the basket. Each operation gets
+    its own status and message, as the single-book endpoints would return.
+    """
+    return BatchResponse(results=await apply_batch(db, current_user.id, batch.operations))
+
+# Declared before POST /basket/{book_id}, which would otherwise match "purchase" as a book id.
+@router.post("/basket/purchase", response_model=CheckoutResponse)
+async def purchase_basket(
+    db=Depends(get_async_db),
+    current_user: User = Depends(get_current_user_required)
+):
+    order = await checkout(db, current_user.id)
+    return CheckoutResponse(message="Purchase completed successfully", order=OrderResponse.model_validate(order))
+
+@router.get("/orders/", response_model=OrderPage)
+async def get_orders(
+    db=Depends(get_read_db),
+    current_user: User = Depends(get_current_user_required),
+    limit: int = Query(20, ge=1, le=100, description="Limit of records"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page")
+):
+    before_id = None
+    if cursor:
+        before_id = decode_cursor(cursor, 1)[0]
+        # bool is an int subclass: [true] must not pass for an order id.
+        if type(before_id) is not int:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    orders = await order_page(db, current_user.id, limit + 1, before_id)
+
+    next_cursor = None
+    if len(orders) > limit:
+        orders = orders[:limit]
+        next_cursor = encode_cursor([orders[-1].id])
+    return _render_orders(OrderPage(items=[OrderResponse.model_validate(order) for order in orders], next_cursor=next_cursor))
+
 @router.post("/basket/{book_id}", response_model=dict)
-def add_to_basket(
+async def add_to_basket(
     book_id: str,
     basket_data: BasketCreate = Depends(), 
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
     current_user: User = Depends(get_current_user_required)
 ):
-    book = db.query(Book).filter(Book.id == book_id).first()
+    book = await db.get(Book, book_id)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
 
-    basket_item = db.query(Basket).filter_by(user_id=current_user.id, book_id=book_id).first()
+    basket_item = await db.scalar(select(Basket).filter_by(user_id=current_user.id, book_id=book_id))
 
     if basket_item:
-        if basket_item.status == BasketStatus.removed:
+        # Removed and already purchased rows are reused for the same book.
+        if basket_item.status != BasketStatus.active:
             basket_item.status = BasketStatus.active
             basket_item.quantity = basket_data.quantity
             try:
-                db.commit()
+                await db.commit()
             except Exception:
-                db.rollback()
+                await db.rollback()
                 raise HTTPException(status_code=500, detail="Failed to restore book to basket")
             return {"message": f"Book {book_id} restored to basket"}
         raise HTTPException(status_code=400, detail="Book already in basket")
@@ -199,82 +317,48 @@ def add_to_basket(
         )
         db.add(basket_item)
         try:
-            db.commit()
-            db.refresh(basket_item)
+            await db.commit()
         except Exception:
-            db.rollback()
+            await db.rollback()
             raise HTTPException(status_code=500, detail="Failed to add book to basket")
     return {"message": f"Book {book_id} added to basket"}
 
 @router.delete("/basket/{book_id}", response_model=dict)
-def remove_from_basket(
+async def remove_from_basket(
     book_id: str,
     hard_delete: bool = Query(False, description="Permanently delete from basket"),
-    db: Session = Depends(get_db),
+    db=Depends(get_async_db),
     current_user: User = Depends(get_current_user_required)
 ):
-    basket_item = db.query(Basket).filter_by(user_id=current_user.id, book_id=book_id).first()
+    basket_item = await db.scalar(select(Basket).filter_by(user_id=current_user.id, book_id=book_id))
     if not basket_item or basket_item.status == BasketStatus.removed:
         raise HTTPException(status_code=404, detail="Book not found in basket")
 
     if hard_delete:
-        db.delete(basket_item)
+        await db.delete(basket_item)
     else:
         basket_item.status = BasketStatus.removed
     try:
-        db.commit()
+        await db.commit()
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail="Failed to remove book from basket")
     return {"message": f"Book {book_id} removed from basket"}
 
 @router.get("/basket/", response_model=List[BookResponse])
-def get_basket(
-    db: Session = Depends(get_db),
+async def get_basket(
+    db=Depends(get_read_db),
     current_user: User = Depends(get_current_user_required)
 ):
-    basket_items = db.query(Basket).join(Book, Basket.book_id == Book.id).filter(
-        Basket.user_id == current_user.id,
-        Basket.status == BasketStatus.active
-    ).all()
-
-    return [
-        BookResponse(
-            id=str(item.book.id),
-            title=item.book.title,
-            description=item.book.description,
-            genre_name=item.book.genre.name if item.book.genre else "No genre",
-            author_name=item.book.author.name if item.book.author else "Unknown author",
-            release_date=str(item.book.release_date) if item.book.release_date else None,
-            favorites_count=item.book.favorites_count,
-            is_favorite=db.query(Favorite).filter(Favorite.user_id == current_user.id, Favorite.book_id == item.book.id).first() is not None,
-            img=f"/static/images/books/{item.book.img}" if item.book.img else "/static/images/books/default.jpg",
-            price=float(item.book.price),
-            quantity=item.quantity  
+    basket_rows = (await db.execute(
+        detail_statement(current_user.id)
+        .add_columns(Basket.quantity)
+        .join(Basket, Basket.book_id == Book.id)
+        .where(
+            Basket.user_id == current_user.id,
+            Basket.status == BasketStatus.active
         )
-        for item in basket_items
-    ]
-
-@router.post("/basket/purchase", response_model=dict)
-def purchase_basket(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_required)
-):
-    basket_items = db.query(Basket).filter(
-        Basket.user_id == current_user.id,
-        Basket.status == BasketStatus.active
-    ).all()
-
-    if not basket_items:
-        raise HTTPException(status_code=400, detail="Basket is empty")
-
-    for item in basket_items:
-        item.status = BasketStatus.purchased
-    
-    try:
-        db.commit()
-    except Exception:
-        db.rollback()
-        raise HTTPException(status_code=500, detail="Failed to update basket status")
-
-    return {"message": "Purchase completed successfully"}
\ No newline at end of file
+    )).all()
+    return _render_books(
+        [detail_response(row, is_favorite=row.favorite_id is not None, quantity=row.quantity) for row in basket_rows]
+    )
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr
-from typing import List, Optional
-from datetime import date
+from pydantic import BaseModel, EmailStr, Field
+from typing import List, Literal, Optional
+from datetime import date, datetime
 
 
 class BookSummaryForAuthor(BaseModel):
@@ -70,6 +70,10 @@ class BookShopMainResponse(BaseModel):
         "from_attributes": True
     }
 
+class BookShopPage(BaseModel):
+    items: List[BookShopMainResponse]
+    next_cursor: Optional[str] = None
+
 class BookResponse(BaseModel):
     id: str  
     title: str
@@ -164,3 +168,56 @@ class BasketCreate(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class OrderItemResponse(BaseModel):
+    book_id: Optional[str] = None
+    title: str
+    price: float
+    quantity: int
+
+    class Config:
+        from_attributes = True
+
+
+class OrderResponse(BaseModel):
+    id: int
+    created_at: datetime
+    total: float
+    items_count: int
+    items: List[OrderItemResponse]
+
+    class Config:
+        from_attributes = True
+
+
+class OrderPage(BaseModel):
+    items: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
+
+class CheckoutResponse(BaseModel):
+    message: str
+    order: OrderResponse
+
+
+class BatchOperation(BaseModel):
+    op: Literal["basket_add", "basket_set", "basket_remove", "favorite", "unfavorite"]
+    book_id: str
+    # basket_add (default 1) and basket_set (required).
+    quantity: Optional[int] = Field(None, ge=1)
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation] = Field(..., min_length=1, max_length=100)
+
+
+class BatchResult(BaseModel):
+    op: str
+    book_id: str
+    status: int
+    detail: str
+
+
+class BatchResponse(BaseModel):
+    results: List[BatchResult]
@@ -0,0 +1,148 @@
+"""
+The app runs against a throwaway SQLite file, migrated by the startup
+bootstrap. Every test starts from an empty catalog; the two users persist.
+"""
+import os
+import tempfile
+from datetime import date, timedelta
+
+_database_dir = tempfile.mkdtemp(prefix="rebook-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_database_dir}/test.db"
+os.environ["DB_AUTO_MIGRATE"] = "1"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+# Every response carries its statement count in Server-Timing (see queries()).
+os.environ["SQL_INSTRUMENT_SAMPLE_RATE"] = "1"
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, event
+
+import main
+from core.cache import catalog_cache
+from core.database import SessionLocal, async_engine, engine
+from core.ranking import ranking, ranking_refresh
+from core.search import search_index, search_refresh
+from core.security import hash_password
+from models import Author, Basket, Book, Favorite, Genre, Order, OrderItem, User
+
+PASSWORD = "test-password"
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(main.app) as client:
+        yield client
+
+
+def _login(client, email: str) -> dict:
+    response = client.post("/auth/login", data={"username": email, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def users(client):
+    with SessionLocal() as db:
+        db.add(User(nickname="admin", email="admin@example.com", hashed_password=hash_password(PASSWORD), role_id=1))
+        db.add(User(nickname="reader", email="reader@example.com", hashed_password=hash_password(PASSWORD), role_id=2))
+        db.commit()
+    return {"admin": _login(client, "admin@example.com"), "user": _login(client, "reader@example.com")}
+
+
+@pytest.fixture
+def admin_headers(users):
+    return users["admin"]
+
+
+@pytest.fixture
+def user_headers(users):
+    return users["user"]
+
+
+def refresh_catalog():
+    """Rebuilds what workers keep in memory, as after a deploy."""
+    # A background rebuild (the startup warmup) still loading the old catalog would overwrite this one.
+    search_refresh.join()
+    ranking_refresh.join()
+    with SessionLocal() as db:
+        search_index.rebuild(db)
+        ranking.rebuild(db)
+    catalog_cache.bump()
+
+
+@pytest.fixture(autouse=True)
+def empty_catalog(client):
+    with SessionLocal() as db:
+        for model in (OrderItem, Order, Basket, Favorite, Book, Author, Genre):
+            db.execute(delete(model))
+        db.commit()
+    refresh_catalog()
+
+
+def _add_books(count: int, genres: int = 3, authors: int = 1, undated: int = 0, start: int = 0) -> list:
+    """
+    Inserts `count` dated books (b00000, b00001, ... one day apart) and
+    `undated` books without a release date, spread over `genres` genres and
+    `authors` authors.
+    Returns their ids.
+    """
+    with SessionLocal() as db:
+        genre_rows = [Genre(name=f"Genre {start}.{i}") for i in range(genres)]
+        author_rows = [Author(name=f"Author {start}.{i}") for i in range(authors)]
+        db.add_all(genre_rows + author_rows)
+        db.flush()
+        rows = [
+            {
+                "id": f"b{start + i:05d}", "title": f"Title {start + i}", "description": "About the book",
+                "genre_id": genre_rows[i % genres].id, "author_id": author_rows[i % authors].id, "favorites_count": 0, "price": 9.5,
+                "release_date": date(2000, 1, 1) + timedelta(days=start + i) if i < count else None,
+            }
+            for i in range(count + undated)
+        ]
+        db.execute(Book.__table__.insert(), rows)
+        db.commit()
+    refresh_catalog()
+    return [row["id"] for row in rows]
+
+
+@pytest.fixture
+def add_books():
+    return _add_books
+
+
+class StatementLog(list):
+    """(statement, parameters) of every SELECT run while the fixture is active."""
+
+    def on(self, table: str) -> list:
+        return [(statement, parameters) for statement, parameters in self if f"FROM {table}" in statement]
+
+
+@pytest.fixture
+def statements():
+    log = StatementLog()
+    target = async_engine.sync_engine if async_engine is not None else engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            log.append((statement, parameters))
+
+    event.listen(target, "before_cursor_execute", record)
+    yield log
+    event.remove(target, "before_cursor_execute", record)
+
+
+def query_plan(statement: str, parameters) -> list:
+    """SQLite's EXPLAIN QUERY PLAN details, e.g. "SEARCH books USING INDEX ix_books_release_date (...)"."""
+    with engine.connect() as connection:
+        return [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+
+
+def queries(response) -> int:
+    """Statements the request ran, from the Server-Timing header added by SQLInstrumentationMiddleware."""
+    timing = response.headers["server-timing"]
+    return int(timing.split('desc="')[1].split(" ")[0])
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+from passlib.context import CryptContext
+
+import core.security as security
+from core.database import SessionLocal
+from core.security import PasswordService, password_service
+from models import User
+
+
+@pytest.mark.anyio
+async def test_password_pool_rejects_calls_past_its_queue():
+    service = PasswordService(1, 1)
+    try:
+        results = await asyncio.gather(*(service.hash("secret") for _ in range(3)), return_exceptions=True)
+    finally:
+        service.shutdown()
+
+    assert isinstance(results[0], str) and service.pending == 0
+    assert [error.status_code for error in results[1:]] == [503, 503]
+    assert all(error.headers == {"Retry-After": "1"} for error in results[1:])
+    assert service.rejected == 2
+
+
+def test_login_answers_503_when_the_password_pool_is_full(client, users, monkeypatch):
+    monkeypatch.setattr(password_service, "max_pending", 0)
+
+    response = client.post("/auth/login", data={"username": "reader@example.com", "password": "test-password"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "1"
+
+
+def test_password_pool_processes_are_not_forked():
+    service = PasswordService(1, 1)
+    service.start()
+    try:
+        assert service._executor._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert asyncio.run(service.verify_and_update("secret", security.hash_password("secret")))[0]
+    finally:
+        service.shutdown()
+
+
+def _stored_hash(email: str) -> str:
+    with SessionLocal() as db:
+        return db.query(User.hashed_password).filter(User.email == email).scalar()
+
+
+@pytest.mark.parametrize("schemes, rounds, prefix", [
+    (["argon2"], security.BCRYPT_ROUNDS, "$argon2"),
+    (["bcrypt"], security.BCRYPT_ROUNDS + 1, f"$2b${security.BCRYPT_ROUNDS + 1:02d}$"),
+])
+def test_login_upgrades_an_outdated_hash(client, users, monkeypatch, schemes, rounds, prefix):
+    email = f"upgrade-{schemes[0]}-{rounds}@example.com"
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("old-password")
+    with SessionLocal() as db:
+        db.add(User(nickname=email, email=email, hashed_password=old_hash, role_id=2))
+        db.commit()
+    # Hash in this process, where the changed settings apply.
+    monkeypatch.setattr(password_service, "workers", 0)
+    monkeypatch.setattr(security, "PASSWORD_SCHEMES", schemes)
+    monkeypatch.setattr(security, "BCRYPT_ROUNDS", rounds)
+    monkeypatch.setattr(security, "_context", None)
+
+    for _ in range(2):
+        response = client.post("/auth/login", data={"username": email, "password": "old-password"})
+        assert response.status_code == 200, response.text
+        assert _stored_hash(email).startswith(prefix)
+    assert client.post("/auth/login", data={"username": email, "password": "wrong"}).status_code == 401
@@ -0,0 +1,40 @@
+from sqlalchemy import event
+
+from core.cache import VersionedCache, catalog_cache
+from core.database import async_engine, engine
+
+
+def test_fill_that_straddles_a_write_is_not_stored():
+    cache = VersionedCache("test_straddle", ttl=60)
+    version = cache.version
+    cache.bump()  # a write lands while the fill queries
+
+    body, etag = cache.set("genres", b"[]", version)
+
+    assert (body, etag[0]) == (b"[]", '"')
+    assert cache.get("genres") is None
+    assert cache.stats()["stale_fills"] == 1
+
+    cache.set("genres", b"[]", cache.version)
+    assert cache.get("genres") == (body, etag)
+
+
+def test_genres_fill_racing_an_admin_write_is_served_but_not_cached(client):
+    target = async_engine.sync_engine if async_engine is not None else engine
+    stale_fills = catalog_cache.stale_fills
+
+    def write_during_fill(conn, cursor, statement, parameters, context, executemany):
+        if "FROM genres" in statement:
+            catalog_cache.bump()
+
+    event.listen(target, "after_cursor_execute", write_during_fill)
+    try:
+        assert client.get("/genres/").status_code == 200
+    finally:
+        event.remove(target, "after_cursor_execute", write_during_fill)
+
+    assert catalog_cache.stale_fills == stale_fills + 1
+    assert catalog_cache.get("genres") is None
+
+    first = client.get("/genres/")
+    assert client.get("/genres/", headers={"If-None-Match": first.headers["etag"]}).status_code == 304
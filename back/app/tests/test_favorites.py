@@ -0,0 +1,107 @@
+import random
+
+import anyio
+import httpx
+import pytest
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects import mssql, postgresql
+
+import main
+from core.counters import _reconcile_batch, favorites_counter, reconcile_favorites_count
+from core.database import SessionLocal
+from models import Book, Favorite, User
+from utils.jwt import create_access_token
+
+HOT_BOOKS = ["b00000", "b00001", "b00002"]
+USERS = 20
+ROUNDS = 15
+
+
+@pytest.fixture(scope="module")
+def churn_tokens(users):
+    with SessionLocal() as db:
+        hashed = db.scalar(select(User.hashed_password).limit(1))
+        db.add_all(User(nickname=f"churn{i}", email=f"churn{i}@example.com", hashed_password=hashed) for i in range(USERS))
+        db.commit()
+    return [create_access_token({"sub": f"churn{i}@example.com"}) for i in range(USERS)]
+
+
+def _mismatches() -> list:
+    with SessionLocal() as db:
+        actual = dict(db.execute(select(Favorite.book_id, func.count()).group_by(Favorite.book_id)).all())
+        stored = dict(db.execute(select(Book.id, Book.favorites_count)).all())
+    return [(book_id, count, actual.get(book_id, 0)) for book_id, count in stored.items() if count != actual.get(book_id, 0)]
+
+
+async def _churn(tokens: list, reconcile: bool = False) -> dict:
+    outcomes = {"ok": 0, "rejected": 0, "errors": 0}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as http:
+        async def user_loop(token: str):
+            headers = {"Authorization": f"Bearer {token}"}
+            rng = random.Random(token)
+            for _ in range(ROUNDS):
+                method = http.post if rng.random() < 0.6 else http.delete
+                status = (await method(f"/shop/favorites/{rng.choice(HOT_BOOKS)}", headers=headers)).status_code
+                outcomes["ok" if status == 200 else "rejected" if status in (400, 404) else "errors"] += 1
+
+        async def reconcile_loop():
+            for _ in range(5):
+                await anyio.to_thread.run_sync(_reconcile)
+                await anyio.sleep(0.01)
+
+        with anyio.fail_after(60):
+            async with anyio.create_task_group() as group:
+                for token in tokens:
+                    group.start_soon(user_loop, token)
+                if reconcile:
+                    group.start_soon(reconcile_loop)
+    return outcomes
+
+
+def _reconcile() -> int:
+    with SessionLocal() as db:
+        return reconcile_favorites_count(db)
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("mode", ["atomic", "write_behind"])
+async def test_concurrent_churn_keeps_favorites_count_exact(client, add_books, churn_tokens, monkeypatch, mode):
+    add_books(5)
+    monkeypatch.setattr(favorites_counter, "mode", mode)
+
+    outcomes = await _churn(churn_tokens, reconcile=mode == "atomic")
+    favorites_counter.flush()
+
+    assert outcomes["errors"] == 0
+    assert outcomes["ok"] > 0
+    assert _mismatches() == []
+
+
+def test_reconcile_fixes_drift(client, add_books, user_headers):
+    add_books(5)
+    client.post("/shop/favorites/b00001", headers=user_headers)
+    with SessionLocal() as db:
+        db.execute(update(Book).where(Book.id.in_(["b00001", "b00003"])).values(favorites_count=7))
+        db.commit()
+
+    assert _reconcile() == 2
+    assert _mismatches() == []
+
+
+def test_reconcile_is_refused_while_deltas_are_buffered(client, add_books, admin_headers, monkeypatch):
+    add_books(1)
+    monkeypatch.setattr(favorites_counter, "mode", "write_behind")
+
+    assert client.post("/admin/favorites/reconcile", headers=admin_headers).status_code == 409
+
+
+@pytest.mark.parametrize("dialect, lock", [
+    (mssql.dialect(), "FROM books WITH (UPDLOCK, ROWLOCK)"),
+    (postgresql.dialect(), "FOR UPDATE"),
+])
+def test_reconcile_locks_each_batch(dialect, lock):
+    """MSSQL ignores FOR UPDATE; the batch must carry a lock hint there instead."""
+    sql = str(_reconcile_batch("b00001").compile(dialect=dialect))
+
+    assert lock in sql
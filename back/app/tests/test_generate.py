@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+from benchmarks.generate import Loader
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.statements = []
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        self.statements.append(sql)
+
+    def executemany(self, sql, rows):
+        self.statements.append(sql.split(" (")[0])
+
+    def commit(self):
+        pass
+
+
+def _loader(dialect: str):
+    connection = RecordingConnection()
+    engine = SimpleNamespace(
+        dialect=SimpleNamespace(name=dialect, paramstyle="qmark"),
+        raw_connection=lambda: connection,
+    )
+    return Loader(engine), connection.statements
+
+
+def test_explicit_ids_are_enabled_for_mssql_identity_tables():
+    loader, statements = _loader("mssql")
+
+    loader.insert("genres", ["id", "name"], [(1, "Genre 0")], identity=True)
+    loader.insert("books", ["id", "title"], [("b0000000", "Title")])
+
+    assert statements == [
+        "SET IDENTITY_INSERT genres ON", "INSERT INTO genres", "SET IDENTITY_INSERT genres OFF",
+        "INSERT INTO books",
+    ]
+
+
+def test_postgresql_sequences_move_past_explicit_ids():
+    loader, statements = _loader("postgresql")
+
+    loader.insert("users", ["id", "email"], [(1, "user0@bench.local")], identity=True)
+    loader.insert("books", ["id", "title"], [("b0000000", "Title")])
+
+    assert statements[0] == "INSERT INTO users"
+    assert statements[1].startswith("SELECT setval(pg_get_serial_sequence('users', 'id'), MAX(id)) FROM users")
+    assert statements[2:] == ["INSERT INTO books"]
@@ -0,0 +1,42 @@
+from sqlalchemy import func, select
+
+from core.database import SessionLocal
+from models import Author, Genre
+
+FEED = "id,title,description,author_name,genre_name,release_date,price\n"
+
+
+def _import(client, admin_headers, feed: str) -> dict:
+    files = {"file": ("books.csv", FEED + feed, "text/csv")}
+    response = client.post("/admin/import/books", files=files, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_rejected_rows_create_no_authors_or_genres(client, add_books, admin_headers):
+    add_books(1)
+    with SessionLocal() as db:
+        names = db.scalar(select(func.count()).select_from(Author)), db.scalar(select(func.count()).select_from(Genre))
+
+    report = _import(client, admin_headers, "b00000,Again,Same id,New Author,New Genre,2001-01-01,5\n")
+
+    assert report["status"] == "completed"
+    assert report["inserted"] == 0 and report["processed"] == 1
+    assert report["errors"] == [{"row": 1, "id": "b00000", "error": "Book with this ID already exists"}]
+    assert (report["authors_created"], report["genres_created"]) == (0, 0)
+    with SessionLocal() as db:
+        assert (db.scalar(select(func.count()).select_from(Author)), db.scalar(select(func.count()).select_from(Genre))) == names
+    assert "New Author" not in {author["name"] for author in client.get("/authors/").json()}
+
+
+def test_import_creates_the_names_of_inserted_rows(client, add_books, admin_headers):
+    add_books(1)
+
+    report = _import(client, admin_headers, (
+        "b00000,Again,Same id,Rejected Author,,2001-01-01,5\n"
+        "n00001,New,A new book,New Author,New Genre,2001-01-01,5\n"
+    ))
+
+    assert (report["inserted"], report["processed"], report["authors_created"], report["genres_created"]) == (1, 2, 1, 1)
+    names = {author["name"] for author in client.get("/authors/").json()}
+    assert "New Author" in names and "Rejected Author" not in names
@@ -0,0 +1,29 @@
+import pytest
+
+from utils.pagination import encode_cursor
+
+
+def _order(client, headers: dict, book_id: str):
+    assert client.post(f"/shop/basket/{book_id}", headers=headers).status_code == 200
+    assert client.post("/shop/basket/purchase", headers=headers).status_code == 200
+
+
+def test_order_history_pages_by_cursor(client, add_books, user_headers):
+    book_ids = add_books(3)
+    for book_id in book_ids:
+        _order(client, user_headers, book_id)
+
+    first = client.get("/shop/orders/", headers=user_headers, params={"limit": 2}).json()
+    second = client.get("/shop/orders/", headers=user_headers, params={"limit": 2, "cursor": first["next_cursor"]}).json()
+
+    ids = [order["id"] for order in first["items"] + second["items"]]
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 3
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.parametrize("cursor", [[True], [False], ["1"], [1.5], [None], [1, 2]])
+def test_malformed_order_cursors_are_rejected(client, user_headers, cursor):
+    response = client.get("/shop/orders/", headers=user_headers, params={"cursor": encode_cursor(cursor)})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
@@ -0,0 +1,88 @@
+from datetime import date
+
+import pytest
+
+from tests.conftest import query_plan
+from utils.pagination import encode_cursor
+
+
+def _pages(client, sort_by: str, limit: int) -> list:
+    ids, cursor = [], None
+    while True:
+        params = {"sort_by": sort_by, "limit": limit, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/shop/page", params=params).json()
+        ids += [book["id"] for book in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            return ids
+
+
+@pytest.mark.parametrize("sort_by", ["date", "popularity"])
+@pytest.mark.parametrize("limit", [1, 3, 7])
+def test_pages_cover_the_listing_including_undated_books(client, add_books, user_headers, sort_by, limit):
+    add_books(10, undated=4)
+    for book_id in ("b00002", "b00011", "b00012"):
+        client.post(f"/shop/favorites/{book_id}", headers=user_headers)
+    listing = [book["id"] for book in client.get("/shop/", params={"sort_by": sort_by, "limit": 100}).json()]
+
+    assert _pages(client, sort_by, limit) == listing
+    assert len(listing) == 14
+
+
+@pytest.mark.parametrize("cursor, expected", [
+    # Deep in the dated books: the rest of them, then the undated tail.
+    ([date(2000, 1, 11).isoformat(), "b00010"], [f"b{i:05d}" for i in range(9, -1, -1)] + [f"b0300{i}" for i in range(4, -1, -1)]),
+    # Inside the undated tail.
+    ([None, "b03002"], ["b03001", "b03000"]),
+])
+def test_deep_cursor_seeks_the_date_index(client, add_books, statements, cursor, expected):
+    add_books(3000, undated=5)
+    statements.clear()
+
+    page = client.get("/shop/page", params={"sort_by": "date", "limit": 20, "cursor": encode_cursor(cursor)}).json()
+
+    assert [book["id"] for book in page["items"]] == expected
+    listings = statements.on("books")
+    assert listings
+    for statement, parameters in listings:
+        plan = query_plan(statement, parameters)
+        assert not [step for step in plan if step.startswith("SCAN books")], (statement, plan)
+
+
+@pytest.mark.parametrize("sort_by, cursor", [
+    ("date", ["2000-01-05", True]),
+    ("date", ["2000-01-05", {"x": 1}]),
+    ("date", ["2000-01-05", None]),
+    ("date", ["2000-01-05", 5]),
+    ("date", [5, "b00001"]),
+    ("date", [["2000-01-05"], "b00001"]),
+    ("date", ["not a date", "b00001"]),
+    ("date", ["2000-01-05"]),
+    ("popularity", [True, "2000-01-05", "b00001"]),
+    ("popularity", [1, {"x": 1}, "b00001"]),
+    ("popularity", [1, "2000-01-05", None]),
+    ("trending", [True, "b00001"]),
+])
+def test_malformed_cursors_are_rejected(client, add_books, sort_by, cursor):
+    add_books(3)
+
+    response = client.get("/shop/page", params={"sort_by": sort_by, "cursor": encode_cursor(cursor)})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Invalid cursor"}
+
+
+def test_malformed_cursors_are_rejected_without_a_ranking(client, add_books, monkeypatch):
+    """Popularity pages fall back to SQL on a worker whose ranking is not built yet."""
+    import routers.shop as shop
+
+    async def not_ready(wait=False):
+        return False
+
+    add_books(3)
+    monkeypatch.setattr(shop, "ensure_fresh", not_ready)
+    for cursor in ([True, "2000-01-05", "b00001"], [1.5, "2000-01-05", "b00001"], [1, "2000-01-05", True]):
+        response = client.get("/shop/page", params={"sort_by": "popularity", "cursor": encode_cursor(cursor)})
+        assert response.status_code == 400, cursor
+    valid = client.get("/shop/page", params={"sort_by": "popularity", "cursor": encode_cursor([0, None, "b00002"])})
+    assert valid.status_code == 200
@@ -0,0 +1,66 @@
+"""
+EXPLAIN QUERY PLAN of the statements GET /shop/page actually runs. The
+first page may walk a listing index in order until LIMIT ("SCAN books USING
+INDEX"); past a cursor every statement must seek one (SEARCH), or deep
+pages cost as much as the rows before them.
+"""
+import pytest
+from sqlalchemy import text
+
+from core.database import engine
+from tests.conftest import query_plan
+
+DATE, GENRE, AUTHOR, POPULARITY = "ix_books_release_date", "ix_books_genre_id", "ix_books_author_id", "ix_books_popularity"
+# Text filters resolved by the search index become `books.id IN (...)`.
+PRIMARY_KEY = "sqlite_autoindex_books_1"
+
+# (sort_by, filters, indexes the listing may seek)
+CASES = [
+    ("date", {}, {DATE}),
+    ("date", {"year": 2001}, {DATE}),
+    ("date", {"year_from": 2000, "year_to": 2002}, {DATE}),
+    ("date", {"genre": ["Genre 0.1", "Genre 0.2"]}, {DATE, GENRE}),
+    ("date", {"author": ["Author 0.3"]}, {DATE, AUTHOR}),
+    ("date", {"price_min": 5, "price_max": 10}, {DATE}),
+    ("date", {"title": "Title 12"}, {DATE, PRIMARY_KEY}),
+    ("date", {"author_name": "Author 0.3"}, {DATE, PRIMARY_KEY}),
+    ("popularity", {"year_from": 2001, "year_to": 2002}, {DATE, POPULARITY}),
+    ("popularity", {"genre": ["Genre 0.1"], "price_min": 1}, {GENRE, POPULARITY}),
+]
+
+
+@pytest.fixture
+def catalog(add_books):
+    add_books(4000, genres=20, authors=400, undated=10)
+    with engine.begin() as connection:
+        connection.execute(text("ANALYZE"))
+
+
+def _check_plans(statements):
+    listings = [(statement, parameters) for statement, parameters in statements.on("books") if "ORDER BY" in statement]
+    assert listings
+    for statement, parameters in listings:
+        plan = query_plan(statement, parameters)
+        books = [step for step in plan if step.split(" ")[1] == "books"]
+        yield statement, plan, books
+
+
+@pytest.mark.parametrize("sort_by, filters, indexes", CASES, ids=[f"{case[0]}-{case[1]}" for case in CASES])
+def test_listing_statements_seek_an_index(client, catalog, statements, sort_by, filters, indexes):
+    params = {"sort_by": sort_by, "limit": 20, **filters}
+    statements.clear()
+    first = client.get("/shop/page", params=params)
+    assert first.status_code == 200
+    first_plans = list(_check_plans(statements))
+
+    statements.clear()
+    after = client.get("/shop/page", params={**params, "cursor": first.json()["next_cursor"]})
+    assert after.status_code == 200
+    assert after.json()["items"]
+
+    for statement, plan, books in first_plans:
+        assert books and all(step.startswith(("SEARCH books USING ", "SCAN books USING INDEX ")) for step in books), (statement, plan)
+        assert any(index in step for step in books for index in indexes), (statement, plan)
+    for statement, plan, books in _check_plans(statements):
+        assert books and all(step.startswith("SEARCH books USING ") for step in books), (statement, plan)
+        assert any(index in step for step in books for index in indexes), (statement, plan)
@@ -0,0 +1,79 @@
+import threading
+import time
+
+import pytest
+
+from core import ranking as ranking_module
+from core.ranking import ranking, ranking_refresh
+
+TWO_GENRES = {"genre": ["Genre 0.0", "Genre 0.1"]}
+# add_books(12) puts b00000, b00003, ... in Genre 0.0 and b00001, b00004, ... in Genre 0.1.
+EXPECTED = ["b00006", "b00004", "b00010", "b00009", "b00007", "b00003", "b00001", "b00000"]
+
+
+def _ids(response) -> list:
+    body = response.json()
+    return [book["id"] for book in (body["items"] if isinstance(body, dict) else body)]
+
+
+@pytest.fixture
+def favorited(client, add_books, user_headers):
+    add_books(12)
+    for book_id in ("b00004", "b00006"):
+        assert client.post(f"/shop/favorites/{book_id}", headers=user_headers).status_code == 200
+
+
+def test_popularity_page_merges_several_genres(client, favorited):
+    assert _ids(client.get("/shop/", params={"sort_by": "popularity", "limit": 100, **TWO_GENRES})) == EXPECTED
+
+
+def test_popularity_cursor_pages_merge_several_genres(client, favorited):
+    ids, cursor = [], None
+    while True:
+        params = {"sort_by": "popularity", "limit": 3, **TWO_GENRES, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/shop/page", params=params).json()
+        ids += [book["id"] for book in page["items"]]
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+    assert ids == EXPECTED
+
+
+def test_trending_page_merges_several_genres(client, favorited):
+    ids = _ids(client.get("/shop/", params={"sort_by": "trending", "limit": 100, **TWO_GENRES}))
+    assert sorted(ids[:2]) == ["b00004", "b00006"]
+    assert sorted(ids) == sorted(EXPECTED)
+
+
+def test_stale_ranking_is_rebuilt_once_in_the_background(client, favorited, monkeypatch):
+    release, calls = threading.Event(), []
+    rebuild = ranking_refresh._rebuild
+
+    def slow_rebuild(db):
+        calls.append(threading.current_thread().name)
+        release.wait(10)
+        return rebuild(db)
+
+    monkeypatch.setattr(ranking_refresh, "_rebuild", slow_rebuild)
+    monkeypatch.setattr(ranking, "built_at", time.monotonic() - ranking_module.REFRESH_SECONDS - 1)
+
+    try:
+        for sort_by in ("popularity", "trending", "popularity"):
+            response = client.get("/shop/", params={"sort_by": sort_by, "limit": 2, **TWO_GENRES})
+            assert _ids(response)[:2] in (["b00006", "b00004"], ["b00004", "b00006"])
+        assert ranking_refresh.running
+    finally:
+        release.set()
+    ranking_refresh.start().wait(10)
+
+    assert calls == ["rebuild-ranking"]
+    assert not ranking.is_stale()
+
+
+def test_worker_without_a_ranking(client, favorited, monkeypatch):
+    monkeypatch.setattr(ranking, "built_at", None)
+
+    # Popularity sorts in SQL rather than waiting; trending waits for the first build.
+    assert _ids(client.get("/shop/", params={"sort_by": "popularity", "limit": 100, **TWO_GENRES})) == EXPECTED
+    assert sorted(_ids(client.get("/shop/", params={"sort_by": "trending", "limit": 100, **TWO_GENRES}))) == sorted(EXPECTED)
+    assert ranking.ready
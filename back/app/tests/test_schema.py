@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+import core.database as database
+
+
+@pytest.fixture
+def database_at(monkeypatch, tmp_path):
+    """Points the app at a fresh SQLite file, migrated to `revision` (None: empty)."""
+    engines = []
+
+    def at(revision=None):
+        engine = create_engine(f"sqlite:///{tmp_path / 'schema.db'}")
+        engines.append(engine)
+        monkeypatch.setattr(database, "engine", engine)
+        if revision:
+            database.migrate(revision)
+        return engine
+
+    yield at
+    for engine in engines:
+        engine.dispose()
+
+
+def test_create_all_database_is_told_to_stamp_first(database_at, monkeypatch):
+    """A database the old create_all startup built has the tables but no alembic_version."""
+    engine = database_at("0001")
+    with engine.begin() as connection:
+        connection.execute(text("DROP TABLE alembic_version"))
+
+    for auto_migrate in (False, True):
+        monkeypatch.setattr(database, "DB_AUTO_MIGRATE", auto_migrate)
+        with pytest.raises(RuntimeError, match="alembic stamp 0001"):
+            database.verify_schema()
+    with pytest.raises(RuntimeError, match="alembic stamp 0001"):
+        database.migrate()
+    assert "orders" not in inspect(engine).get_table_names()
+
+
+def test_stamped_database_is_upgraded(database_at, monkeypatch):
+    """What `alembic stamp 0001` leaves behind migrates like any database at 0001."""
+    engine = database_at("0001")
+    monkeypatch.setattr(database, "DB_AUTO_MIGRATE", True)
+
+    database.verify_schema()
+
+    assert "orders" in inspect(engine).get_table_names()
+
+
+def test_outdated_database_is_told_to_upgrade(database_at, monkeypatch):
+    database_at("0002")
+    monkeypatch.setattr(database, "DB_AUTO_MIGRATE", False)
+
+    with pytest.raises(RuntimeError, match="Run `alembic upgrade head`"):
+        database.verify_schema()
+
+
+def test_empty_database_migrates(database_at, monkeypatch):
+    engine = database_at()
+    monkeypatch.setattr(database, "DB_AUTO_MIGRATE", True)
+
+    database.verify_schema()
+
+    assert {"books", "orders", "alembic_version"} <= set(inspect(engine).get_table_names())
@@ -0,0 +1,44 @@
+import threading
+import time
+
+from core import search
+from core.search import search_index, search_refresh
+
+
+def _titles(client, **params) -> list:
+    return sorted(book["title"] for book in client.get("/shop/", params={"limit": 100, **params}).json())
+
+
+def test_stale_index_is_rebuilt_once_in_the_background(client, add_books, monkeypatch):
+    add_books(5)
+    release, calls = threading.Event(), []
+    rebuild = search_refresh._rebuild
+
+    def slow_rebuild(db):
+        calls.append(threading.current_thread().name)
+        release.wait(10)
+        return rebuild(db)
+
+    monkeypatch.setattr(search_refresh, "_rebuild", slow_rebuild)
+    monkeypatch.setattr(search_index, "built_at", time.monotonic() - search.REFRESH_SECONDS - 1)
+
+    try:
+        # Served from the stale index while the rebuild is blocked.
+        for _ in range(3):
+            assert _titles(client, title="Title 3") == ["Title 3"]
+        assert search_refresh.running
+    finally:
+        release.set()
+    search_refresh.start().wait(10)
+
+    assert calls == ["rebuild-search index"]
+    assert not search_index.is_stale()
+
+
+def test_worker_without_an_index_filters_in_sql(client, add_books, monkeypatch):
+    add_books(5)
+    monkeypatch.setattr(search_index, "built_at", None)
+    monkeypatch.setattr(search_refresh, "start", lambda: None)
+
+    assert _titles(client, title="Title 3") == ["Title 3"]
+    assert _titles(client, author_name="author") == [f"Title {i}" for i in range(5)]
@@ -0,0 +1,162 @@
+import asyncio
+
+import anyio
+import httpx
+import pytest
+
+import core.database as database
+import main
+
+LIMIT = 2
+
+
+@pytest.fixture
+def session_limit(monkeypatch):
+    # Semaphores are created lazily per event loop; start from fresh ones at the test's limit.
+    monkeypatch.setattr(database, "SYNC_SESSION_LIMIT", LIMIT)
+    monkeypatch.setattr(database, "_sync_session_semaphores", {})
+    return LIMIT
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("path", ["/shop/basket/", "/shop/favorites/", "/shop/orders/"])
+async def test_authenticated_reads_do_not_starve_the_session_limit(session_limit, add_books, client, user_headers, path):
+    """More concurrent callers than session slots, each with an auth lookup and an endpoint query."""
+    add_books(3)
+    statuses = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as http:
+        async def call():
+            statuses.append((await http.get(path, headers=user_headers)).status_code)
+
+        with anyio.fail_after(30):
+            async with anyio.create_task_group() as group:
+                for _ in range(session_limit * 4):
+                    group.start_soon(call)
+
+    assert statuses == [200] * session_limit * 4
+
+
+@pytest.mark.anyio
+async def test_cached_reads_take_no_session(session_limit, client, monkeypatch):
+    client.get("/genres/")
+
+    def no_session(*args, **kwargs):
+        raise AssertionError("opened a database session")
+
+    monkeypatch.setattr(database, "_session", no_session)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as http:
+        assert (await http.get("/genres/")).status_code == 200
+
+
+def test_unreachable_replica_falls_back_to_the_primary(client, add_books, user_headers, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    replica = create_engine("sqlite:////nonexistent/replica.db")
+    monkeypatch.setattr(database, "ReplicaSessionLocal", sessionmaker(bind=replica))
+    monkeypatch.setattr(database, "AsyncReplicaSessionLocal", None)
+    monkeypatch.setattr(database.read_routing, "down_until", 0.0)
+    failures = database.read_routing.failures
+    add_books(2)
+
+    response = client.get("/shop/", headers=user_headers)
+
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    assert database.read_routing.failures == failures + 1
+    assert not database.read_routing.available()
+
+
+@pytest.mark.anyio
+async def test_password_hashing_holds_no_session(session_limit, client, monkeypatch):
+    """More concurrent sign-ups and logins than session slots, with a slow password pool."""
+    from contextlib import asynccontextmanager
+
+    from core.security import password_service
+
+    session, holders = database._session, []
+
+    @asynccontextmanager
+    async def counted(*args, **kwargs):
+        async with session(*args, **kwargs) as db:
+            holders.append(asyncio.current_task())
+            try:
+                yield db
+            finally:
+                holders.remove(asyncio.current_task())
+
+    held = []
+
+    def slow(real):
+        async def run(*args):
+            held.append(holders.count(asyncio.current_task()))
+            await anyio.sleep(0.2)
+            return await real(*args)
+        return run
+
+    monkeypatch.setattr(database, "_session", counted)
+    monkeypatch.setattr(password_service, "hash", slow(password_service.hash))
+    monkeypatch.setattr(password_service, "verify_and_update", slow(password_service.verify_and_update))
+    callers = session_limit * 4
+    statuses = []
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as http:
+        async def sign_up(i):
+            email = f"hashing-{i}@example.com"
+            user = {"nickname": f"hashing-{i}", "email": email, "password": "test-password"}
+            statuses.append((await http.post("/auth/register", json=user)).status_code)
+            login = {"username": email, "password": "test-password"}
+            statuses.append((await http.post("/auth/login", data=login)).status_code)
+
+        with anyio.fail_after(30):
+            async with anyio.create_task_group() as group:
+                for i in range(callers):
+                    group.start_soon(sign_up, i)
+
+    assert statuses == [200] * callers * 2
+    assert held == [0] * callers * 2
+
+
+def test_background_rebuilds_read_the_replica(client, add_books, monkeypatch, tmp_path):
+    """The periodic full-catalog reads of every worker stay off the primary when a replica is configured."""
+    import shutil
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from core.search import search_index, search_refresh
+
+    add_books(2)
+    # The replica lags: it has the first two books, the primary a third.
+    shutil.copy(database.engine.url.database, tmp_path / "replica.db")
+    replica = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    add_books(1, start=2)
+    monkeypatch.setattr(database, "ReplicaSessionLocal", sessionmaker(bind=replica))
+    monkeypatch.setattr(database.read_routing, "down_until", 0.0)
+    sessions = dict(database.read_routing.sessions)
+
+    search_refresh.join()
+    assert search_refresh.start().wait(10)
+
+    assert sorted(search_index._docs) == ["b00000", "b00001"]
+    assert database.read_routing.sessions["replica"] == sessions.get("replica", 0) + 1
+    replica.dispose()
+
+
+def test_background_rebuilds_fall_back_to_the_primary(client, add_books, monkeypatch):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from core.search import search_index, search_refresh
+
+    monkeypatch.setattr(database, "ReplicaSessionLocal", sessionmaker(bind=create_engine("sqlite:////nonexistent/replica.db")))
+    monkeypatch.setattr(database.read_routing, "down_until", 0.0)
+    failures = database.read_routing.failures
+    add_books(2)
+
+    search_refresh.join()
+    assert search_refresh.start().wait(10)
+
+    assert sorted(search_index._docs) == ["b00000", "b00001"]
+    assert database.read_routing.failures == failures + 1
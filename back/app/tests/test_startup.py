@@ -0,0 +1,37 @@
+import threading
+
+import anyio
+import pytest
+
+import main
+from core.ranking import ranking, ranking_refresh
+from core.search import search_index, search_refresh
+
+
+@pytest.mark.anyio
+async def test_startup_loads_the_index_and_ranking_in_the_background(client, monkeypatch):
+    """The worker is up before the per-worker structures are; they load off the event loop."""
+    loading = threading.Event()
+    threads = []
+
+    def slow(rebuild):
+        def run(db):
+            threads.append(threading.current_thread().name)
+            loading.wait(10)
+            return rebuild(db)
+        return run
+
+    monkeypatch.setattr(search_refresh, "_rebuild", slow(search_index.rebuild))
+    monkeypatch.setattr(ranking_refresh, "_rebuild", slow(ranking.rebuild))
+    monkeypatch.setattr(main.favorites_counter, "start", lambda: None)
+    runs = search_refresh.runs, ranking_refresh.runs
+
+    with anyio.fail_after(5):
+        await main.startup()
+    assert search_refresh.running and ranking_refresh.running
+
+    loading.set()
+    assert search_refresh.join(10) and ranking_refresh.join(10)
+    assert sorted(threads) == ["rebuild-ranking", "rebuild-search index"]
+    assert (search_refresh.runs, ranking_refresh.runs) == (runs[0] + 1, runs[1] + 1)
+    assert search_index.ready and ranking.ready
@@ -0,0 +1,67 @@
+"""
+List endpoints run the same number of statements whatever the list size:
+a regression to per-row loading (N+1) shows up as a count that grows.
+"""
+import pytest
+
+from tests.conftest import queries
+
+ALL = [f"b{i:05d}" for i in range(10)]
+
+
+def _count(client, path: str, headers: dict, **params) -> int:
+    response = client.get(path, headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return queries(response)
+
+
+def _fill(client, headers: dict, book_ids: list):
+    for book_id in book_ids:
+        assert client.post(f"/shop/favorites/{book_id}", headers=headers).status_code == 200
+        assert client.post(f"/shop/basket/{book_id}", headers=headers).status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/shop/basket/", "/shop/favorites/"])
+def test_basket_and_favorites_do_not_query_per_book(client, add_books, user_headers, path):
+    add_books(len(ALL))
+    _fill(client, user_headers, ALL[:1])
+    one = _count(client, path, user_headers)
+
+    _fill(client, user_headers, ALL[1:])
+    many = _count(client, path, user_headers)
+
+    assert len(client.get(path, headers=user_headers).json()) == len(ALL)
+    assert many == one
+    assert one <= 2  # the listing, plus the user lookup when it is not cached
+
+
+@pytest.mark.parametrize("path", ["/shop/", "/shop/page"])
+@pytest.mark.parametrize("sort_by", ["date", "popularity", "trending"])
+def test_catalog_pages_do_not_query_per_book(client, add_books, user_headers, path, sort_by):
+    add_books(len(ALL))
+    _fill(client, user_headers, ALL[::3])
+
+    counts = {limit: _count(client, path, user_headers, sort_by=sort_by, limit=limit) for limit in (1, len(ALL))}
+
+    assert counts[1] == counts[len(ALL)]
+
+
+def test_order_history_does_not_query_per_order(client, add_books, user_headers):
+    add_books(len(ALL))
+    for book_ids in (ALL[:1], ALL[1:4], ALL[4:]):
+        _fill(client, user_headers, book_ids)
+        assert client.post("/shop/basket/purchase", headers=user_headers).status_code == 200
+
+    counts = {limit: _count(client, "/shop/orders/", user_headers, limit=limit) for limit in (1, 3)}
+
+    assert counts[1] == counts[3]
+
+
+def test_author_page_does_not_query_per_book(client, add_books):
+    add_books(len(ALL))
+    author_id = client.get("/authors/").json()[0]["id"]
+
+    response = client.get(f"/authors/{author_id}")
+
+    assert len(response.json()["books"]) == len(ALL)
+    assert queries(response) == 2
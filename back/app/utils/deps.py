@@ -1,24 +1,59 @@
-from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
 from fastapi import Depends, HTTPException, status
-from sqlalchemy.orm import Session
 from jose import jwt
-from core.database import get_db
+from core.database import get_read_db
 from models import User
 from .jwt import decode_access_token, SECRET_KEY, ALGORITHM
 from typing import Optional
+from dataclasses import dataclass
+from sqlalchemy import event, inspect, select
+from core.cache import TTLCache
+from core.security import hash_password, verify_password
+import os
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login", auto_error=False)
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+@dataclass(frozen=True)
+class UserPrincipal:
+    """Detached snapshot of the columns request handlers read from a user."""
+    id: int
+    email: str
+    role_id: int
+    nickname: str
 
 
-def get_current_user_required(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+user_cache = TTLCache(
+    "users",
+    maxsize=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60")),
+)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    user_cache.pop(target.email)
+    for old_email in inspect(target).attrs.email.history.deleted:
+        user_cache.pop(old_email)
+
+
+async def get_user_principal(db, email: Optional[str]) -> Optional[UserPrincipal]:
+    if not email:
+        return None
+    principal = user_cache.get(email)
+    if principal is None:
+        result = await db.execute(select(User.id, User.email, User.role_id, User.nickname).where(User.email == email))
+        row = result.first()
+        if not row:
+            return None
+        principal = UserPrincipal(id=row.id, email=row.email, role_id=row.role_id, nickname=row.nickname)
+        user_cache.set(email, principal)
+    return principal
+
+
+
+async def get_current_user_required(token: str = Depends(oauth2_scheme), db=Depends(get_read_db)) -> UserPrincipal:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid authentication credentials",
@@ -35,7 +70,7 @@ def get_current_user_required(token: str = Depends(oauth2_scheme), db: Session =
 
     email = payload.get("sub")
     
-    user = db.query(User).filter(User.email == email).first()
+    user = await get_user_principal(db, email)
     if not user:
         
         raise credentials_exception
@@ -43,7 +78,7 @@ def get_current_user_required(token: str = Depends(oauth2_scheme), db: Session =
     return user
 
 
-def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Optional[User]:
+async def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme), db=Depends(get_read_db)) -> Optional[UserPrincipal]:
     if not token:
         return None
     
@@ -51,14 +86,14 @@ def get_current_user_optional(token: Optional[str] = Depends(oauth2_scheme), db:
     if not payload:
         return None
 
-    user = db.query(User).filter(User.email == payload.get("sub")).first()
+    user = await get_user_principal(db, payload.get("sub"))
     if not user:
         return None
 
     return user
 
 
-def get_current_admin(user: User = Depends(get_current_user_required)):
+def get_current_admin(user: UserPrincipal = Depends(get_current_user_required)):
     if user.role_id != 1:
         raise HTTPException(
             status_code=403,
@@ -0,0 +1,88 @@
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+from fastapi import HTTPException, UploadFile
+from fastapi.staticfiles import StaticFiles
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIR = Path(__file__).parent.parent / "static"
+IMAGES_DIR = STATIC_DIR / "images"
+MAX_IMAGE_BYTES = int(os.getenv("MAX_IMAGE_BYTES", str(5 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
+
+# Stored names are "<sha256><ext>", so a given name always means the same bytes.
+_CONTENT_ADDRESSED = re.compile(r"^[0-9a-f]{64}\.[a-z]+$")
+
+
+def save_image(upload: UploadFile, kind: str) -> str:
+    """
+    Stream an upload into static/images/<kind>/ under its content hash and
+    return the stored file name. Identical images are stored once.
+    """
+    ext = Path(upload.filename or "").suffix.lower()
+    if ext not in ALLOWED_EXTENSIONS:
+        raise HTTPException(status_code=400, detail=f"Unsupported image type. Allowed: {', '.join(sorted(ALLOWED_EXTENSIONS))}")
+
+    images_dir = IMAGES_DIR / kind
+    os.makedirs(images_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=images_dir, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := upload.file.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_IMAGE_BYTES:
+                    raise HTTPException(status_code=413, detail=f"Image exceeds {MAX_IMAGE_BYTES} bytes")
+                digest.update(chunk)
+                out.write(chunk)
+
+        filename = f"{digest.hexdigest()}{ext}"
+        final_path = images_dir / filename
+        if final_path.exists():
+            os.remove(tmp_path)
+        else:
+            os.replace(tmp_path, final_path)
+        logger.info(f"Stored image {final_path} ({size} bytes)")
+        return filename
+    except HTTPException:
+        os.remove(tmp_path)
+        raise
+    except Exception as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        logger.error(f"Failed to save image: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to save image: {str(e)}")
+
+
+def release_image(db, model, kind: str, filename: Optional[str]):
+    """Delete a stored image once no row of `model` references it any more."""
+    if not filename:
+        return
+    if db.query(model.id).filter(model.img == filename).first():
+        return
+    path = IMAGES_DIR / kind / filename
+    try:
+        if path.exists():
+            os.remove(path)
+            logger.info(f"Deleted image: {path}")
+    except Exception as e:
+        logger.error(f"Failed to delete image: {str(e)}")
+
+
+class ImageStaticFiles(StaticFiles):
+    """StaticFiles that marks content-addressed images as immutable."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if _CONTENT_ADDRESSED.match(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
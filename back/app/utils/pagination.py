@@ -0,0 +1,57 @@
+import base64
+import binascii
+import json
+from datetime import date
+from typing import Optional
+
+from fastapi import HTTPException
+from sqlalchemy import and_
+
+
+def encode_cursor(values: list) -> str:
+    payload = [v.isoformat() if isinstance(v, date) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def parse_cursor_date(value: Optional[str]) -> Optional[date]:
+    if value is None:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_segments(columns: list, values: list, nullable: tuple = ()) -> list:
+    """
+    Predicates selecting the rows strictly after `values` for ORDER BY columns
+    DESC, as consecutive stretches of that order: run them in turn until the
+    page is full. Each one is equality on a prefix of the columns and a range
+    (or IS NULL) on the next, which an index on the columns answers with a
+    seek; OR-ing them together makes the database scan the index instead.
+    Columns listed in `nullable` may hold NULL, which sorts last on DESC
+    (SQLite and MSSQL behaviour).
+    """
+    segments = []
+    for depth in reversed(range(len(columns))):
+        column, value = columns[depth], values[depth]
+        if value is None:
+            # Nothing sorts after NULL in this column.
+            continue
+        prefix = [c.is_(None) if v is None else c == v for c, v in zip(columns[:depth], values[:depth])]
+        segments.append(and_(*prefix, column < value))
+        if any(column is c for c in nullable):
+            segments.append(and_(*prefix, column.is_(None)))
+    return segments
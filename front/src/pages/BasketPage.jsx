@@ -68,29 +68,16 @@ const BasketPage = () => {
     );
 
     try {
-        // ИСПОЛЬЗУЕМ КОМБИНАЦИЮ DELETE + POST (Адаптируйте, если у вас есть PUT/PATCH)
-
-        // Шаг 1 (опционально, но безопаснее): Удаляем старую запись
-         try {
-            await axios.delete(`${API_URL}/shop/basket/${bookId}`, {
-                headers: { Authorization: `Bearer ${token}` },
-            });
-            console.log(`Intermediate delete for ${bookId} successful (or item wasn't there)`);
-         } catch (deleteError) {
-            if (deleteError.response?.status !== 404) {
-                 console.warn("Error during intermediate delete in updateQuantity:", deleteError);
-                 // Если удаление не удалось по другой причине, возможно стоит прервать обновление
-                 throw deleteError; // Перебрасываем ошибку, чтобы сработал внешний catch
-            }
-             console.log(`Intermediate delete for ${bookId} skipped (item likely already removed).`);
-         }
-
-        // Шаг 2: Добавляем товар с новым количеством (передаем quantity в ТЕЛЕ)
-        await axios.post(
-            `${API_URL}/shop/basket/${bookId}`,
-            { quantity: newQuantity }, // Тело запроса с новым количеством
+        // Один запрос: пакетная операция basket_set меняет количество на месте
+        const response = await axios.post(
+            `${API_URL}/shop/batch`,
+            { operations: [{ op: "basket_set", book_id: bookId, quantity: newQuantity }] },
             { headers: { Authorization: `Bearer ${token}` } }
         );
+        const [result] = response.data.results;
+        if (result.status !== 200) {
+            throw { response: { data: { detail: result.detail } } };
+        }
         // Если дошли сюда, значит обновление на сервере успешно
         // Можно вывести тихое уведомление или ничего не делать
         console.log(`Quantity for ${bookId} updated to ${newQuantity} on server.`);